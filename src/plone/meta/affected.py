@@ -0,0 +1,282 @@
+"""Select the tests affected by the changes of a branch.
+
+The changed files are mapped to modules, and the modules to the test modules
+importing them, directly or not, through a static import graph.  Whenever
+the graph cannot tell, for example for changed templates, ZCML files or
+modules registered in ZCML, all tests are selected.
+
+Only the standard library is used, the selection does not need the
+dependencies of the repository to be installed.
+"""
+
+from .sharding import find_test_modules
+from .sharding import module_regex
+
+import argparse
+import ast
+import pathlib
+import re
+import shlex
+import subprocess
+import sys
+
+# Changes to these files never affect the tests.
+IGNORED_DIRECTORIES = ("docs", "news")
+IGNORED_SUFFIXES = (".md", ".rst")
+
+# Dotted names within ZCML attributes, relative ones start with a dot.
+ZCML_NAME = re.compile(r"(?<![\w/])(\.+[A-Za-z_][\w.]*|[A-Za-z_]\w*(?:\.\w+)+)")
+
+
+def module_name(file_path, root):
+    """Return the dotted name of the module at `file_path` below `root`"""
+    parts = file_path.relative_to(root).with_suffix("").parts
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _parents(name):
+    """Return `name` and the names of the packages containing it"""
+    parts = name.split(".")
+    return [".".join(parts[:index]) for index in range(1, len(parts) + 1)]
+
+
+def _python_files(root):
+    for file_obj in sorted(root.rglob("*.py")):
+        if not any(part.startswith(".") for part in file_obj.relative_to(root).parts):
+            yield file_obj
+
+
+def module_imports(source, name, is_package=False):
+    """Return the names of the modules imported by the module `name`.
+
+    Imported modules come with their parent packages, which are imported as
+    well.  Names imported from a module may be modules, so they are
+    included too.  Raise `SyntaxError` if `source` cannot be parsed.
+    """
+    package = name if is_package else name.rpartition(".")[0]
+    imported = set(_parents(package)) if package else set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imported.update(_parents(alias.name))
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package.split(".")
+                base = base[: len(base) - node.level + 1]
+                base = ".".join(base + ([node.module] if node.module else []))
+            else:
+                base = node.module
+            if not base:
+                continue
+            imported.update(_parents(base))
+            imported.update(f"{base}.{alias.name}" for alias in node.names)
+    imported.discard(name)
+    return imported
+
+
+def import_graph(roots):
+    """Return the imports of each module below `roots`, see `module_imports`.
+
+    Modules which cannot be parsed map to `None`.
+    """
+    graph = {}
+    for root in roots:
+        for file_obj in _python_files(root):
+            name = module_name(file_obj, root)
+            try:
+                graph[name] = module_imports(
+                    file_obj.read_text(), name, file_obj.name == "__init__.py"
+                )
+            except (SyntaxError, UnicodeDecodeError, ValueError):
+                graph[name] = None
+    return graph
+
+
+def zcml_modules(roots):
+    """Return the names of the modules referenced by ZCML files below `roots`"""
+    names = set()
+    for root in roots:
+        for file_obj in sorted(root.rglob("*.zcml")):
+            package = module_name(file_obj.parent / "__init__.py", root)
+            for match in ZCML_NAME.finditer(file_obj.read_text(errors="replace")):
+                name = match.group(1).rstrip(".")
+                if name.startswith("."):
+                    dots = len(name) - len(name.lstrip("."))
+                    base = package.split(".")[: len(package.split(".")) - dots + 1]
+                    name = ".".join(base + [name.lstrip(".")])
+                names.update(_parents(name))
+    return names
+
+
+def dependent_modules(graph, modules):
+    """Return `modules` and all modules importing them, directly or not"""
+    dependents = {}
+    for name, imported in graph.items():
+        for target in imported or ():
+            dependents.setdefault(target, set()).add(name)
+    affected = set(modules)
+    pending = list(modules)
+    while pending:
+        for name in dependents.get(pending.pop(), ()):
+            if name not in affected:
+                affected.add(name)
+                pending.append(name)
+    return affected
+
+
+def changed_files(path, base):
+    """Return the files changed since the merge base of `base` and `HEAD`.
+
+    Uncommitted changes are included.  Return `None` if git cannot tell,
+    for example in a shallow clone.
+    """
+
+    def git(*args):
+        return subprocess.run(
+            ("git", *args), cwd=path, capture_output=True, text=True, check=True
+        ).stdout
+
+    try:
+        merge_base = git("merge-base", base, "HEAD").strip()
+        output = git("diff", "--name-only", "--no-renames", merge_base)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.splitlines()
+
+
+def _root_of(file_obj, roots):
+    for root in roots:
+        if root == file_obj.parent or root in file_obj.parents:
+            return root
+    return None
+
+
+def select_tests(path, test_path, runner, changed):
+    """Return the test modules affected by the `changed` files.
+
+    The test modules are tuples like the ones of `find_test_modules`.
+    Return a tuple of the test modules and a reason, the test modules are
+    `None` if all tests must run.
+    """
+    if not changed:
+        return None, "no changes found"
+    path = pathlib.Path(path)
+    source_root = path / "src" if (path / "src").is_dir() else path
+    test_root = path / test_path.strip("/")
+    roots = [source_root]
+    if _root_of(test_root / "__init__.py", roots) is None:
+        roots.append(test_root)
+    changed_modules = set()
+    for name in changed:
+        file_obj = path / name
+        if file_obj.suffix in IGNORED_SUFFIXES or name.startswith(
+            tuple(f"{directory}/" for directory in IGNORED_DIRECTORIES)
+        ):
+            continue
+        root = _root_of(file_obj, roots)
+        if file_obj.suffix != ".py" or root is None:
+            return None, f"{name} is not a Python module of the tests or sources"
+        if file_obj.name in ("conftest.py", "setup.py"):
+            return None, f"{name} configures the tests or the package"
+        changed_modules.add(module_name(file_obj, root))
+    if not changed_modules:
+        return [], "only documentation changed"
+    graph = import_graph(roots)
+    unparsable = sorted(name for name, imported in graph.items() if imported is None)
+    if unparsable:
+        return None, f"{unparsable[0]} cannot be parsed"
+    registered = sorted(changed_modules & zcml_modules(roots))
+    if registered:
+        return None, f"{registered[0]} is registered in ZCML"
+    affected = dependent_modules(graph, changed_modules)
+    tests = [
+        (dotted, relative)
+        for dotted, relative in find_test_modules(path, test_path, runner)
+        if module_name(path / relative, _root_of(path / relative, roots)) in affected
+    ]
+    return tests, f"changed modules: {', '.join(sorted(changed_modules))}"
+
+
+def runner_arguments(path, test_path, runner, tests):
+    """Return the arguments restricting the test runner to `tests`.
+
+    pytest gets the other test modules to ignore, as the test path is part
+    of its command in tox.ini.
+    """
+    if runner == "pytest":
+        path = pathlib.Path(path).absolute()
+        return [
+            f"--ignore={path / relative}"
+            for module, relative in find_test_modules(path, test_path, runner)
+            if (module, relative) not in tests
+        ]
+    return ["-m", module_regex(tests)]
+
+
+def main():  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        description="Run only the tests affected by the changes since the merge "
+        "base with another git reference. The selection follows the imports of "
+        "the modules, all tests run if it is not sure. "
+        "The arguments selecting the tests are appended to the command, "
+        "after a `--` for tox.",
+    )
+    parser.add_argument(
+        "--path",
+        type=pathlib.Path,
+        default=pathlib.Path.cwd(),
+        help="path to the repository. Default: the current directory.",
+    )
+    parser.add_argument(
+        "--base",
+        default="origin/HEAD",
+        help="git reference the changes are compared to. Default: origin/HEAD.",
+    )
+    parser.add_argument(
+        "--test-path",
+        dest="test_path",
+        default="/src",
+        help="directory containing the tests, relative to the repository, "
+        "like `test_path` in tox.ini. Default: /src.",
+    )
+    parser.add_argument(
+        "--runner",
+        choices=("zope.testrunner", "pytest"),
+        default="zope.testrunner",
+        help="test runner the arguments are for. Default: zope.testrunner.",
+    )
+    parser.add_argument(
+        "command",
+        nargs=argparse.REMAINDER,
+        help="command running the tests, for example `tox -e py313-plone62`. "
+        "Without command, print the test runner arguments.",
+    )
+    args = parser.parse_args()
+
+    command = args.command
+    if command[:1] == ["--"]:
+        command = command[1:]
+    changed = changed_files(args.path, args.base)
+    if changed is None:
+        tests, reason = None, f"no merge base with {args.base}"
+    else:
+        tests, reason = select_tests(args.path, args.test_path, args.runner, changed)
+    if tests is None:
+        print(f"Running all tests: {reason}.", file=sys.stderr)
+        arguments = []
+    elif not tests:
+        print(f"No tests affected: {reason}.", file=sys.stderr)
+        sys.exit(0)
+    else:
+        print(
+            f"Running {len(tests)} affected test modules ({reason}).", file=sys.stderr
+        )
+        arguments = runner_arguments(args.path, args.test_path, args.runner, tests)
+    if not command:
+        print(shlex.join(arguments))
+        sys.exit(0)
+    if arguments and "tox" in command and "--" not in command:
+        command.append("--")
+    sys.exit(subprocess.run(command + arguments).returncode)
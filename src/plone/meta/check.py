@@ -0,0 +1,75 @@
+"""Check that the files generated by `config-package` were not modified.
+
+This is meant to run on every commit, so it only compares checksums
+against the manifest stored in `.meta.toml` by `config-package`.
+Keep its imports light: no Jinja, no validators.
+"""
+
+import hashlib
+import re
+import tomllib
+
+MANUAL_CONFIG = re.compile(
+    r"# START-MARKER-MANUAL-CONFIG.*?# END-MARKER-MANUAL-CONFIG", re.DOTALL
+)
+
+
+def checksum(content):
+    """Return the checksum of the content of a generated file.
+
+    The block between the manual configuration markers of `pyproject.toml`
+    is maintained by hand, so it is left out.
+    """
+    content = MANUAL_CONFIG.sub("", content)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def read_checksums(path):
+    """Return the checksum manifest stored in `.meta.toml` of `path`.
+
+    Return `None` if there is none.
+    """
+    meta_toml = path / ".meta.toml"
+    if not meta_toml.exists():
+        return None
+    with open(meta_toml, "rb") as meta_f:
+        meta_cfg = tomllib.load(meta_f)
+    return meta_cfg.get("meta", {}).get("checksums")
+
+
+def drifted_files(path, checksums):
+    """Return a list of relative paths and the reason why they drifted"""
+    drifted = []
+    for relative, expected in sorted(checksums.items()):
+        file_obj = path / relative
+        if not file_obj.exists():
+            drifted.append((relative, "missing"))
+        elif checksum(file_obj.read_text()) != expected:
+            drifted.append((relative, "modified"))
+    return drifted
+
+
+def check(path):
+    """Compare the generated files of `path` with the checksum manifest.
+
+    Return the exit code: `0` if all files are as generated, `1` otherwise.
+    """
+    checksums = read_checksums(path)
+    if not checksums:
+        print(
+            "No checksums found in .meta.toml, "
+            "please run `config-package` with a recent plone.meta first."
+        )
+        return 1
+    drifted = drifted_files(path, checksums)
+    if not drifted:
+        return 0
+    print("Files generated by plone.meta have drifted:")
+    for relative, reason in drifted:
+        print(f"  {relative} ({reason})")
+    print()
+    print(
+        "Move the changes to .meta.toml and run `config-package --branch current`, "
+        "see https://plone.github.io/meta/"
+    )
+    return 1
@@ -0,0 +1,304 @@
+"""Estimate how many CI runner minutes the generated configuration costs.
+
+Everything is computed from `.meta.toml` and local history files, nothing
+is fetched from a CI server.
+"""
+
+from .config_package import get_test_matrix
+from .config_package import GHA_DEFAULT_JOBS
+from .config_package import GITLAB_DEFAULT_JOBS
+from .config_package import tox_env_name
+from .matrix import default_branch_cells
+from .matrix import matrix_cells
+from .shared.history import read_env_durations
+from .shared.packages import list_packages
+from .shared.path import path_factory
+
+import argparse
+import math
+import pathlib
+import statistics
+import tomllib
+
+# Minutes assumed for a job without any recorded duration.
+DEFAULT_MINUTES = 5.0
+
+# tox environment run by each job of `meta.yml` and `.gitlab-ci.yml`,
+# the test matrix jobs are handled separately.
+GHA_JOB_ENVS = {
+    "qa": "lint",
+    "coverage": "coverage",
+    "dependencies": "dependencies",
+    "release_ready": "release-check",
+    "circular": "circular",
+}
+GITLAB_JOB_ENVS = {
+    "lint": "lint",
+    "release-ready": "release-check",
+    "dependencies": "dependencies",
+    "circular-dependencies": "circular",
+    "coverage": "coverage",
+}
+
+
+def read_meta_cfg(path):
+    """Return the content of `.meta.toml` of `path`, or an empty dict"""
+    meta_toml = path / ".meta.toml"
+    if not meta_toml.exists():
+        return {}
+    with open(meta_toml, "rb") as meta_f:
+        return tomllib.load(meta_f)
+
+
+def detect_ci(path):
+    """Return `gitlab` if the repository has a GitLab CI configuration"""
+    if (path / ".gitlab-ci.yml").exists():
+        return "gitlab"
+    return "github"
+
+
+def shard_envs(env, shards):
+    """Return the tox environments running the parts of the tests of `env`"""
+    if not shards:
+        return [env]
+    return [f"{env}-shard{number}" for number in range(1, shards + 1)]
+
+
+def ci_jobs(meta_cfg, ci):
+    """Return the tox environments run on a branch and on the default branch.
+
+    Each tox environment stands for one CI job.  With `test_shards`, each test
+    and coverage job is split into one job per shard, and the coverage data
+    is combined in one more job.
+    """
+    tox_options = meta_cfg.get("tox", {})
+    shards = tox_options.get("test_shards") or 0
+    if ci == "gitlab":
+        jobs = meta_cfg.get("gitlab", {}).get("jobs") or GITLAB_DEFAULT_JOBS
+        job_envs = GITLAB_JOB_ENVS
+        with_matrix = "testing" in jobs
+    else:
+        jobs = meta_cfg.get("github", {}).get("jobs") or GHA_DEFAULT_JOBS
+        job_envs = GHA_JOB_ENVS
+        with_matrix = True
+    envs = []
+    for job in jobs:
+        if job_envs.get(job) == "coverage" and shards:
+            envs.extend(shard_envs("coverage", shards) + ["coverage-combine"])
+        elif job in job_envs:
+            envs.append(job_envs[job])
+    if tox_options.get("use_test_matrix") is False or not with_matrix:
+        return envs, envs
+    test_matrix = get_test_matrix(tox_options.get("test_matrix"))
+    strategy = tox_options.get("matrix_strategy", "")
+    branch_cells = matrix_cells(test_matrix, strategy)
+    main_cells = default_branch_cells(test_matrix, strategy) or branch_cells
+    branch_envs = envs + [
+        name
+        for cell in branch_cells
+        for name in shard_envs(tox_env_name(*cell), shards)
+    ]
+    main_envs = envs + [
+        name for cell in main_cells for name in shard_envs(tox_env_name(*cell), shards)
+    ]
+    return branch_envs, main_envs
+
+
+def env_minutes(env, durations, default=DEFAULT_MINUTES, shards=1):
+    """Return the estimated minutes of a tox environment.
+
+    Without a recorded duration, use the mean of the environments testing the
+    same Plone version, then the mean of all test matrix environments and
+    finally `default`.  A shard of the tests, like `py313-plone62-shard1`,
+    takes the `shards`th part of the whole environment.
+
+    Return a tuple of minutes and whether they are a guess.
+    """
+    if env in durations:
+        return durations[env] / 60, False
+    whole_env, shard_factor = (env.rsplit("-", 1) + [""])[:2]
+    if shard_factor.startswith("shard"):
+        minutes, guess = env_minutes(whole_env, durations, default)
+        return minutes / shards, guess
+    fallbacks = []
+    if "-plone" in env:
+        plone_factor = env.rsplit("-", 1)[1]
+        fallbacks.append(
+            [
+                seconds
+                for name, seconds in durations.items()
+                if name.endswith(f"-{plone_factor}")
+            ]
+        )
+        fallbacks.append(
+            [seconds for name, seconds in durations.items() if "-plone" in name]
+        )
+    for samples in fallbacks:
+        if samples:
+            return statistics.mean(samples) / 60, True
+    return default, True
+
+
+def push_minutes(envs, durations, ci, default=DEFAULT_MINUTES, overhead=0.0, shards=1):
+    """Return the billed minutes of one push and the guessed environments.
+
+    GitHub rounds up every job to the next minute.
+    """
+    total = 0.0
+    guessed = []
+    for env in envs:
+        minutes, guess = env_minutes(env, durations, default, shards)
+        minutes += overhead
+        if ci == "github":
+            minutes = math.ceil(minutes)
+        total += minutes
+        if guess:
+            guessed.append(env)
+    return total, guessed
+
+
+def estimate(path, durations, default=DEFAULT_MINUTES, overhead=0.0):
+    """Estimate the CI cost of the repository at `path`.
+
+    Return a dictionary with the CI provider, the number of jobs and minutes
+    per push on a branch and on the default branch, and the guessed
+    environments.
+    """
+    ci = detect_ci(path)
+    meta_cfg = read_meta_cfg(path)
+    branch_envs, main_envs = ci_jobs(meta_cfg, ci)
+    shards = meta_cfg.get("tox", {}).get("test_shards") or 1
+    branch, branch_guessed = push_minutes(
+        branch_envs, durations, ci, default, overhead, shards
+    )
+    main, main_guessed = push_minutes(
+        main_envs, durations, ci, default, overhead, shards
+    )
+    return {
+        "name": path.absolute().name,
+        "ci": ci,
+        "branch_jobs": len(branch_envs),
+        "branch_minutes": branch,
+        "main_jobs": len(main_envs),
+        "main_minutes": main,
+        "guessed": sorted(set(branch_guessed) | set(main_guessed)),
+    }
+
+
+def monthly_minutes(result, pushes, main_pushes):
+    """Return the minutes per month of an `estimate` result"""
+    return result["branch_minutes"] * pushes + result["main_minutes"] * main_pushes
+
+
+def format_report(results, pushes, main_pushes):
+    """Format the `estimate` results as a plain text table with a total"""
+    headers = ("package", "ci", "jobs/push", "min/push", "min/month")
+    rows = []
+    for result in results:
+        jobs = str(result["branch_jobs"])
+        minutes = f"{result['branch_minutes']:.1f}"
+        if result["main_jobs"] != result["branch_jobs"]:
+            jobs += f" ({result['main_jobs']})"
+            minutes += f" ({result['main_minutes']:.1f})"
+        name = result["name"]
+        if result["guessed"]:
+            name += " *"
+        monthly = f"{monthly_minutes(result, pushes, main_pushes):.0f}"
+        rows.append((name, result["ci"], jobs, minutes, monthly))
+    if len(results) > 1:
+        total = sum(monthly_minutes(r, pushes, main_pushes) for r in results)
+        rows.append(("total", "", "", "", f"{total:.0f}"))
+    widths = [
+        max(len(row[column]) for row in [headers] + rows)
+        for column in range(len(headers))
+    ]
+    lines = []
+    for row in [headers] + rows:
+        cells = [
+            f"{cell:<{width}}" if column < 2 else f"{cell:>{width}}"
+            for column, (cell, width) in enumerate(zip(row, widths))
+        ]
+        lines.append("  ".join(cells).rstrip())
+    return "\n".join(lines)
+
+
+def main():  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        description="Estimate the CI runner minutes the configured test matrix "
+        "costs, based on durations of past runs. Works offline.",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        type=pathlib.Path,
+        help="path to a repository, or to a packages.txt to estimate every "
+        "repository listed inside",
+    )
+    parser.add_argument(
+        "--clones",
+        type=path_factory("clones", is_dir=True),
+        default=None,
+        help="path to the directory where the clones of the repositories listed "
+        "in packages.txt are stored. Default: the folder of packages.txt.",
+    )
+    parser.add_argument(
+        "--history",
+        dest="history",
+        action="append",
+        type=path_factory("history"),
+        default=[],
+        help="JUnit XML, `tox --result-json` or JSON file mapping tox "
+        "environments to seconds. Can be given multiple times, "
+        "the median duration is used.",
+    )
+    parser.add_argument(
+        "--pushes",
+        dest="pushes",
+        type=int,
+        default=40,
+        help="Pushes to branches per month and package. Default: 40.",
+    )
+    parser.add_argument(
+        "--main-pushes",
+        dest="main_pushes",
+        type=int,
+        default=10,
+        help="Pushes to the default branch per month and package. Default: 10.",
+    )
+    parser.add_argument(
+        "--default-minutes",
+        dest="default_minutes",
+        type=float,
+        default=DEFAULT_MINUTES,
+        help=f"Minutes assumed for jobs without history. Default: {DEFAULT_MINUTES}.",
+    )
+    parser.add_argument(
+        "--overhead",
+        dest="overhead",
+        type=float,
+        default=0.0,
+        help="Minutes added to every job for checkout and installation, "
+        "if the history only covers running the tests. Default: 0.",
+    )
+    args = parser.parse_args()
+
+    repositories = []
+    for path in args.paths:
+        if path.suffix == ".txt":
+            clones = args.clones or path.parent
+            repositories.extend(clones / package for package in list_packages(path))
+        else:
+            repositories.append(path)
+    durations = read_env_durations(args.history)
+    results = [
+        estimate(path, durations, args.default_minutes, args.overhead)
+        for path in repositories
+    ]
+    print(format_report(results, args.pushes, args.main_pushes))
+    print()
+    print(
+        f"Per month: {args.pushes} branch and {args.main_pushes} default branch "
+        "pushes. Numbers in parentheses are for the default branch."
+    )
+    if any(result["guessed"] for result in results):
+        print("* some environments have no recorded duration, they are estimated.")
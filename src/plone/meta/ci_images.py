@@ -0,0 +1,168 @@
+"""Generate Dockerfiles of CI images with the OS packages a repository needs.
+
+Each Python version of the test matrix gets its own image, based on the
+image of `DOCKER_IMAGES`, or of `custom_images` on GitLab.  The generated
+workflows use them with the `prebuilt_images` option of `.meta.toml`, so
+the OS packages are no longer installed at the start of every job.
+"""
+
+from .ci_cost import detect_ci
+from .ci_cost import read_meta_cfg
+from .config_package import DOCKER_IMAGES
+from .config_package import get_test_matrix
+from .config_package import GITLAB_DEFAULT_JOBS
+from .config_package import prebuilt_image
+
+import argparse
+import pathlib
+import shlex
+import sys
+
+# Installed by the `circular-dependencies` job of GitLab CI.
+CIRCULAR_PACKAGES = ("graphviz", "graphviz-dev")
+
+
+def version_key(version):
+    """Sort CPython versions, oldest first, before PyPy ones like `pypy3.10`"""
+    is_pypy = version.startswith("pypy")
+    return is_pypy, tuple(map(int, version.removeprefix("pypy").split(".")))
+
+
+def python_versions(meta_cfg):
+    """Return the Python versions of the test matrix, oldest first"""
+    test_matrix = get_test_matrix(meta_cfg.get("tox", {}).get("test_matrix"))
+    versions = {version for versions in test_matrix.values() for version in versions}
+    return sorted(versions, key=version_key)
+
+
+def install_commands(meta_cfg, ci):
+    """Return the shell commands installing the OS packages of the CI jobs.
+
+    GitHub `os_dependencies` are package names, GitLab ones are YAML lines
+    of commands.
+    """
+    section = meta_cfg.get(ci, {})
+    os_dependencies = section.get("os_dependencies", "")
+    packages = []
+    commands = []
+    if ci == "gitlab":
+        for line in os_dependencies.splitlines():
+            command = line.strip().removeprefix("- ").strip()
+            if command:
+                commands.append(command)
+        if "circular-dependencies" in (section.get("jobs") or GITLAB_DEFAULT_JOBS):
+            packages.extend(CIRCULAR_PACKAGES)
+    else:
+        packages.extend(os_dependencies.split())
+    if packages:
+        commands.append(
+            "apt-get install -y --no-install-recommends " + " ".join(packages)
+        )
+    if commands and not any(cmd.startswith("apt-get update") for cmd in commands):
+        commands.insert(0, "apt-get update")
+    if commands:
+        commands.append("rm -rf /var/lib/apt/lists/*")
+    return commands
+
+
+def dockerfile(base_image, commands):
+    """Return the Dockerfile of a CI image based on `base_image`"""
+    lines = [
+        "# Generated by meta-ci-images from .meta.toml, do not edit.",
+        f"FROM {base_image}",
+    ]
+    if commands:
+        lines.append("RUN " + " \\\n    && ".join(commands))
+    # Saves the installation of tox at the start of every job.
+    lines.append("RUN pip install --no-cache-dir tox-uv")
+    return "\n".join(lines) + "\n"
+
+
+def build_script(images):
+    """Return a shell script building and pushing `images`.
+
+    `images` maps the names of the Dockerfiles to the names of the images.
+    """
+    lines = [
+        "#!/bin/sh",
+        "# Generated by meta-ci-images: build and push the CI images.",
+        "# Run it from this directory, after logging in to the registry.",
+        "set -e",
+    ]
+    for name, image in images.items():
+        lines.append(f"docker build --pull -f {name} -t {shlex.quote(image)} .")
+        lines.append(f"docker push {shlex.quote(image)}")
+    return "\n".join(lines) + "\n"
+
+
+def generate(path, output, prefix=None):
+    """Write the Dockerfiles and the build script of the repository at `path`.
+
+    Return the names of the written files.
+    """
+    meta_cfg = read_meta_cfg(path)
+    ci = detect_ci(path)
+    section = meta_cfg.get(ci, {})
+    prefix = prefix or section.get("prebuilt_images")
+    if not prefix:
+        raise ValueError(
+            f"No image name: set `prebuilt_images` in the [{ci}] section of "
+            ".meta.toml, or use `--image`."
+        )
+    base_images = DOCKER_IMAGES
+    if ci == "gitlab" and section.get("custom_images"):
+        base_images = section["custom_images"]
+    commands = install_commands(meta_cfg, ci)
+    output.mkdir(parents=True, exist_ok=True)
+    images = {}
+    for version in python_versions(meta_cfg):
+        if ci == "github" and version.startswith("pypy"):
+            # The PyPy jobs of test-matrix.yml run on the runner itself.
+            continue
+        if version not in base_images:
+            raise ValueError(f"There is no Docker image defined for Python {version}.")
+        image = prebuilt_image(prefix, version)
+        name = f"Dockerfile.{image.rsplit(':', 1)[1]}"
+        (output / name).write_text(dockerfile(base_images[version], commands))
+        images[name] = image
+    script = output / "build.sh"
+    script.write_text(build_script(images))
+    script.chmod(0o755)
+    return sorted(images) + [script.name]
+
+
+def main():  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        description="Generate the Dockerfiles of CI images containing the OS "
+        "packages of `os_dependencies`, one per Python version of the test "
+        "matrix, and a script building and pushing them. "
+        "Use the images with the `prebuilt_images` option of .meta.toml.",
+    )
+    parser.add_argument(
+        "path",
+        type=pathlib.Path,
+        help="path to the repository",
+    )
+    parser.add_argument(
+        "--output",
+        type=pathlib.Path,
+        default=None,
+        help="directory to write the files to. Default: ci-images in the repository.",
+    )
+    parser.add_argument(
+        "--image",
+        dest="image",
+        default=None,
+        help="name of the images, without tag. "
+        "Default: the `prebuilt_images` option of .meta.toml.",
+    )
+    args = parser.parse_args()
+
+    output = args.output or args.path / "ci-images"
+    try:
+        names = generate(args.path, output, args.image)
+    except ValueError as exc:
+        print(exc)
+        sys.exit(1)
+    for name in names:
+        print(output / name)
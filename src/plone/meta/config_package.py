@@ -1,8 +1,19 @@
+from .check import check
+from .check import checksum
+from .constraints import cached_location
+from .constraints import constraints_url
+from .matrix import default_branch_cells
+from .matrix import matrix_cells
+from .matrix import tox_env_name
+from .sharding import split_tests
 from .shared.call import call
 from .shared.git import get_branch_name
 from .shared.git import git_branch
 from .shared.git import git_server_url
+from .shared.history import read_test_durations
 from .shared.path import change_dir
+from .wheelhouse import find_wheelhouse
+from .wheelhouse import wheelhouse_env
 from functools import cached_property
 from importlib.metadata import version
 from packaging.version import Version
@@ -11,14 +22,18 @@ from pathlib import Path
 import argparse
 import collections
 import configparser
-import editorconfig
-import jinja2
+import fnmatch
+import hashlib
+import json
 import pathlib
 import re
 import shutil
+import sys
+import time
 import tomlkit
-import validate_pyproject
-import yaml
+
+# Jinja and the validators are imported where they are used, so that
+# `config-package --check` starts fast enough to run on every commit.
 
 META_HINT = """\
 # Generated from:
@@ -41,6 +56,9 @@ TOX_TEST_MATRIX = {
 
 MXDEV_CONSTRAINTS = "constraints-mxdev.txt"
 
+# Tools creating tox environments and installing into them.
+TOX_INSTALLERS = ("pip", "uv")
+
 DOCKER_IMAGES = {
     "3.14": "python:3.14-trixie",
     "3.13": "python:3.13-trixie",
@@ -75,9 +93,43 @@ GITLAB_DEFAULT_JOBS = [
     "coverage",
 ]
 
+# Changes to these paths alone do not run the tests, with `test_paths_ignore`.
+DOC_PATHS = (
+    "docs/**",
+    "news/**",
+    "**/*.md",
+    "**/*.rst",
+    "CHANGES*",
+    "CONTRIBUTORS*",
+    "README*",
+)
+
+# Build artifacts and tools, never part of the changes of a commit.
+IGNORED_DIRECTORIES = ("__pycache__", "build", "dist", "node_modules", "venv")
+
+# Hooks of .pre-commit-config.yaml on commit: all of them, or only the ones
+# checking the committed files quickly.
+PRE_COMMIT_PROFILES = ("full", "fast")
+
+# Tools checking and formatting the Python code: flake8 with isort and
+# black, or ruff alone.
+LINTERS = ("flake8", "ruff")
+
+# Tables of the `[meta]` section recording the generated files, rebuilt on
+# every run so that files which are no longer generated drop out.
+RECORDED_TABLES = ("inputs", "checksums")
+
+# How the jobs of .gitlab-ci.yml wait for each other: all QA jobs first,
+# none, or only the `lint` job.
+GITLAB_PIPELINES = ("stages", "dag", "lint-gate")
 
-def handle_command_line_arguments():  # pragma: nocover
-    """Parse command line options"""
+
+def handle_command_line_arguments(argv=None):
+    """Parse command line options
+
+    `argv` defaults to `sys.argv`, other commands pass their own list to
+    get a fully populated namespace for `PackageConfiguration`.
+    """
     parser = argparse.ArgumentParser(description="Use configuration for a package.")
     parser.add_argument(
         "path", type=pathlib.Path, help="path to the repository to be configured"
@@ -120,6 +172,15 @@ def handle_command_line_arguments():  # pragma: nocover
         default=False,
         help="Whether to run tox after configuring the repository.",
     )
+    parser.add_argument(
+        "--full-lint",
+        dest="full_lint",
+        action="store_true",
+        default=False,
+        help="With --tox, run the `format` and `lint` tox environments on the "
+        "whole repository, instead of the pre-commit hooks on the files changed "
+        "by this run only.",
+    )
     parser.add_argument(
         "--branch",
         dest="branch_name",
@@ -128,6 +189,48 @@ def handle_command_line_arguments():  # pragma: nocover
         "If not given it is constructed automatically and includes "
         'the configuration type. Use "current" to update the current branch.',
     )
+    parser.add_argument(
+        "--check",
+        dest="check",
+        action="store_true",
+        default=False,
+        help="Only check that the generated files match the checksums recorded "
+        "in .meta.toml, without rendering anything. Exits non-zero otherwise.",
+    )
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        default=False,
+        help="Keep running and render the affected files again whenever "
+        ".meta.toml or a template changes. Nothing is committed.",
+    )
+    parser.add_argument(
+        "--force",
+        dest="force",
+        action="store_true",
+        default=False,
+        help="Render all files, even those whose inputs did not change "
+        "since the last run.",
+    )
+    parser.add_argument(
+        "--constraints-cache",
+        dest="constraints_cache",
+        metavar="DIR",
+        default=None,
+        help="Point tox.ini to the constraints files cached in DIR by "
+        "`meta-constraints`, instead of fetching them from the network. "
+        "Overrides the `constraints_cache` option of .meta.toml.",
+    )
+    parser.add_argument(
+        "--wheelhouse",
+        dest="wheelhouse",
+        metavar="DIR",
+        default=None,
+        help="With --tox, install from the wheels built in DIR by "
+        "`meta-wheelhouse` before falling back to the package index. "
+        "Default: the `wheelhouse` option of the [tox] section of .meta.toml.",
+    )
     parser.add_argument(
         "--track",
         dest="track_package",
@@ -136,7 +239,7 @@ def handle_command_line_arguments():  # pragma: nocover
         help="Whether to add the package being configured in packages.txt.",
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     return args
 
 
@@ -173,12 +276,29 @@ def get_test_matrix(test_matrix):
     return result
 
 
+def prebuilt_image(prefix, python_version):
+    """Return the name of the CI image of a Python version, see `meta-ci-images`
+
+    Tagged like the tox factor of the version: `py3.13` or `pypy3.10`.
+    """
+    if not python_version.startswith("py"):
+        python_version = f"py{python_version}"
+    return f"{prefix}:{python_version}"
+
+
 class PackageConfiguration:
 
     def __init__(self, args):
         self.args = args
         self.path = args.path.absolute()
         self.meta_cfg = {}
+        # When set to a dictionary, generated files are collected there
+        # (relative path -> content) instead of being written, see `render`.
+        self.rendered = None
+        # Files skipped because their inputs did not change, see `copy_with_meta`.
+        self.up_to_date = set()
+        # Folder holding the config type folders with the templates.
+        self.templates_path = pathlib.Path(__file__).parent
 
         if not (self.path / ".git").exists():
             raise ValueError(
@@ -188,6 +308,7 @@ class PackageConfiguration:
         self.meta_cfg = self._read_meta_configuration()
         self.meta_cfg["meta"]["template"] = self.config_type
         self.meta_cfg["meta"]["commit-id"] = self._get_version()
+        self._start_recording()
 
         with change_dir(self.path):
             server_url = git_server_url()
@@ -202,6 +323,25 @@ class PackageConfiguration:
     def _get_version(self):
         return version("plone.meta")
 
+    def _start_recording(self):
+        """Start empty `RECORDED_TABLES` in the meta configuration.
+
+        They get an entry for every file written or up to date from now on.
+        The previous tables are kept in `self.previous_tables`, to find the
+        files which are up to date.
+        """
+        meta = self.meta_cfg["meta"]
+        self.previous_tables = {
+            table: dict(meta.pop(table, None) or {}) for table in RECORDED_TABLES
+        }
+
+    def _recorded(self, table, relative):
+        """Return the entry of `relative` in `table`, from this run or before"""
+        current = self.meta_cfg["meta"].get(table, {})
+        if str(relative) in current:
+            return current[str(relative)]
+        return self.previous_tables[table].get(str(relative))
+
     def _read_meta_configuration(self):
         """Read and update meta configuration"""
         meta_toml_path = self.path / ".meta.toml"
@@ -224,14 +364,16 @@ class PackageConfiguration:
 
     @cached_property
     def config_type_path(self):
-        return pathlib.Path(__file__).parent / self.config_type
+        return self.templates_path / self.config_type
 
     @cached_property
     def default_path(self):
-        return pathlib.Path(__file__).parent / "default"
+        return self.templates_path / "default"
 
     @cached_property
     def jinja_env(self):
+        import jinja2
+
         return jinja2.Environment(
             loader=jinja2.FileSystemLoader([self.config_type_path, self.default_path]),
             variable_start_string="%(",
@@ -284,7 +426,17 @@ class PackageConfiguration:
 
     def _test_cfg(self):
         """Setup testing configuration."""
-        options = self._get_options_for("tox", ("test_runner", "test_path"))
+        options = self._get_options_for(
+            "tox",
+            (
+                "test_runner",
+                "test_path",
+                "test_parallel",
+                "test_shards",
+                "test_durations",
+                "affected_tests",
+            ),
+        )
         path = options.get("test_path")
         if not path:
             if (self.path / "tests").exists():
@@ -296,8 +448,86 @@ class PackageConfiguration:
         options["test_path"] = path
         runner = options.get("test_runner", "zope.testrunner")
         options["test_runner"] = runner
+        options["test_jobs"] = self._test_jobs(options.pop("test_parallel"), runner)
+        # `patch = subprocess` in pyproject.toml, to measure the test
+        # processes, is new in coverage 7.10.
+        options["coverage_requirement"] = (
+            "coverage>=7.10" if options["test_jobs"] else "coverage"
+        )
+        shard_arguments = self._shard_arguments(
+            path,
+            runner,
+            options.pop("test_shards"),
+            options.pop("test_durations"),
+        )
+        options["test_shards"] = [
+            {"factor": f"shard{number}", "args": args}
+            for number, args in enumerate(shard_arguments, 1)
+        ]
+        options["no_shard"] = "-".join(
+            f"!{shard['factor']}" for shard in options["test_shards"]
+        )
+        if options["affected_tests"] and options["test_shards"]:
+            raise ValueError(
+                "Invalid tox `affected_tests`, it cannot be combined with `test_shards`."
+            )
         return options
 
+    def _shard_numbers(self):
+        """Return the numbers of the test shards as a YAML list, if any"""
+        shards = self._test_cfg()["test_shards"]
+        if not shards:
+            return ""
+        return json.dumps([str(number) for number in range(1, len(shards) + 1)])
+
+    def _shard_arguments(self, test_path, runner, shards, durations_files):
+        """Return the test runner arguments of each shard, see `split_tests`.
+
+        `durations_files` are JUnit XML reports of previous runs, relative to
+        the repository.  Without them, the test modules are split by a hash
+        of their name.
+        """
+        if not shards:
+            return []
+        if not isinstance(shards, int) or shards < 1:
+            raise ValueError(
+                f"Invalid tox `test_shards` {shards!r}, use a number of shards."
+            )
+        if isinstance(durations_files, str):
+            durations_files = [durations_files] if durations_files else []
+        paths = []
+        for name in durations_files:
+            if (self.path / name).exists():
+                paths.append(self.path / name)
+            else:
+                self.print_warning(
+                    "Test shards", f"`test_durations` file {name} not found."
+                )
+        return split_tests(
+            self.path, test_path, runner, shards, read_test_durations(paths)
+        )
+
+    def _test_jobs(self, test_parallel, runner):
+        """Return the number of test processes for the test runner command.
+
+        `test_parallel` is `"auto"` or a number, the `TEST_JOBS` environment
+        variable overrides it when running tox.  `zope.testrunner` has no
+        automatic mode, use as many processes as GitHub runners have CPUs.
+        Return an empty string to run the tests in a single process.
+        """
+        if test_parallel in ("", False, 1):
+            return ""
+        if test_parallel == "auto":
+            default = "auto" if runner == "pytest" else "4"
+        elif isinstance(test_parallel, int) and test_parallel > 1:
+            default = str(test_parallel)
+        else:
+            raise ValueError(
+                f"Invalid tox `test_parallel` {test_parallel!r}, "
+                'use "auto" or a number of processes.'
+            )
+        return f"{{env:TEST_JOBS:{default}}}"
+
     def warn_on_setup_cfg(self):  # pragma: nocover
         """Warn if setup.cfg has sections that we define in other files"""
         setup_file = pathlib.Path(self.path / "setup.cfg")
@@ -405,9 +635,12 @@ class PackageConfiguration:
                 "flake8_extra_lines",
                 "extra_lines",
                 "i18ndude_extra_lines",
+                "ruff_extra_lines",
             ),
         )
 
+        options["profile"] = self._pre_commit_profile()
+        options["linter"] = self._linter()
         python_version = self._minimal_python_version()
         options["minimal_python_version"] = self._no_dot_python_version(python_version)
         options["check_python_versions_files"] = self._check_python_versions_files(
@@ -420,6 +653,26 @@ class PackageConfiguration:
             **options,
         )
 
+    def _linter(self):
+        """Return the configured `linter` of the Python code"""
+        linter = self.cfg_option("pre_commit", "linter", "") or "flake8"
+        if linter not in LINTERS:
+            raise ValueError(
+                f"Unknown pre_commit `linter` {linter!r}, "
+                f"use one of {', '.join(LINTERS)}."
+            )
+        return linter
+
+    def _pre_commit_profile(self):
+        """Return the configured `profile` of the pre-commit hooks"""
+        profile = self.cfg_option("pre_commit", "profile", "") or "full"
+        if profile not in PRE_COMMIT_PROFILES:
+            raise ValueError(
+                f"Unknown pre_commit `profile` {profile!r}, "
+                f"use one of {', '.join(PRE_COMMIT_PROFILES)}."
+            )
+        return profile
+
     def pyproject_toml(self):
         files = []
 
@@ -435,6 +688,7 @@ class PackageConfiguration:
                 "towncrier_extra_lines",
                 "isort_extra_lines",
                 "black_extra_lines",
+                "ruff_extra_lines",
                 "check_manifest_extra_lines",
                 "extra_lines",
             ),
@@ -443,6 +697,8 @@ class PackageConfiguration:
         python_version = self._minimal_python_version()
         options["minimal_python_version"] = self._no_dot_python_version(python_version)
         options["setuptools_upper_bound"] = self._setuptools_upper_bound()
+        options["linter"] = self._linter()
+        options["test_jobs"] = self._test_cfg()["test_jobs"]
 
         options["changes_extension"] = "rst"
         if (self.path / "CHANGES.md").exists():
@@ -454,11 +710,10 @@ class PackageConfiguration:
             options["news_folder_exists"] = True
             if options["changes_extension"] == "md":
                 destination = news / ".changelog_template.jinja"
-                shutil.copy(
-                    self.config_type_path / "changelog_template.jinja", destination
-                )
+                template = self.config_type_path / "changelog_template.jinja"
+                self._write(destination, template.read_text())
                 files.append(destination)
-            else:
+            elif self.rendered is None:
                 # only add the `.gitkeep` file if there is no jinja template
                 gitkeep = news / ".gitkeep"
                 gitkeep.touch(exist_ok=True)
@@ -498,6 +753,9 @@ class PackageConfiguration:
             (
                 "constrain_package_deps",
                 "constraints_files",
+                "constraints_cache",
+                "installer",
+                "shared_wheel",
                 "envlist_lines",
                 "testenv_options",
                 "use_mxdev",
@@ -532,6 +790,9 @@ class PackageConfiguration:
             options["use_pytest_plone"] = True
 
         options.update(self._handle_constraints_files(options))
+        options["installer"] = self._tox_installer()
+        options["pre_commit_profile"] = self._pre_commit_profile()
+        options["linter"] = self._linter()
         if options["use_test_matrix"] is not False:
             # Default is '', so turn it into True
             options["use_test_matrix"] = True
@@ -555,10 +816,10 @@ class PackageConfiguration:
             test_matrix = get_test_matrix(options.get("test_matrix"))
             plone_versions = list(test_matrix.keys())
 
-            single_constraints = f"-c https://dist.plone.org/release/{plone_versions[0]}-dev/constraints.txt"
+            single_url = constraints_url(plone_versions[0])
             if constraints:
                 first_plone_version = list(constraints.keys())[0]
-                single_constraints = f"-c {constraints[first_plone_version]}"
+                single_url = constraints[first_plone_version]
                 if len(test_matrix.keys()) != len(constraints.keys()):
                     raise ValueError(
                         "`constraints_files` and `test_matrix` need to provide the same Plone versions."
@@ -568,16 +829,45 @@ class PackageConfiguration:
             lines = []
             for plone_version in plone_versions:
                 no_dot = plone_version.replace(".", "")
-                url = f"https://dist.plone.org/release/{plone_version}-dev/constraints.txt"
+                url = constraints_url(plone_version)
                 if constraints:
                     url = constraints[plone_version]
-                lines.append(f"plone{no_dot}: -c {url}")
+                lines.append(f"plone{no_dot}: -c {self._constraints_location(url)}")
             constraints = "\n    ".join(lines)
+            single_constraints = f"-c {self._constraints_location(single_url)}"
         return {
             "constraints_file": constraints,
             "single_constraints_file": single_constraints,
         }
 
+    def _constraints_location(self, url):
+        """Return the cached copy of the constraints file `url`, if configured.
+
+        The `--constraints-cache` command line option wins over the
+        `constraints_cache` option of `.meta.toml`.
+        """
+        cache = getattr(self.args, "constraints_cache", None)
+        cache = cache or self.cfg_option("tox", "constraints_cache", "")
+        if not cache:
+            return url
+        return cached_location(url, cache)
+
+    def _tox_installer(self):
+        """Return the configured `installer` of tox environments"""
+        installer = self.cfg_option("tox", "installer", "") or "pip"
+        if installer not in TOX_INSTALLERS:
+            raise ValueError(
+                f"Unknown tox `installer` {installer!r}, "
+                f"use one of {', '.join(TOX_INSTALLERS)}."
+            )
+        return installer
+
+    def _tox_path(self, path):
+        """Return `path` for `tox.ini`, relative ones to the repository"""
+        if not path or pathlib.PurePath(path).is_absolute():
+            return path
+        return f"{{toxinidir}}/{path}"
+
     def _normalized_python_version(self, python_version):
         """Return a normalized python version string.
 
@@ -606,16 +896,20 @@ class PackageConfiguration:
         }
 
         Or the default `TOX_TEST_MATRIX` is used.
+
+        tox always lists all combinations, whatever `matrix_strategy` is used
+        on CI, so that any of them can be run locally.
         """
         lines = []
         matrix = get_test_matrix(test_matrix)
-        for plone_version, python_versions in matrix.items():
-            no_dot_plone = plone_version.replace(".", "")
-            for python_version in python_versions:
-                no_dot_python = self._no_dot_python_version(python_version)
-                lines.append(f"{no_dot_python}-plone{no_dot_plone}")
+        for plone_version, python_version in matrix_cells(matrix, "full"):
+            lines.append(self._tox_env_name(plone_version, python_version))
         return "\n    ".join(lines)
 
+    def _tox_env_name(self, plone_version, python_version):
+        """Return the name of the tox environment, like `py313-plone62`"""
+        return tox_env_name(plone_version, python_version)
+
     def _detect_robotframework(self):
         """Dynamically find out if robotframework is used in the package.
 
@@ -666,7 +960,6 @@ class PackageConfiguration:
             return files
         github_folder = self.path / ".github"
         workflows_folder = github_folder / "workflows"
-        workflows_folder.mkdir(parents=True, exist_ok=True)
         destination = workflows_folder / "meta.yml"
         options = self._get_options_for(
             "github",
@@ -677,12 +970,29 @@ class PackageConfiguration:
                 "os_dependencies",
                 "extra_lines",
                 "extra_lines_after_os_dependencies",
+                "prebuilt_images",
+                "cancel_in_progress",
+                "fail_fast",
             ),
         )
         if not options.get("ref"):
             options["ref"] = GHA_DEFAULT_REF
-        if not options.get("jobs"):
-            options["jobs"] = GHA_DEFAULT_JOBS
+        # Work on a copy: the coverage job may move to test-matrix.yml.
+        options["jobs"] = list(options.get("jobs") or GHA_DEFAULT_JOBS)
+        use_test_matrix_options = self._get_options_for("tox", ("use_test_matrix",))
+        use_test_matrix = use_test_matrix_options["use_test_matrix"] is not False
+        options["paths_ignore"] = self._test_paths_ignore("github")
+        # Path filters apply to whole workflows: the coverage job runs with
+        # the test matrix, so that QA jobs still run for any change.
+        options["coverage_job"] = (
+            use_test_matrix
+            and bool(options["paths_ignore"])
+            and "coverage" in options["jobs"]
+        )
+        if options["coverage_job"]:
+            options["jobs"].remove("coverage")
+        options["shard_numbers"] = self._shard_numbers()
+        options["coverage_image"] = self._coverage_image(options["prebuilt_images"])
         meta_file = self.copy_with_meta(
             "meta.yml.j2", destination=destination, **options
         )
@@ -698,9 +1008,12 @@ class PackageConfiguration:
                 "A `dependabot.yml` file at the top-level was found, please remove it",
             )
 
-        use_test_matrix_options = self._get_options_for("tox", ("use_test_matrix",))
-        if use_test_matrix_options["use_test_matrix"] is not False:
+        if use_test_matrix:
             options["gh_config_lines"] = self.handle_gh_actions()
+            options["gh_config_expression"] = self._gh_matrix_expression()
+            options["with_pypy"] = self._test_matrix_has_pypy()
+            options["affected_tests"] = self._test_cfg()["affected_tests"]
+            options["cache"] = self.cfg_option("github", "cache", True)
             testing_file = self.copy_with_meta(
                 "test-matrix.yml.j2",
                 destination=workflows_folder / "test-matrix.yml",
@@ -721,6 +1034,7 @@ class PackageConfiguration:
             (
                 "test_matrix",
                 "use_test_matrix",
+                "matrix_strategy",
             ),
         )
         combinations = []
@@ -728,24 +1042,66 @@ class PackageConfiguration:
         if options["use_test_matrix"] is False:
             return combinations
         test_matrix = get_test_matrix(options.get("test_matrix"))
-        for plone_version, python_versions in test_matrix.items():
-            no_dot_plone = plone_version.replace(".", "")
-            # Only test the lowest and highest Python version for a given Plone
-            # version.  But always include any PyPy versions in the list.
-            pypy_versions = [v for v in python_versions if v.startswith("pypy")]
-            standard_versions = [v for v in python_versions if not v.startswith("pypy")]
-            selected_versions = {standard_versions[0], standard_versions[-1]}
-            if pypy_versions:
-                selected_versions.update(pypy_versions)
-            sorted_versions = sorted(selected_versions, reverse=True)
-            for py_version in sorted_versions:
-                normalized_python = self._normalized_python_version(py_version)
-                no_dot_python = self._no_dot_python_version(normalized_python)
-                combinations.append(
-                    f'["{py_version}", "{plone_version} on {normalized_python}", "{no_dot_python}-plone{no_dot_plone}"]'
-                )
+        for cell in matrix_cells(test_matrix, options["matrix_strategy"]):
+            combinations.append(json.dumps(self._gh_combination(*cell)))
         return "\n        - ".join(combinations)
 
+    def _test_matrix_has_pypy(self):
+        """Whether the test matrix has a PyPy version, like `pypy3.10`"""
+        options = self._get_options_for("tox", ("test_matrix",))
+        test_matrix = get_test_matrix(options.get("test_matrix"))
+        return any(
+            version.startswith("pypy")
+            for versions in test_matrix.values()
+            for version in versions
+        )
+
+    def _coverage_image(self, prefix):
+        """Return the CI image the shared coverage workflow runs in, if any
+
+        All images of the test matrix hold the same OS packages and the
+        workflow installs its own Python, so the oldest CPython one does.
+        """
+        if not prefix:
+            return ""
+        options = self._get_options_for("tox", ("test_matrix",))
+        test_matrix = get_test_matrix(options.get("test_matrix"))
+        versions = {
+            version
+            for versions in test_matrix.values()
+            for version in versions
+            if not version.startswith("pypy")
+        }
+        oldest = min(versions, key=lambda version: tuple(map(int, version.split("."))))
+        return prebuilt_image(prefix, oldest)
+
+    def _gh_combination(self, plone_version, python_version):
+        """Return the [Python version, visual name, tox env] of a matrix entry"""
+        normalized_python = self._normalized_python_version(python_version)
+        return [
+            python_version,
+            f"{plone_version} on {normalized_python}",
+            self._tox_env_name(plone_version, python_version),
+        ]
+
+    def _gh_matrix_expression(self):
+        """Return a GitHub expression selecting the matrix by branch.
+
+        Only used by the split `matrix_strategy`: the full matrix runs on the
+        default branch and the minimal one on any other branch.
+        Otherwise return an empty string.
+        """
+        options = self._get_options_for("tox", ("test_matrix", "matrix_strategy"))
+        test_matrix = get_test_matrix(options.get("test_matrix"))
+        main_cells = default_branch_cells(test_matrix, options["matrix_strategy"])
+        if main_cells is None:
+            return ""
+        branch_cells = matrix_cells(test_matrix, options["matrix_strategy"])
+        main = json.dumps([self._gh_combination(*cell) for cell in main_cells])
+        branch = json.dumps([self._gh_combination(*cell) for cell in branch_cells])
+        is_main = "github.ref == format('refs/heads/{0}', github.event.repository.default_branch)"
+        return f"${{{{ fromJSON({is_main} && '{main}' || '{branch}') }}}}"
+
     def gitlab_ci(self):
         if not self.is_gitlab:
             return []
@@ -756,12 +1112,30 @@ class PackageConfiguration:
                 "os_dependencies",
                 "extra_lines",
                 "jobs",
+                "prebuilt_images",
+                "cancel_in_progress",
+                "fail_fast",
             ),
         )
+        if options["prebuilt_images"]:
+            # The OS packages are part of the images.
+            options["os_dependencies"] = ""
         options.update(self._gitlab_testing_matrix(options["custom_images"]))
         options["destination"] = self.path / ".gitlab-ci.yml"
-        if not options.get("jobs"):
-            options["jobs"] = GITLAB_DEFAULT_JOBS
+        # Work on a copy: the list gets modified below, and that must change
+        # neither the defaults nor `.meta.toml`.
+        options["jobs"] = list(options.get("jobs") or GITLAB_DEFAULT_JOBS)
+        options["shard_numbers"] = self._shard_numbers()
+        options["affected_tests"] = self._test_cfg()["affected_tests"]
+        options["cache"] = self.cfg_option("gitlab", "cache", True)
+        options["needs"] = self._gitlab_needs(options["jobs"])
+        options["test_changes"] = self._gitlab_test_changes()
+        if self._tox_installer() == "uv":
+            options["install_tox"] = "pip install uv"
+            options["tox_command"] = "uvx --with tox-uv tox"
+        else:
+            options["install_tox"] = "pip install tox-uv"
+            options["tox_command"] = "tox"
 
         # on _gitlab_testing_matrix we already check if the user
         # wants to use the testing matrix
@@ -771,12 +1145,72 @@ class PackageConfiguration:
 
         return self.copy_with_meta("gitlab-ci.yml.j2", **options)
 
+    def _test_paths_ignore(self, section):
+        """Return the globs of `test_paths_ignore` of a CI section.
+
+        `true` stands for `DOC_PATHS`.
+        """
+        paths = self.cfg_option(section, "test_paths_ignore", False)
+        if paths is True:
+            return list(DOC_PATHS)
+        if not paths:
+            return []
+        if not isinstance(paths, list):
+            raise ValueError(
+                f"Invalid {section} `test_paths_ignore` {paths!r}, "
+                "use true or a list of globs."
+            )
+        return paths
+
+    def _gitlab_test_changes(self):
+        """Return the YAML list of paths whose changes run the test jobs.
+
+        GitLab cannot exclude paths from `rules:changes`, so the top-level
+        files and directories not matching `test_paths_ignore` are listed.
+        """
+        ignored = self._test_paths_ignore("gitlab")
+        if not ignored:
+            return ""
+        patterns = ignored + [path.removeprefix("**/") for path in ignored]
+        paths = []
+        for entry in sorted(self.path.iterdir()):
+            name = entry.name
+            if entry.is_dir():
+                if name.startswith(".") or name in IGNORED_DIRECTORIES:
+                    continue
+                if name.endswith(".egg-info"):
+                    continue
+                candidate, path = f"{name}/file", f"{name}/**/*"
+            else:
+                candidate, path = name, name
+            if not any(fnmatch.fnmatch(candidate, pattern) for pattern in patterns):
+                paths.append(path)
+        return "\n".join(f"        - {json.dumps(path)}" for path in paths)
+
+    def _gitlab_needs(self, jobs):
+        """Return the `needs` of the test jobs for the configured `pipeline`.
+
+        An empty string keeps the order of the stages.
+        """
+        pipeline = self.cfg_option("gitlab", "pipeline", "") or "stages"
+        if pipeline not in GITLAB_PIPELINES:
+            raise ValueError(
+                f"Unknown gitlab `pipeline` {pipeline!r}, "
+                f"use one of {', '.join(GITLAB_PIPELINES)}."
+            )
+        if pipeline == "stages":
+            return ""
+        if pipeline == "lint-gate" and "lint" in jobs:
+            return json.dumps(["lint"])
+        return json.dumps([])
+
     def _gitlab_testing_matrix(self, custom_images):
         options = self._get_options_for(
             "tox",
             (
                 "test_matrix",
                 "use_test_matrix",
+                "matrix_strategy",
             ),
         )
         combinations = []
@@ -784,29 +1218,48 @@ class PackageConfiguration:
         if options["use_test_matrix"] is False:
             return combinations
         test_matrix = get_test_matrix(options.get("test_matrix"))
+        cells = matrix_cells(test_matrix, options["matrix_strategy"])
+        main_cells = default_branch_cells(test_matrix, options["matrix_strategy"])
         image = ""
-        for plone_version, python_versions in test_matrix.items():
-            no_dot_plone = plone_version.replace(".", "")
-            top_bottom_versions = {python_versions[0], python_versions[-1]}
-            sorted_versions = sorted(top_bottom_versions, reverse=True)
-            for py_version in sorted_versions:
-                no_dot_python = self._no_dot_python_version(py_version)
-                image = DOCKER_IMAGES.get(py_version)
-                if custom_images:
-                    image = custom_images.get(py_version)
-                if not image:
-                    raise ValueError(
-                        f"There is no Docker image defined for Python {py_version}. "
-                        "Either provide it in the `custom_images` option or report an issue to `plone.meta`."
-                    )
-
-                combinations.append((image, f"{no_dot_python}-plone{no_dot_plone}"))
+        for plone_version, py_version in cells:
+            image = self._gitlab_image(py_version, custom_images)
+            combinations.append((image, self._tox_env_name(plone_version, py_version)))
+        main_combinations = []
+        for plone_version, py_version in main_cells or []:
+            main_combinations.append(
+                (
+                    self._gitlab_image(py_version, custom_images),
+                    self._tox_env_name(plone_version, py_version),
+                )
+            )
         return {
             "testing_matrix": combinations,
+            "testing_matrix_main": main_combinations,
             "custom_image": image,
         }
 
+    def _gitlab_image(self, py_version, custom_images):
+        prefix = self.cfg_option("gitlab", "prebuilt_images", "")
+        if prefix:
+            return prebuilt_image(prefix, py_version)
+        image = DOCKER_IMAGES.get(py_version)
+        if custom_images:
+            image = custom_images.get(py_version)
+        if not image:
+            raise ValueError(
+                f"There is no Docker image defined for Python {py_version}. "
+                "Either provide it in the `custom_images` option or report an issue to `plone.meta`."
+            )
+        return image
+
     def flake8(self):
+        if self._linter() == "ruff":
+            if (self.path / ".flake8").exists():
+                self.print_warning(
+                    "Linter configuration",
+                    "ruff is configured in pyproject.toml, please remove .flake8",
+                )
+            return []
         options = self._get_options_for("flake8", ("extra_lines",))
         destination = self.path / ".flake8"
         return self.copy_with_meta("flake8.j2", destination=destination, **options)
@@ -817,7 +1270,34 @@ class PackageConfiguration:
         """Copy the source file to destination and a hint of origin.
 
         If kwargs are given they are used as template arguments.
+
+        The file is not rendered again if it was not modified and its inputs
+        did not change since the last run, see `_inputs_hash`.
         """
+        if destination is None:
+            if template_name.endswith(".j2"):
+                destination = self.path / template_name[:-3]  # remove `.j2`
+            else:
+                destination = self.path / template_name
+
+        relative = destination.relative_to(self.path)
+        inputs_hash = self._inputs_hash(template_name, meta_hint, kw)
+        meta = self.meta_cfg["meta"]
+        if (
+            self.rendered is None
+            and not self.args.force
+            and self._recorded("inputs", relative) == inputs_hash
+            and self._unmodified(relative)
+        ):
+            print(f"{relative} is up to date.")
+            self.up_to_date.add(relative)
+            meta.setdefault("checksums", {})[str(relative)] = self._recorded(
+                "checksums", relative
+            )
+            meta.setdefault("inputs", {})[str(relative)] = inputs_hash
+            return relative
+        meta.setdefault("inputs", {})[str(relative)] = inputs_hash
+
         template = self.jinja_env.get_template(template_name)
         rendered = template.render(config_type=self.config_type, **kw)
         meta_hint = meta_hint.format(config_type=self.config_type)
@@ -827,22 +1307,67 @@ class PackageConfiguration:
         else:
             content = "\n".join([meta_hint, rendered])
 
-        if destination is None:
-            if template_name.endswith(".j2"):
-                destination = self.path / template_name[:-3]  # remove `.j2`
-            else:
-                destination = self.path / template_name
-
         # Get rid of spaces on lines with only spaces, like happens in the generated
         # tox.ini
         content = re.sub(r" +\n", r"\n", content)
 
         # Get rid of empty lines at the end.
         content = content.strip() + "\n"
+        return self._write(destination, content)
+
+    def _inputs_hash(self, template_name, meta_hint, kw):
+        """Return a hash of everything a generated file is made of.
+
+        That is the `plone.meta` version, the template and all the templates
+        it includes, and the template arguments, which already contain the
+        options from `.meta.toml` and the facts detected in the repository.
+        """
+        import jinja2.meta
+
+        digest = hashlib.sha256()
+        digest.update(self._get_version().encode())
+        digest.update(self.config_type.encode())
+        digest.update(meta_hint.encode())
+        pending = [template_name]
+        seen = set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            source, _, _ = self.jinja_env.loader.get_source(self.jinja_env, name)
+            digest.update(name.encode())
+            digest.update(source.encode())
+            referenced = jinja2.meta.find_referenced_templates(
+                self.jinja_env.parse(source)
+            )
+            pending.extend(ref for ref in referenced if ref is not None)
+        digest.update(json.dumps(kw, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _unmodified(self, relative):
+        """Whether the file matches the checksum recorded when it was written"""
+        destination = self.path / relative
+        recorded = self._recorded("checksums", relative)
+        return destination.exists() and recorded == checksum(destination.read_text())
+
+    def _write(self, destination, content):
+        """Write `content` to `destination`, or collect it when rendering.
+
+        The checksum of `content` is recorded for `config-package --check`.
+
+        Return the path of `destination` relative to the repository.
+        """
+        relative = destination.relative_to(self.path)
+        if self.rendered is not None:
+            self.rendered[str(relative)] = content
+            return relative
+        checksums = self.meta_cfg["meta"].setdefault("checksums", {})
+        checksums[str(relative)] = checksum(content)
+        destination.parent.mkdir(parents=True, exist_ok=True)
         with open(destination, "w") as f_:
             f_.write(content)
-
-        return destination.relative_to(self.path)
+        return relative
 
     def remove_old_files(self):
         filenames = ("bootstrap.py", ".travis.yml")
@@ -859,14 +1384,90 @@ class PackageConfiguration:
                 meta_f.write("\n")
                 tomlkit.dump(meta_cfg, meta_f)
 
-    def run_tox(self):
+    def _linter_changed(self):
+        """Whether this run switched between ruff and isort, black and flake8.
+
+        Only the latter get a `.flake8` file.  Without files recorded by a
+        previous run, the linter is taken as unchanged.
+        """
+        previous = self.previous_tables["checksums"]
+        if not previous:
+            return False
+        return (".flake8" in previous) != (self._linter() != "ruff")
+
+    def _lint_files(self, files):
+        """Return the files written by this run, relative to the repository.
+
+        The configuration files of the hooks, like `.pre-commit-config.yaml`,
+        are rewritten by every upgrade of plone.meta, they do not need a full
+        lint.  `.meta.toml`, saved by every run, is left out: no hook checks
+        it.  Return `None` if the linter changed, see `_linter_changed`.
+        """
+        if self._linter_changed():
+            return None
+        written = []
+        for file_obj in files:
+            file_obj = pathlib.Path(file_obj)
+            if file_obj in self.up_to_date:
+                continue
+            if file_obj.is_absolute():
+                file_obj = file_obj.relative_to(self.path)
+            if file_obj == pathlib.Path(".meta.toml"):
+                continue
+            written.append(file_obj.as_posix())
+        return sorted(set(written))
+
+    def run_tox(self, files=None):
+        """Run the `format` and `lint` tox environments.
+
+        With `files`, the files of this run, run the pre-commit hooks on the
+        written ones only, unless the linter changed.
+        """
+        if files is not None:
+            files = self._lint_files(files)
+            if files == []:
+                print("No files written, nothing to lint.")
+                return
         with change_dir(self.path) as cwd:
-            tox_path = shutil.which("tox") or (pathlib.Path(cwd) / "bin" / "tox")
-            call(tox_path, "-e", "format,lint")
+            tox_command = [shutil.which("tox") or (pathlib.Path(cwd) / "bin" / "tox")]
+            uvx_path = shutil.which("uvx")
+            if self._tox_installer() == "uv" and uvx_path:
+                # Like the shared GitHub workflows do.
+                tox_command = [uvx_path, "--with", "tox-uv", "tox"]
+            env = None
+            wheelhouse = getattr(self.args, "wheelhouse", None)
+            wheelhouse = find_wheelhouse(
+                self.path,
+                (
+                    pathlib.Path(cwd) / wheelhouse
+                    if wheelhouse
+                    else self.cfg_option("tox", "wheelhouse", "")
+                ),
+            )
+            if wheelhouse:
+                # The hooks of pre-commit are no wheels, keep the index.
+                env = wheelhouse_env(wheelhouse, no_index=False)
+            if files is None:
+                call(*tox_command, "-e", "format,lint", env=env)
+            else:
+                call(
+                    *tox_command,
+                    "exec",
+                    "-e",
+                    "lint",
+                    "--",
+                    "pre-commit",
+                    "run",
+                    "--files",
+                    *files,
+                    env=env,
+                )
 
     def validate_files(self, files_changed):
         """Ensure that files are not broken"""
         for file_obj in files_changed:
+            if file_obj in self.up_to_date:
+                continue
             if file_obj.suffix == ".toml":
                 self._validate_toml(file_obj)
             elif file_obj.suffix in (".yaml", ".yml"):
@@ -884,11 +1485,15 @@ class PackageConfiguration:
                 data = tomlkit.load(meta_f)
 
             if self.path.stem == "pyproject":
+                import validate_pyproject
+
                 validator = validate_pyproject.api.Validator()
                 validator(data)
 
     def _validate_yaml(self, file_obj):
         """Validate files that are in YAML format"""
+        import yaml
+
         with change_dir(self.path):
             data = file_obj.read_text()
             _ = yaml.safe_load(data)
@@ -901,6 +1506,8 @@ class PackageConfiguration:
 
     def _validate_editorconfig(self, file_obj):
         """Validate .editorconfig file"""
+        import editorconfig
+
         with change_dir(self.path):
             editorconfig.get_properties(file_obj.resolve())
 
@@ -918,6 +1525,77 @@ class PackageConfiguration:
             if self.args.push:
                 call("git", "push", "--set-upstream", "origin", self.branch_name)
 
+    def _watched_files(self):
+        """Files that affect the generated files: `.meta.toml` and templates"""
+        files = [self.path / ".meta.toml"]
+        for folder in dict.fromkeys((self.config_type_path, self.default_path)):
+            files.extend(sorted(folder.iterdir()))
+        return files
+
+    def _mtimes(self):
+        return {
+            file_obj: file_obj.stat().st_mtime_ns
+            for file_obj in self._watched_files()
+            if file_obj.exists()
+        }
+
+    def _reload_meta_configuration(self):
+        """Read `.meta.toml` again, keeping what was recorded in this session"""
+        meta = self.meta_cfg["meta"]
+        self.meta_cfg = self._read_meta_configuration()
+        for key in ("template", "commit-id", *RECORDED_TABLES):
+            if key in meta:
+                self.meta_cfg["meta"][key] = meta[key]
+        self._start_recording()
+
+    def watch_step(self, mtimes):
+        """Render the affected files if any watched file changed since `mtimes`.
+
+        The recorded tables are saved to `.meta.toml`, so that
+        `config-package --check` and the next run know the written files.
+        Return the new modification times and the files written.
+        """
+        new_mtimes = self._mtimes()
+        if new_mtimes == mtimes:
+            return mtimes, []
+        self._reload_meta_configuration()
+        self.up_to_date = set()
+        written = []
+        for method in self.generators:
+            files = method()
+            if not isinstance(files, list):
+                files = [files]
+            written.extend(
+                pathlib.Path(file_obj)
+                for file_obj in files
+                if file_obj and file_obj not in self.up_to_date
+            )
+        if written:
+            self.remove_toml_empty_sections()
+            # Saving `.meta.toml` here must not start another step.
+            new_mtimes = self._mtimes()
+        return new_mtimes, written
+
+    def watch(self, interval=0.1):  # pragma: nocover
+        """Render the affected files whenever `.meta.toml` or a template changes.
+
+        The process, and thus the Jinja environment, is kept warm, and the
+        recorded input hashes make sure only the affected files are rendered.
+        """
+        print("Watching .meta.toml and the templates, press Ctrl+C to stop.")
+        mtimes = {}
+        while True:
+            try:
+                mtimes, written = self.watch_step(mtimes)
+            except Exception as exc:
+                # Likely a half-saved file, keep watching.
+                print(f"*** Rendering failed: {exc}")
+                mtimes = self._mtimes()
+                written = []
+            for file_obj in written:
+                print(f"Rendered {file_obj}")
+            time.sleep(interval)
+
     @staticmethod
     def final_help_tips(updating):
         print()
@@ -927,24 +1605,41 @@ class PackageConfiguration:
         else:
             print("Create a PR, using the URL shown above.")
 
-    def configure(self):
-        if self.args.track_package:
-            self._add_project_to_config_type_list()
-
-        files_changed = [
-            self.path / ".meta.toml",
-        ]
-        methods = (
+    @property
+    def generators(self):
+        """Methods generating configuration files out of the templates"""
+        return (
             self.editorconfig,
             self.gitignore,
             self.pre_commit_config,
             self.pyproject_toml,
             self.tox,
-            self.news_entry,
             self.flake8,
             self.gha_workflows,
             self.gitlab_ci,
         )
+
+    def render(self):
+        """Render all generated files in memory, without touching the repository.
+
+        Return a dictionary of relative paths and their would-be content.
+        """
+        self.rendered = {}
+        try:
+            for method in self.generators:
+                method()
+            return self.rendered
+        finally:
+            self.rendered = None
+
+    def configure(self):
+        if self.args.track_package:
+            self._add_project_to_config_type_list()
+
+        files_changed = [
+            self.path / ".meta.toml",
+        ]
+        methods = self.generators + (self.news_entry,)
         for method in methods:
             files = method()
             if isinstance(files, list):
@@ -956,7 +1651,10 @@ class PackageConfiguration:
         self.remove_old_files()
         self.remove_toml_empty_sections()
         if self.args.run_tox:
-            self.run_tox()
+            if getattr(self.args, "full_lint", False):
+                self.run_tox()
+            else:
+                self.run_tox(files_changed)
 
         with change_dir(self.path):
             updating = git_branch(self.branch_name)
@@ -969,6 +1667,14 @@ class PackageConfiguration:
 
 def main():
     args = handle_command_line_arguments()
+    if args.check:
+        sys.exit(check(args.path.absolute()))
 
     package = PackageConfiguration(args)
+    if args.watch:  # pragma: nocover
+        try:
+            package.watch()
+        except KeyboardInterrupt:
+            print()
+        return
     package.configure()
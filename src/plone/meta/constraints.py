@@ -0,0 +1,150 @@
+"""Keep local copies of pip constraints files.
+
+The files are stored below the cache directory following their URL, like
+`dist.plone.org/release/6.2-dev/constraints.txt`, so that the location of a
+cached copy can be computed without fetching anything.
+Nested `-c`/`-r` includes are fetched as well and rewritten to point to
+their cached copies.
+"""
+
+from urllib.parse import urljoin
+from urllib.parse import urlparse
+
+import argparse
+import os
+import pathlib
+import re
+
+CONSTRAINTS_BASE_URL = "https://dist.plone.org/release"
+
+INCLUDE = re.compile(
+    r"^(?P<option>\s*(?:-c|-r|--constraint|--requirement)(?:\s+|=))"
+    r"(?P<location>\S+)(?P<rest>.*)$"
+)
+
+
+def constraints_url(plone_version, base_url=CONSTRAINTS_BASE_URL):
+    """Return the URL of the constraints file of a Plone version"""
+    return f"{base_url.rstrip('/')}/{plone_version}-dev/constraints.txt"
+
+
+def _as_url(location):
+    """Return `location` as a URL, turning local paths into `file:` URLs"""
+    location = str(location)
+    if urlparse(location).scheme in ("http", "https", "file"):
+        return location
+    return pathlib.Path(location).absolute().as_uri()
+
+
+def cache_path(location):
+    """Return the path of the cached copy of `location`, below the cache"""
+    parsed = urlparse(_as_url(location))
+    if parsed.scheme == "file":
+        return pathlib.PurePosixPath("local", parsed.path.lstrip("/"))
+    return pathlib.PurePosixPath(parsed.netloc, parsed.path.lstrip("/"))
+
+
+def cached_location(location, cache_dir):
+    """Return where `location` is found in `cache_dir`, see `cache_path`"""
+    return str(pathlib.PurePosixPath(cache_dir) / cache_path(location))
+
+
+def fetch(url, mirror=None):
+    """Return the content of a `http(s):` or `file:` URL.
+
+    With a `mirror` URL or local directory, files below
+    `CONSTRAINTS_BASE_URL` are fetched from there instead.
+    """
+    if mirror and url.startswith(f"{CONSTRAINTS_BASE_URL}/"):
+        relative = url[len(CONSTRAINTS_BASE_URL) :]
+        url = _as_url(mirror).rstrip("/") + relative
+    # Not needed by `config-package --check`, which must start fast.
+    from urllib.request import urlopen
+
+    with urlopen(url, timeout=60) as response:
+        return response.read().decode()
+
+
+def cache_constraints(location, cache_dir, refresh=False, mirror=None, _seen=None):
+    """Store the file at `location` and all files it includes in `cache_dir`.
+
+    `location` is a URL or a local path, see `fetch` for `mirror`.
+    Files already in the cache are pinned: they are only fetched again with
+    `refresh`.
+
+    Return the path of the cached copy.
+    """
+    url = _as_url(location)
+    destination = cache_dir / cache_path(url)
+    _seen = set() if _seen is None else _seen
+    if url in _seen or (destination.exists() and not refresh):
+        return destination
+    _seen.add(url)
+    lines = []
+    for line in fetch(url, mirror).splitlines():
+        match = INCLUDE.match(line)
+        if match:
+            nested = cache_constraints(
+                urljoin(url, match["location"]), cache_dir, refresh, mirror, _seen
+            )
+            relative = os.path.relpath(nested, destination.parent)
+            line = f"{match['option']}{relative}{match['rest']}"
+        lines.append(line)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.write_text("\n".join(lines) + "\n")
+    return destination
+
+
+def main():  # pragma: nocover
+    from .config_package import TOX_TEST_MATRIX
+
+    parser = argparse.ArgumentParser(
+        description="Fetch the pip constraints files of Plone versions, including "
+        "the files they include, into a local directory. "
+        "Use it in tox.ini with the `constraints_cache` option.",
+    )
+    parser.add_argument(
+        "cache_dir",
+        type=pathlib.Path,
+        help="path to the directory storing the constraints files",
+    )
+    parser.add_argument(
+        "plone_versions",
+        nargs="*",
+        help="Plone versions to fetch the constraints of. "
+        f"Default: {', '.join(TOX_TEST_MATRIX)}.",
+        metavar="plone_version",
+    )
+    parser.add_argument(
+        "--url",
+        dest="urls",
+        action="append",
+        default=[],
+        help="Fetch this constraints file too, "
+        "for example one listed in `constraints_files`. Can be given multiple times.",
+    )
+    parser.add_argument(
+        "--mirror",
+        dest="mirror",
+        default=None,
+        help=f"URL or local directory to fetch the files below {CONSTRAINTS_BASE_URL} "
+        "from. They are cached as if fetched from the original location.",
+    )
+    parser.add_argument(
+        "--refresh",
+        dest="refresh",
+        action="store_true",
+        default=False,
+        help="Fetch the files again, even if they are already in the cache.",
+    )
+    args = parser.parse_args()
+
+    locations = [
+        constraints_url(plone_version)
+        for plone_version in args.plone_versions or TOX_TEST_MATRIX
+    ]
+    for location in locations + args.urls:
+        destination = cache_constraints(
+            location, args.cache_dir, args.refresh, args.mirror
+        )
+        print(f"{location} -> {destination}")
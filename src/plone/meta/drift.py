@@ -0,0 +1,133 @@
+from .config_package import handle_command_line_arguments
+from .config_package import PackageConfiguration
+from .shared.packages import list_packages
+from .shared.path import path_factory
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import version
+
+import argparse
+import contextlib
+import io
+import jinja2
+import os
+import sys
+import tomllib
+
+
+def recorded_version(path):
+    """Return the `plone.meta` version recorded in `.meta.toml`, if any."""
+    meta_toml = path / ".meta.toml"
+    if not meta_toml.exists():
+        return ""
+    with open(meta_toml, "rb") as meta_f:
+        meta_cfg = tomllib.load(meta_f)
+    return meta_cfg.get("meta", {}).get("commit-id", "")
+
+
+def stale_files(path, rendered):
+    """Return the relative paths whose content on disk differs from `rendered`"""
+    stale = []
+    for relative, content in sorted(rendered.items()):
+        destination = path / relative
+        if not destination.exists() or destination.read_text() != content:
+            stale.append(relative)
+    return stale
+
+
+def render_package(path, templates_path=None):
+    """Render all generated files of the repository at `path` in memory.
+
+    Use the templates in `templates_path` instead of the installed ones,
+    if given. They are rendered with the options of the installed
+    `plone.meta`, so a variable they use but these options lack raises a
+    `jinja2.UndefinedError` instead of silently rendering as empty.
+    """
+    args = handle_command_line_arguments([str(path), "--no-commit"])
+    # Warnings are meant for a configuration run, not for a report.
+    with contextlib.redirect_stdout(io.StringIO()):
+        package = PackageConfiguration(args)
+        if templates_path is not None:
+            package.templates_path = templates_path
+            package.jinja_env.undefined = jinja2.StrictUndefined
+        return package.render()
+
+
+def package_drift(path):
+    """Render all generated files of `path` in memory and compare them.
+
+    Nothing is written, no branch is switched and no tox is run.
+
+    Return a tuple of package name, recorded version, list of stale files and
+    an error message (empty if everything went fine).
+    """
+    path = path.absolute()
+    if not (path / ".git").exists():
+        return (path.name, "", [], "no git clone found")
+    try:
+        rendered = render_package(path)
+    except Exception as exc:
+        return (path.name, recorded_version(path), [], str(exc))
+    return (path.name, recorded_version(path), stale_files(path, rendered), "")
+
+
+def format_report(results, current_version):
+    """Format the results of `package_drift` as a plain text table"""
+    headers = ("package", "recorded", "stale files")
+    rows = []
+    for name, recorded, stale, error in results:
+        recorded = recorded or "-"
+        if recorded != current_version:
+            recorded = f"{recorded} (!)"
+        if error:
+            details = f"ERROR: {error}"
+        else:
+            details = ", ".join(stale) or "-"
+        rows.append((name, recorded, details))
+    name_width = max([len(headers[0])] + [len(row[0]) for row in rows])
+    version_width = max([len(headers[1])] + [len(row[1]) for row in rows])
+    lines = []
+    for name, recorded, details in [headers] + rows:
+        lines.append(
+            f"{name:<{name_width}}  {recorded:<{version_width}}  {details}".rstrip()
+        )
+    return "\n".join(lines)
+
+
+def main():  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        description="Report which generated files of the repositories listed in "
+        "a packages.txt are out of date, without modifying them.",
+    )
+    parser.add_argument(
+        "packages_txt",
+        type=path_factory("packages.txt", has_extension=".txt"),
+        help="path to packages.txt; every repository listed inside is checked",
+        metavar="packages.txt",
+    )
+    parser.add_argument(
+        "clones",
+        type=path_factory("clones", is_dir=True),
+        help="path to the directory where the clones of the repositories are stored",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of packages rendered in parallel. Default: number of CPUs.",
+    )
+    args = parser.parse_args()
+
+    paths = [args.clones / package for package in list_packages(args.packages_txt)]
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(package_drift, paths))
+
+    current_version = version("plone.meta")
+    print(f"Templates of plone.meta {current_version}")
+    print("(!) marks packages last configured with another version.")
+    print()
+    print(format_report(results, current_version))
+
+    if any(stale or error for _, _, stale, error in results):
+        sys.exit(1)
@@ -0,0 +1,129 @@
+"""Select which Plone and Python version combinations get tested.
+
+All generated test matrices (tox, GitHub Actions and GitLab CI) go through
+`matrix_cells`, so that they agree on what a strategy means.
+"""
+
+DEFAULT_STRATEGY = "edges"
+# Run the `pairwise` selection on branches and the `full` one on the default
+# branch.
+SPLIT_STRATEGY = "minimal-on-PR"
+STRATEGIES = ("full", "edges", "pairwise", SPLIT_STRATEGY)
+
+
+def tox_env_name(plone_version, python_version):
+    """Return the name of the tox environment, like `py313-plone62`"""
+    if not python_version.startswith("py"):
+        python_version = f"py{python_version}"
+    no_dot_plone = plone_version.replace(".", "")
+    no_dot_python = python_version.replace(".", "")
+    return f"{no_dot_python}-plone{no_dot_plone}"
+
+
+def _is_pypy(python_version):
+    return python_version.startswith("pypy")
+
+
+def _full(test_matrix):
+    return [
+        (plone_version, python_version)
+        for plone_version, python_versions in test_matrix.items()
+        for python_version in python_versions
+    ]
+
+
+def _edges(test_matrix):
+    """The lowest and highest Python version for each Plone version.
+
+    PyPy versions are always included.
+    """
+    cells = []
+    for plone_version, python_versions in test_matrix.items():
+        pypy_versions = [v for v in python_versions if _is_pypy(v)]
+        standard_versions = [v for v in python_versions if not _is_pypy(v)]
+        selected_versions = set(pypy_versions)
+        if standard_versions:
+            selected_versions.update({standard_versions[0], standard_versions[-1]})
+        for python_version in sorted(selected_versions, reverse=True):
+            cells.append((plone_version, python_version))
+    return cells
+
+
+def _pairwise(test_matrix):
+    """Cover every Plone version and every Python version at least once.
+
+    Each Plone version gets its first (usually highest) Python version that is
+    not covered yet.  The remaining Python versions go to the Plone version
+    supporting them with the fewest combinations so far.
+    """
+    selected = {plone_version: [] for plone_version in test_matrix}
+    covered = set()
+    for plone_version, python_versions in test_matrix.items():
+        if not python_versions:
+            continue
+        candidates = [v for v in python_versions if v not in covered]
+        python_version = (candidates or python_versions)[0]
+        selected[plone_version].append(python_version)
+        covered.add(python_version)
+    for python_versions in test_matrix.values():
+        for python_version in python_versions:
+            if python_version in covered:
+                continue
+            supporting = [
+                plone_version
+                for plone_version, versions in test_matrix.items()
+                if python_version in versions
+            ]
+            plone_version = min(supporting, key=lambda v: len(selected[v]))
+            selected[plone_version].append(python_version)
+            covered.add(python_version)
+    cells = []
+    for plone_version, python_versions in test_matrix.items():
+        for python_version in python_versions:
+            if python_version in selected[plone_version]:
+                cells.append((plone_version, python_version))
+    return cells
+
+
+SELECTORS = {
+    "full": _full,
+    "edges": _edges,
+    "pairwise": _pairwise,
+}
+
+
+def check_strategy(strategy):
+    """Return `strategy`, or the default one if empty.
+
+    Raise a `ValueError` for unknown strategies.
+    """
+    strategy = strategy or DEFAULT_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(
+            f"Unknown `matrix_strategy` {strategy!r}, "
+            f"use one of {', '.join(STRATEGIES)}."
+        )
+    return strategy
+
+
+def matrix_cells(test_matrix, strategy=DEFAULT_STRATEGY):
+    """Return the (Plone version, Python version) combinations to test.
+
+    `test_matrix` is an expanded matrix, see `get_test_matrix`.
+    For the split strategy this is the selection used on branches.
+    """
+    strategy = check_strategy(strategy)
+    if strategy == SPLIT_STRATEGY:
+        strategy = "pairwise"
+    return SELECTORS[strategy](test_matrix)
+
+
+def default_branch_cells(test_matrix, strategy=DEFAULT_STRATEGY):
+    """Return the combinations to test on the default branch.
+
+    Only differs from `matrix_cells` for the split strategy,
+    otherwise return `None`.
+    """
+    if check_strategy(strategy) != SPLIT_STRATEGY:
+        return None
+    return _full(test_matrix)
@@ -11,9 +11,12 @@
 # FOR A PARTICULAR PURPOSE.
 #
 ##############################################################################
+from .shared.call import abort
 from .shared.call import call
 from .shared.git import git_branch
 from .shared.path import change_dir
+from .wheelhouse import find_wheelhouse
+from .wheelhouse import run_tox
 
 import argparse
 import pathlib
@@ -71,6 +74,17 @@ def main():
         default=True,
         help="Skip running unit tests.",
     )
+    parser.add_argument(
+        "--wheelhouse",
+        dest="wheelhouse",
+        type=pathlib.Path,
+        metavar="DIR",
+        default=None,
+        help="Install from the wheels built in DIR by `meta-wheelhouse` when "
+        "running the unit tests, without a package index in the environments "
+        "it built all wheels for. Default: the `wheelhouse` option of the "
+        "[tox] section of .meta.toml.",
+    )
 
     args = parser.parse_args()
     path = args.path.absolute()
@@ -175,7 +189,13 @@ def main():
 
         if args.run_tests:
             tox_path = shutil.which("tox") or (cwd / "venv" / "bin" / "tox")
-            call(tox_path, "-p", "auto")
+            wheelhouse = find_wheelhouse(
+                path, args.wheelhouse and cwd / args.wheelhouse
+            )
+            if not wheelhouse:
+                call(tox_path, "-p", "auto")
+            elif not run_tox(path, wheelhouse, tox_path):
+                abort(1)
 
         if args.commit:
             print("Committing all changes ...")
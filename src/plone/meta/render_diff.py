@@ -0,0 +1,197 @@
+from .drift import render_package
+from .shared.call import call
+from .shared.packages import list_packages
+from .shared.path import path_factory
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import argparse
+import collections
+import difflib
+import jinja2
+import os
+import pathlib
+import tempfile
+
+TEMPLATES_FOLDER = "src/plone/meta"
+
+
+def templates_at_ref(meta_repo, ref, destination):
+    """Copy the templates of the `plone.meta` clone `meta_repo` at `ref`.
+
+    Only git read commands are used, the clone is left untouched.
+
+    Return the folder holding the config type folders.
+    """
+    files = call(
+        "git",
+        "ls-tree",
+        "-r",
+        "--name-only",
+        ref,
+        TEMPLATES_FOLDER,
+        capture_output=True,
+        cwd=meta_repo,
+    ).stdout.splitlines()
+    for name in files:
+        content = call(
+            "git", "show", f"{ref}:{name}", capture_output=True, cwd=meta_repo
+        ).stdout
+        target = destination / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+    return destination / TEMPLATES_FOLDER
+
+
+def changed_lines(relative, before, after):
+    """Return the added and removed lines of a file, without context.
+
+    Line numbers and context differ between packages, so they are left out
+    to be able to recognize the same change across packages.
+    """
+    diff = difflib.unified_diff(
+        before.splitlines(), after.splitlines(), lineterm="", n=0
+    )
+    lines = [
+        line
+        for line in diff
+        if line[:1] in ("+", "-") and not line.startswith(("+++", "---"))
+    ]
+    return (relative, tuple(lines))
+
+
+def package_changes(path, templates_path):
+    """Render the package at `path` with the installed and the other templates.
+
+    Return the package name, a list of changes (see `changed_lines`) and an
+    error message (empty if everything went fine).
+    """
+    path = path.absolute()
+    if not (path / ".git").exists():
+        return (path.name, [], "no git clone found")
+    try:
+        before = render_package(path)
+        after = render_package(path, templates_path)
+    except jinja2.UndefinedError as exc:
+        return (
+            path.name,
+            [],
+            f"the other templates need an option the installed plone.meta "
+            f"does not pass: {exc}",
+        )
+    except Exception as exc:
+        return (path.name, [], str(exc))
+    changes = []
+    for relative in sorted(set(before) | set(after)):
+        old = before.get(relative, "")
+        new = after.get(relative, "")
+        if old != new:
+            changes.append(changed_lines(relative, old, new))
+    return (path.name, changes, "")
+
+
+def group_changes(results):
+    """Group identical changes, return a list of (change, packages) tuples.
+
+    The most common changes come first.
+    """
+    groups = collections.defaultdict(list)
+    for name, changes, _ in results:
+        for change in changes:
+            groups[change].append(name)
+    return sorted(groups.items(), key=lambda item: (-len(item[1]), item[0]))
+
+
+def format_report(results):
+    """Format the grouped changes: shared ones first, then the outliers"""
+    groups = group_changes(results)
+    shared = [group for group in groups if len(group[1]) > 1]
+    outliers = [group for group in groups if len(group[1]) == 1]
+    lines = []
+    for title, selection in (("Shared changes", shared), ("Outliers", outliers)):
+        if not selection:
+            continue
+        lines.append(f"# {title}")
+        lines.append("")
+        for (relative, diff_lines), packages in selection:
+            if len(packages) > 1:
+                lines.append(f"## {relative} ({len(packages)} packages)")
+            else:
+                lines.append(f"## {relative} ({packages[0]})")
+            lines.extend(diff_lines)
+            if len(packages) > 1:
+                lines.append(f"Packages: {', '.join(sorted(packages))}")
+            lines.append("")
+    unchanged = sorted(name for name, changes, error in results if not changes)
+    errors = [(name, error) for name, _, error in results if error]
+    unchanged = [name for name in unchanged if name not in dict(errors)]
+    if unchanged:
+        lines.append(f"# Unchanged ({len(unchanged)} packages)")
+        lines.append("")
+        lines.append(", ".join(unchanged))
+        lines.append("")
+    if errors:
+        lines.append("# Errors")
+        lines.append("")
+        lines.extend(f"{name}: {error}" for name, error in errors)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        description="Show what another version of the plone.meta templates would "
+        "change on all repositories listed in a packages.txt, without "
+        "modifying them.",
+    )
+    parser.add_argument(
+        "packages_txt",
+        type=path_factory("packages.txt", has_extension=".txt"),
+        help="path to packages.txt; every repository listed inside is rendered",
+        metavar="packages.txt",
+    )
+    parser.add_argument(
+        "clones",
+        type=path_factory("clones", is_dir=True),
+        help="path to the directory where the clones of the repositories are stored",
+    )
+    parser.add_argument(
+        "meta_repo",
+        type=path_factory("meta_repo", is_dir=True),
+        help="path to a plone.meta clone holding the templates to compare with; "
+        "only the templates are taken from it, their options are computed by the "
+        "installed plone.meta, a template needing a new option is reported as "
+        "an error",
+    )
+    parser.add_argument(
+        "--ref",
+        dest="ref",
+        default=None,
+        help="Use the templates of this git ref of the plone.meta clone, "
+        "instead of its working directory.",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of packages rendered in parallel. Default: number of CPUs.",
+    )
+    args = parser.parse_args()
+
+    paths = [args.clones / package for package in list_packages(args.packages_txt)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.ref:
+            templates_path = templates_at_ref(
+                args.meta_repo.absolute(), args.ref, pathlib.Path(tmp_dir)
+            )
+        else:
+            templates_path = args.meta_repo.absolute() / TEMPLATES_FOLDER
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(
+                executor.map(
+                    partial(package_changes, templates_path=templates_path), paths
+                )
+            )
+    print(format_report(results))
@@ -17,15 +17,19 @@ from .shared.call import call
 from .shared.git import get_branch_name
 from .shared.git import git_branch
 from .shared.git import git_server_url
+from .shared.packages import list_packages
 from .shared.path import change_dir
-from importlib.util import module_from_spec
-from importlib.util import spec_from_file_location
+from .shared.path import path_factory
+from concurrent.futures import ProcessPoolExecutor
 
 import argparse
 import ast
 import contextlib
+import difflib
+import io
 import os
 import pathlib
+import subprocess
 import sys
 import tomlkit
 
@@ -36,6 +40,7 @@ PROJECT_SIMPLE_KEYS = (
 )
 IGNORE_KEYS = (
     "zip_safe",
+    "long_description",
     "long_description_content_type",
     "package_dir",
     "packages",
@@ -49,6 +54,20 @@ UNCONVERTIBLE_KEYS = (
     "headers",
     "cffi_modules",
 )
+# Moved to pyproject.toml, all other keys stay in setup.py.
+PROJECT_KEYS = PROJECT_SIMPLE_KEYS + (
+    "classifiers",
+    "license",
+    "python_requires",
+    "author",
+    "author_email",
+    "entry_points",
+    "extras_require",
+    "install_requires",
+    "keywords",
+    "project_urls",
+    "url",
+)
 
 LICENSE_CLASSIFIER_TO_SPDX = {
     "License :: OSI Approved :: GNU General Public License v2 (GPLv2)": "GPL-2.0-only",
@@ -93,89 +112,352 @@ def get_pyproject_toml(path, comment=""):
     return tomlkit.loads(toml_contents)
 
 
-def parse_setup_function(ast_node, assigned_names=None):
-    """Parse values out of the setup call ast definition"""
-    setup_kwargs = {}
-    assigned_names = assigned_names or {}
-    for kw_arg in ast_node.keywords:
-        if isinstance(kw_arg.value, (ast.Constant, ast.List, ast.Tuple)):
-            setup_kwargs[kw_arg.arg] = ast.literal_eval(kw_arg.value)
-        elif isinstance(kw_arg.value, ast.Dict):
-            # This could hide variables
+# Functions setup.py may call, they do not have side effects.
+SAFE_FUNCTIONS = {
+    "dict": dict,
+    "list": list,
+    "tuple": tuple,
+    "set": set,
+    "sorted": sorted,
+    "str": str,
+    "os.path.abspath": os.path.abspath,
+    "os.path.dirname": os.path.dirname,
+    "os.path.join": os.path.join,
+    "pathlib.Path": pathlib.Path,
+}
+OPEN_FUNCTIONS = ("open", "io.open", "codecs.open")
+SAFE_METHODS = {
+    str: ("format", "join", "lower", "replace", "split", "strip"),
+    pathlib.PurePath: ("absolute", "joinpath", "read_text", "resolve"),
+}
+SAFE_ATTRIBUTES = {
+    pathlib.PurePath: ("name", "parent"),
+}
+
+
+class ConversionError(Exception):
+    """The package cannot be converted without fixing setup.py first"""
+
+
+class StaticEvaluationError(ValueError):
+    """An expression of setup.py cannot be evaluated without running it"""
+
+
+class _File:
+    """A file opened by setup.py, it can only be read"""
+
+    def __init__(self, path, encoding=None):
+        self.path = path
+        self.encoding = encoding
+
+    def read(self):
+        return self.path.read_text(encoding=self.encoding or "utf-8")
+
+
+class _Return:
+    """The value returned by a function of setup.py"""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class SetupPyEvaluator:
+    """Evaluate the expressions of a setup.py without running it.
+
+    The module level assignments are propagated as constants.  Expressions
+    are limited to literals, string formatting, additions, a few side
+    effect free functions, reading files and calling the simple functions
+    defined in setup.py, like the usual `read()` helper.  Anything else
+    raises `StaticEvaluationError`.
+    """
+
+    def __init__(self, path, source=None):
+        self.path = pathlib.Path(path).absolute()
+        if source is None:
+            source = self.path.read_text()
+        self.tree = ast.parse(source)
+        self.names = {"__file__": str(self.path)}
+        self.aliases = {}
+        self.functions = {}
+        for statement in self.tree.body:
             try:
-                setup_kwargs[kw_arg.arg] = ast.literal_eval(kw_arg.value)
-            except ValueError:
-                # Need to crawl the dictionary
-                gathered = {}
-                for key, value in zip(kw_arg.value.keys, kw_arg.value.values):
-                    if isinstance(value, ast.Name):
-                        gathered[key.value] = assigned_names.get(value.id, "")
-                    elif isinstance(value, ast.BinOp):
-                        if isinstance(value.left, ast.List):
-                            # e. g. "['Sphinx'] + BROWSER_REQUIRES"
-                            print("XXX Cannot convert list addition XXX")
-                            print("XXX Please fix setup.py manually first XXX")
-                            print("XXX list addition: " f"{ast.unparse(value)} XXX")
-                            sys.exit(1)
-                        # Interpolated string 'x%sy' % foo
-                        unformatted = value.left.value
-                        variable = assigned_names.get(value.right.id, "")
-                        formatted = unformatted.replace("%s", variable)
-                        gathered[key.value] = formatted
-                    elif isinstance(value, (ast.List, ast.Tuple)):
-                        try:
-                            gathered[key.value] = ast.literal_eval(value)
-                        except ValueError:
-                            # Probably a variable in the list
-                            lst = []
-                            for member in value.elts:
-                                if isinstance(
-                                    member, (ast.Constant, ast.List, ast.Tuple)
-                                ):
-                                    lst.append(ast.literal_eval(member.value))
-                                elif isinstance(member, ast.BinOp):
-                                    unformatted = member.left.value
-                                    variable = assigned_names.get(member.right.id, "")
-                                    formatted = unformatted.replace("%s", variable)
-                                    lst.append(formatted)
-                                else:
-                                    lst.append(ast.literal_eval(member.value))
-                            gathered[key.value] = lst
-                    else:
-                        try:
-                            gathered[key.value] = ast.literal_eval(value)
-                        except ValueError:
-                            print("XXX Cannot convert dictionary value XXX")
-                            print("XXX Please fix setup.py manually first XXX")
-                            print(f"XXX Dictionary key: {key.value} XXX")
-                            print(ast.dump(value, indent=2))
-                            sys.exit(1)
-                setup_kwargs[kw_arg.arg] = gathered
-        elif isinstance(kw_arg.value, ast.Name):
-            if kw_arg.value.id in assigned_names:
-                value = assigned_names.get(kw_arg.value.id)
+                self._execute([statement], self.names)
+            except StaticEvaluationError:
+                # Only an error if the setup call uses these names.
+                for target in _assigned_names(statement):
+                    self.names.pop(target, None)
+
+    def evaluate(self, node, scope=None):
+        """Return the value of the expression `node`"""
+        scope = self.names if scope is None else scope
+        try:
+            return self._evaluate(node, scope)
+        except (
+            AttributeError,
+            IndexError,
+            KeyError,
+            OSError,
+            RecursionError,
+            TypeError,
+            ValueError,
+        ) as exc:
+            if isinstance(exc, StaticEvaluationError):
+                raise
+            raise StaticEvaluationError(f"{ast.unparse(node)}: {exc}") from exc
+
+    def _evaluate(self, node, scope):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id not in scope:
+                raise StaticEvaluationError(f"unknown name {node.id!r}")
+            return scope[node.id]
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            values = []
+            for element in node.elts:
+                if isinstance(element, ast.Starred):
+                    values.extend(self.evaluate(element.value, scope))
+                else:
+                    values.append(self.evaluate(element, scope))
+            if isinstance(node, ast.Tuple):
+                return tuple(values)
+            return set(values) if isinstance(node, ast.Set) else values
+        if isinstance(node, ast.Dict):
+            values = {}
+            for key, value in zip(node.keys, node.values):
+                if key is None:
+                    values.update(self.evaluate(value, scope))
+                else:
+                    values[self.evaluate(key, scope)] = self.evaluate(value, scope)
+            return values
+        if isinstance(node, ast.BinOp):
+            left = self.evaluate(node.left, scope)
+            right = self.evaluate(node.right, scope)
+            if isinstance(node.op, ast.Add):
+                return left + right
+            if isinstance(node.op, ast.Mod) and isinstance(left, str):
+                return left % right
+            if isinstance(node.op, ast.Div) and isinstance(left, pathlib.PurePath):
+                return left / right
+        if isinstance(node, ast.JoinedStr):
+            return "".join(self._format(value, scope) for value in node.values)
+        if isinstance(node, ast.Attribute):
+            value = self.evaluate(node.value, scope)
+            if _allowed(value, node.attr, SAFE_ATTRIBUTES):
+                return getattr(value, node.attr)
+        if isinstance(node, ast.Call):
+            return self._call(node, scope)
+        raise StaticEvaluationError(f"unsupported expression {ast.unparse(node)}")
+
+    def _format(self, node, scope):
+        if isinstance(node, ast.Constant):
+            return node.value
+        value = self.evaluate(node.value, scope)
+        if node.conversion != -1:
+            value = {"s": str, "r": repr, "a": ascii}[chr(node.conversion)](value)
+        spec = self.evaluate(node.format_spec, scope) if node.format_spec else ""
+        return format(value, spec)
+
+    def _call(self, node, scope):
+        args = []
+        for arg in node.args:
+            if isinstance(arg, ast.Starred):
+                args.extend(self.evaluate(arg.value, scope))
             else:
-                value = kw_arg.value.id
-            setup_kwargs[kw_arg.arg] = value
-        elif isinstance(kw_arg.value, ast.Call):
-            # For example: extras_require=dict(test=["zope.testing"])
-            # From https://stackoverflow.com/a/72359947/621201
-            try:
-                setup_kwargs[kw_arg.arg] = eval(
-                    compile(ast.Expression(body=kw_arg.value), "", "eval")
+                args.append(self.evaluate(arg, scope))
+        kwargs = {}
+        for keyword in node.keywords:
+            if keyword.arg is None:
+                kwargs.update(self.evaluate(keyword.value, scope))
+            else:
+                kwargs[keyword.arg] = self.evaluate(keyword.value, scope)
+        name = self._qualified_name(node.func, scope)
+        if name in OPEN_FUNCTIONS:
+            return self._open(*args, **kwargs)
+        if name in SAFE_FUNCTIONS:
+            return SAFE_FUNCTIONS[name](*args, **kwargs)
+        if isinstance(node.func, ast.Name) and node.func.id in self.functions:
+            return self._call_function(self.functions[node.func.id], args, kwargs)
+        if name is None and isinstance(node.func, ast.Attribute):
+            value = self.evaluate(node.func.value, scope)
+            if isinstance(value, pathlib.PurePath) and not value.is_absolute():
+                # Relative to setup.py, like when running it.
+                value = self.path.parent / value
+            if isinstance(value, _File) and node.func.attr == "read":
+                return value.read()
+            if _allowed(value, node.func.attr, SAFE_METHODS):
+                return getattr(value, node.func.attr)(*args, **kwargs)
+        raise StaticEvaluationError(f"unsupported call {ast.unparse(node)}")
+
+    def _open(self, file, mode="r", *args, encoding=None, **kwargs):
+        if "r" not in mode or "b" in mode:
+            raise StaticEvaluationError(f"cannot open {file} with mode {mode!r}")
+        return _File(self.path.parent / file, encoding)
+
+    def _call_function(self, function, args, kwargs):
+        """Run a function defined in setup.py with the supported statements"""
+        scope = dict(self.names)
+        parameters = function.args
+        positional = [arg.arg for arg in parameters.posonlyargs + parameters.args]
+        defaults = [self.evaluate(value) for value in parameters.defaults]
+        first_default = len(positional) - len(defaults)
+        for name, default in zip(positional[first_default:], defaults):
+            scope[name] = default
+        for name, value in zip(positional, args):
+            scope[name] = value
+        if parameters.vararg:
+            scope[parameters.vararg.arg] = tuple(args[len(positional) :])
+        elif len(args) > len(positional):
+            raise StaticEvaluationError(f"too many arguments for {function.name}()")
+        for argument, default in zip(parameters.kwonlyargs, parameters.kw_defaults):
+            if default is not None:
+                scope[argument.arg] = self.evaluate(default)
+        scope.update(kwargs)
+        result = self._execute(function.body, scope)
+        return result.value if result else None
+
+    def _qualified_name(self, node, scope):
+        """Return the dotted name of the function `node` refers to"""
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.insert(0, node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name) or node.id in scope:
+            return None
+        if node.id in self.aliases:
+            return ".".join([self.aliases[node.id], *parts])
+        if node.id in self.functions:
+            return None
+        return ".".join([node.id, *parts])
+
+    def _execute(self, statements, scope):
+        """Run the supported `statements`, return a `_Return` if one returns"""
+        for statement in statements:
+            if isinstance(statement, ast.Return):
+                value = statement.value
+                return _Return(self.evaluate(value, scope) if value else None)
+            if isinstance(statement, ast.Assign):
+                value = self.evaluate(statement.value, scope)
+                for target in statement.targets:
+                    self._assign(target, value, scope)
+            elif isinstance(statement, ast.AnnAssign) and statement.value:
+                self._assign(
+                    statement.target, self.evaluate(statement.value, scope), scope
+                )
+            elif isinstance(statement, ast.AugAssign) and isinstance(
+                statement.op, ast.Add
+            ):
+                value = ast.BinOp(statement.target, ast.Add(), statement.value)
+                value = self.evaluate(
+                    ast.fix_missing_locations(ast.copy_location(value, statement)),
+                    scope,
                 )
-            except Exception:
-                print("XXX Cannot convert call value XXX")
-                print("XXX Please fix setup.py manually first XXX")
-                print(f"XXX Dictionary key: {kw_arg.arg} XXX")
-                print(ast.dump(kw_arg.value, indent=2))
-                sys.exit(1)
+                self._assign(statement.target, value, scope)
+            elif isinstance(statement, ast.With):
+                for item in statement.items:
+                    value = self.evaluate(item.context_expr, scope)
+                    if item.optional_vars is not None:
+                        self._assign(item.optional_vars, value, scope)
+                result = self._execute(statement.body, scope)
+                if result:
+                    return result
+            elif isinstance(statement, ast.Import):
+                for alias in statement.names:
+                    name = alias.asname or alias.name.partition(".")[0]
+                    self.aliases[name] = alias.name if alias.asname else name
+                    scope.pop(name, None)
+            elif isinstance(statement, ast.ImportFrom):
+                for alias in statement.names:
+                    name = alias.asname or alias.name
+                    self.aliases[name] = f"{statement.module}.{alias.name}"
+                    scope.pop(name, None)
+            elif isinstance(statement, ast.FunctionDef):
+                self.functions[statement.name] = statement
+                scope.pop(statement.name, None)
+            elif not _is_docstring(statement):
+                raise StaticEvaluationError(
+                    f"unsupported statement in line {statement.lineno}"
+                )
+        return None
+
+    def _assign(self, target, value, scope):
+        if isinstance(target, ast.Name):
+            scope[target.id] = value
+            self.aliases.pop(target.id, None)
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            values = list(value)
+            if len(values) != len(target.elts):
+                raise StaticEvaluationError(f"cannot unpack {ast.unparse(target)}")
+            for element, element_value in zip(target.elts, values):
+                self._assign(element, element_value, scope)
         else:
-            print("XXX Don't know how to handle this item XXX")
-            print("XXX Please fix setup.py manually first XXX")
-            print(f"XXX Dictionary key: {kw_arg.arg} XXX")
-            print(ast.dump(kw_arg.value, indent=2))
-            sys.exit(1)
+            raise StaticEvaluationError(f"cannot assign to {ast.unparse(target)}")
+
+    def setup_call(self):
+        """Return the node of the module level `setup()` call, or `None`"""
+        for node in self.tree.body:
+            if (
+                isinstance(node, ast.Expr)
+                and isinstance(node.value, ast.Call)
+                and self._qualified_name(node.value.func, {})
+                in ("setup", "setuptools.setup")
+            ):
+                return node.value
+        return None
+
+
+def _allowed(value, name, allowed):
+    return any(
+        isinstance(value, cls) and name in names for cls, names in allowed.items()
+    )
+
+
+def _is_docstring(statement):
+    return isinstance(statement, ast.Pass) or (
+        isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant)
+    )
+
+
+def _assigned_names(statement):
+    """Return the names a module level statement assigns"""
+    return [
+        node.id
+        for node in ast.walk(statement)
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store)
+    ]
+
+
+def parse_setup_function(ast_node, evaluator):
+    """Parse values out of the setup call ast definition.
+
+    The values are evaluated statically by `evaluator`, a
+    `SetupPyEvaluator`, without running setup.py.
+    """
+    setup_kwargs = {}
+    for kw_arg in ast_node.keywords:
+        if kw_arg.arg in IGNORE_KEYS + UNCONVERTIBLE_KEYS:
+            # Dropped anyway, and they often call setuptools functions.
+            setup_kwargs[kw_arg.arg] = None
+            continue
+        try:
+            value = evaluator.evaluate(kw_arg.value)
+        except StaticEvaluationError as exc:
+            if (
+                isinstance(kw_arg.value, ast.Name)
+                and kw_arg.arg is not None
+                and kw_arg.arg not in PROJECT_KEYS
+            ):
+                # Kept as a reference in the new setup.py.
+                value = kw_arg.value.id
+            else:
+                raise ConversionError(
+                    f"cannot convert setup argument {kw_arg.arg or '**'}: {exc}, "
+                    "please fix setup.py manually first"
+                ) from exc
+        if kw_arg.arg is None:
+            setup_kwargs.update(value)
+        else:
+            setup_kwargs[kw_arg.arg] = value
 
     return setup_kwargs
 
@@ -188,10 +470,10 @@ def handle_classifiers(classifiers):
     for classifier in classifiers:
         if classifier.startswith("License"):
             if classifier not in LICENSE_CLASSIFIER_TO_SPDX.keys():
-                print(f"License classifier {classifier} was not expected")
-                print("either remove it and run the script again,")
-                print("or double check if that was the intended classifier.")
-                sys.exit()
+                raise ConversionError(
+                    f"license classifier {classifier!r} was not expected, "
+                    "remove it or double check if it is the intended one"
+                )
             license_counter += 1
             license_classifiers.append(classifier)
             continue
@@ -203,8 +485,7 @@ def handle_classifiers(classifiers):
             new_classifiers.append(classifier)
 
     if license_counter > 1:
-        print("There are too many License :: classifiers, fix that first!")
-        sys.exit()
+        raise ConversionError("there are too many License :: classifiers")
 
     return new_classifiers, license_classifiers
 
@@ -222,16 +503,13 @@ def check_license(license, license_classifier):
     if len(license_classifier) == 0:
         if license_spdx:
             return license_spdx
-        print(f'Unknown license "{license}", please fix it or remove it ')
-        print("so that the script does not complain.")
-        sys.exit(1)
+        raise ConversionError(f'unknown license "{license}", fix or remove it')
 
     classifier_spdx = LICENSE_CLASSIFIER_TO_SPDX[license_classifier[0]]
     if license_spdx and license_spdx != classifier_spdx:
-        print(
-            f'License "{license}" does not match classifier "{license_classifier[0]}".'
+        raise ConversionError(
+            f'license "{license}" does not match classifier "{license_classifier[0]}"'
         )
-        sys.exit(1)
 
     return classifier_spdx
 
@@ -264,7 +542,7 @@ def setup_args_to_toml_dict(setup_py_path, setup_kwargs):
         original_classifiers
     )
 
-    license = setup_kwargs.pop("license")
+    license = setup_kwargs.pop("license", "")
     p_data["license"] = check_license(license, license_classifiers)
 
     readme = None
@@ -347,12 +625,6 @@ def setup_args_to_toml_dict(setup_py_path, setup_kwargs):
         p_data["entry-points"] = entry_points
 
     extras = setup_kwargs.pop("extras_require", {})
-    if isinstance(extras, str):
-        print(" XXX Error converting setup.py XXX")
-        print(" XXX Clean up setup.py manually first:")
-        print(f" Change extras_require value to not use variable {extras}!")
-        print(f" Instead, insert the actual value of variable {extras}.")
-        sys.exit(1)
     opt_deps = {}
     for e_name, e_list in extras.items():
         opt_deps[e_name] = e_list
@@ -389,41 +661,12 @@ def setup_args_to_toml_dict(setup_py_path, setup_kwargs):
 
 
 def parse_setup_py(path):
-    """Parse values out of setup.py"""
+    """Parse values out of setup.py, without running it"""
     setup_kwargs = {}
-    assigned_names = {}
-
-    # Nasty: Import the setup module file to get at the resolved variables
-    import_spec = spec_from_file_location("setup", path)
-    setup_module = module_from_spec(import_spec)
-    try:
-        with open(os.devnull, "w") as fp:
-            with contextlib.redirect_stderr(fp):
-                import_spec.loader.exec_module(setup_module)
-    except (FileNotFoundError, SystemExit):
-        pass
-
-    for key in dir(setup_module):
-        assigned_names[key] = getattr(setup_module, key)
-
-    file_contents = pathlib.Path(path).read_text()
-
-    # Create the ast tree for the setup module to find the setup call
-    # definition in order to parse out the call arguments.
-    ast_tree = ast.parse(file_contents)
-    setup_node = None
-
-    for ast_node in ast_tree.body:
-        if (
-            isinstance(ast_node, ast.Expr)
-            and isinstance(ast_node.value, ast.Call)
-            and ast_node.value.func.id == "setup"
-        ):
-            setup_node = ast_node.value
-            break
-
+    evaluator = SetupPyEvaluator(path)
+    setup_node = evaluator.setup_call()
     if setup_node is not None:
-        setup_kwargs = parse_setup_function(setup_node, assigned_names)
+        setup_kwargs = parse_setup_function(setup_node, evaluator)
     leftover_setup_kwargs, toml_dict = setup_args_to_toml_dict(path, setup_kwargs)
 
     return leftover_setup_kwargs, toml_dict
@@ -468,9 +711,9 @@ def rewrite_pyproject_toml(args, toml_dict):
             if len(value) > 1:
                 p_toml["project"]["optional-dependencies"][key].multiline(True)
         else:
-            print(f"XXX: {key} optional-dependencies needs to be a list.")
-            print("Fix it on setup.py and re-run.")
-            sys.exit()
+            raise ConversionError(
+                f"the {key} optional-dependencies need to be a list in setup.py"
+            )
     # Last sanity check to see if anything is missing
     if "requires-python" not in p_toml["project"]:
         p_toml["project"]["requires-python"] = ">=3.10"
@@ -601,27 +844,32 @@ def rewrite_pre_commit_config(path):
     return "\n".join(new_pre_commit) + "\n"
 
 
-def package_sanity_check(path):
-    """Sanity checks for the provided path"""
-    sane = True
+def package_problems(path):
+    """Return the reasons why the package at `path` cannot be converted"""
+    if not path.is_dir():
+        return [f"{path} is not a folder"]
+    problems = []
+    if not (path / "setup.py").exists():
+        problems.append("no setup.py found")
+    if not (path / ".meta.toml").exists():
+        problems.append("no .meta.toml found")
+    if not (path / ".pre-commit-config.yaml").exists():
+        problems.append("no .pre-commit-config.yaml found")
+    return problems
 
-    if not path.exists():
-        print(f" - no such path {path}.")
-        sane = False
 
-    if not path.is_dir():
-        print(f" - {path} is not a folder")
-        sane = False
+def is_converted(path):
+    """Return whether the setup() call of `path` / setup.py has no metadata
 
-    if not (path / "setup.py").exists():
-        print(" - no setup.py found, cannot convert package.")
-        sane = False
+    Arguments passed as `**kwargs` may hold the metadata, they are evaluated
+    by the conversion, which blocks if they cannot be.
+    """
+    setup_node = SetupPyEvaluator(path / "setup.py").setup_call()
+    keywords = {kw_arg.arg for kw_arg in getattr(setup_node, "keywords", [])}
+    return None not in keywords and not keywords & {"name", "version"}
 
-    if not (path / ".meta.toml").exists():
-        print(" - no .meta.toml found, cannot convert package.")
-        sane = False
 
-    return sane
+NEWS_ENTRY = "+setup-to-pyproject.internal"
 
 
 def write_news_entry(path):
@@ -630,7 +878,7 @@ def write_news_entry(path):
         print("WARNING: no news entry created as there is no 'news' folder")
         return
 
-    filename = "+setup-to-pyproject.internal"
+    filename = NEWS_ENTRY
     news_entry = news_folder / filename
     if (path / "CHANGES.md").exists():
         changelog_text = (
@@ -644,12 +892,174 @@ def write_news_entry(path):
         call("git", "add", f"news/{filename}")
 
 
-def main():
+CONVERTED = "converted"
+SKIPPED = "skipped"
+BLOCKED = "blocked"
+
+
+def convert_files(path, issues_url=None):
+    """Return the converted files of the package at `path`.
+
+    Nothing is written, the result maps the file names to their new content.
+    """
+    leftover_setup_kwargs, toml_dict = parse_setup_py(path / "setup.py")
+    args = argparse.Namespace(path=path, issues_url=issues_url)
+    return {
+        "pyproject.toml": rewrite_pyproject_toml(args, toml_dict),
+        "setup.py": rewrite_setup_py(path / "setup.py", leftover_setup_kwargs),
+        ".pre-commit-config.yaml": rewrite_pre_commit_config(
+            path / ".pre-commit-config.yaml"
+        ),
+    }
+
+
+def conversion_diff(path, files):
+    """Return the unified diff of `files`, see `convert_files`"""
+    diff = []
+    for name, content in files.items():
+        old_content = ""
+        if (path / name).exists():
+            old_content = (path / name).read_text()
+        diff.extend(
+            difflib.unified_diff(
+                old_content.splitlines(keepends=True),
+                content.splitlines(keepends=True),
+                fromfile=f"a/{name}",
+                tofile=f"b/{name}",
+            )
+        )
+    return "".join(diff)
+
+
+def convert_package(path, branch_name=None, issues_url=None, dry_run=False):
+    """Move the metadata of the package at `path` to pyproject.toml.
+
+    The changes are committed on `branch_name`.  With `dry_run`, they are
+    printed as a diff instead, without writing files or switching branches.
+    Return a tuple of the status, one of `CONVERTED`, `SKIPPED` and
+    `BLOCKED`, and its reason.
+    """
+    problems = package_problems(path)
+    if problems:
+        return (BLOCKED, ", ".join(problems))
+    try:
+        # Sanity check - if project has been converted already, give up.
+        if is_converted(path):
+            return (SKIPPED, "converted already")
+        files = convert_files(path, issues_url)
+    except (ConversionError, StaticEvaluationError, SyntaxError) as exc:
+        return (BLOCKED, str(exc))
+    if dry_run:
+        print(conversion_diff(path, files), end="")
+        return (CONVERTED, "dry run, nothing written")
+
+    originals = {name: (path / name).read_text() for name in files}
+    had_news_entry = (path / "news" / NEWS_ENTRY).exists()
+    try:
+        for name, content in files.items():
+            (path / name).write_text(content)
+
+        print("Look through setup.py and pyproject.toml to see if it needs changes.")
+        write_news_entry(path)
+
+        with change_dir(path):
+            git_branch(branch_name or "convert-setup-py-to-pyproject-toml")
+
+            commit_msg = "feat: move metadata from setup.py to pyproject.toml."
+            call("git", "add", "setup.py", "pyproject.toml", ".pre-commit-config.yaml")
+            call("git", "commit", "-m", commit_msg)
+    except (EOFError, SystemExit):
+        # A git command failed: do not leave a half converted package behind.
+        restore_package(path, originals, had_news_entry)
+        raise
+    return (CONVERTED, "")
+
+
+def restore_package(path, originals, had_news_entry):
+    """Undo the changes of `convert_package` to the files and the git index.
+
+    `originals` maps the file names to their content before the conversion.
+    """
+    for name, content in originals.items():
+        (path / name).write_text(content)
+    names = list(originals)
+    if not had_news_entry:
+        (path / "news" / NEWS_ENTRY).unlink(missing_ok=True)
+        names.append(f"news/{NEWS_ENTRY}")
+    # Not `call`, which would ask again whether to proceed if git fails.
+    subprocess.run(("git", "reset", "-q", "--", *names), cwd=path, capture_output=True)
+
+
+def convert_in_batch(path, branch_name=None, issues_url=None, dry_run=False):
+    """Run `convert_package` without output nor questions.
+
+    Any failure, even of git, blocks the package instead of exiting.
+    Return a tuple of package name, status, reason and captured output.
+    """
+    path = path.absolute()
+    output = io.StringIO()
+    # `call` asks whether to proceed after a failed command: answer no.
+    stdin, sys.stdin = sys.stdin, io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            status, reason = convert_package(path, branch_name, issues_url, dry_run)
+    except (EOFError, SystemExit):
+        status, reason = (
+            BLOCKED,
+            "a git command failed, see its output; the files were restored",
+        )
+    except Exception as exc:
+        status, reason = BLOCKED, str(exc) or exc.__class__.__name__
+    finally:
+        sys.stdin = stdin
+    return (path.name, status, reason, output.getvalue())
+
+
+def format_report(results):
+    """Format the results of `convert_in_batch` as a plain text table"""
+    headers = ("package", "status", "reason")
+    rows = [(name, status, reason or "-") for name, status, reason, _ in results]
+    name_width = max([len(headers[0])] + [len(row[0]) for row in rows])
+    status_width = max([len(headers[1])] + [len(row[1]) for row in rows])
+    lines = []
+    for name, status, reason in [headers] + rows:
+        lines.append(f"{name:<{name_width}}  {status:<{status_width}}  {reason}")
+    return "\n".join(lines)
+
+
+def package_paths(paths, clones=None):
+    """Return the package paths of `paths`, expanding packages.txt files.
+
+    The packages of a packages.txt are looked up in `clones`, or next to it.
+    """
+    result = []
+    for path in paths:
+        if path.suffix == ".txt":
+            folder = clones or path.parent
+            result.extend(folder / package for package in list_packages(path))
+        else:
+            result.append(path)
+    return result
+
+
+def main():  # pragma: nocover
     parser = argparse.ArgumentParser(
         description="Move package metadata from setup.py to pyproject.toml."
     )
     parser.add_argument(
-        "path", type=pathlib.Path, help="path to the repository to be configured"
+        "paths",
+        type=pathlib.Path,
+        nargs="+",
+        help="paths to the repositories to be configured, or to packages.txt "
+        "files listing them",
+        metavar="path",
+    )
+    parser.add_argument(
+        "--clones",
+        type=path_factory("clones", is_dir=True),
+        default=None,
+        help="path to the directory where the clones of the repositories of "
+        "packages.txt are stored. Default: the directory of packages.txt.",
     )
     parser.add_argument(
         "--branch",
@@ -667,40 +1077,57 @@ def main():
         "If not given it defaults to Products.CMFPlone issue tracker. "
         'Use "own" to use the repository own issue tracker (assuming GitHub).',
     )
-    args = parser.parse_args()
-
-    print(f"Converting package {args.path.name}")
-
-    if not package_sanity_check(args.path):
-        print("Conversion not possible, exiting.")
-        sys.exit()
-
-    leftover_setup_kwargs, toml_dict = parse_setup_py(args.path / "setup.py")
-
-    # Sanity check - if project has been converted already, give up.
-    if "name" not in toml_dict["project"] and "version" not in toml_dict["project"]:
-        print("Package has been converted already, exiting.")
-        sys.exit()
-
-    toml_content = rewrite_pyproject_toml(args, toml_dict)
-    setup_content = rewrite_setup_py(args.path / "setup.py", leftover_setup_kwargs)
-    pre_commit_content = rewrite_pre_commit_config(
-        args.path / ".pre-commit-config.yaml"
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of packages converted in parallel. Default: number of CPUs.",
     )
+    parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        default=False,
+        help="Print the changes as a diff instead of writing and committing them.",
+    )
+    args = parser.parse_args()
 
-    (args.path / "pyproject.toml").write_text(toml_content)
-    (args.path / "setup.py").write_text(setup_content)
-    (args.path / ".pre-commit-config.yaml").write_text(pre_commit_content)
-
-    print("Look through setup.py and pyproject.toml to see if it needs changes.")
-    write_news_entry(args.path)
+    paths = package_paths(args.paths, args.clones)
+    if paths == args.paths and len(paths) == 1:
+        path = paths[0]
+        print(f"Converting package {path.name}")
+        status, reason = convert_package(
+            path, args.branch_name, args.issues_url, args.dry_run
+        )
+        if status == BLOCKED:
+            print(f"Conversion not possible: {reason}.")
+            sys.exit(1)
+        if status == SKIPPED:
+            print("Package has been converted already, exiting.")
+            sys.exit()
+        if not args.dry_run:
+            print(f"Finished converting {path.name}.")
+        return
 
-    with change_dir(args.path):
-        branch_name = args.branch_name or "convert-setup-py-to-pyproject-toml"
-        git_branch(branch_name)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(
+            executor.map(
+                convert_in_batch,
+                paths,
+                [args.branch_name] * len(paths),
+                [args.issues_url] * len(paths),
+                [args.dry_run] * len(paths),
+            )
+        )
 
-        commit_msg = "feat: move metadata from setup.py to pyproject.toml."
-        call("git", "add", "setup.py", "pyproject.toml", ".pre-commit-config.yaml")
-        call("git", "commit", "-m", commit_msg)
+    for name, _, _, output in results:
+        if output.strip():
+            print(f"== {name} ==")
+            print(output.rstrip())
+            print()
+    print(format_report(results))
 
-    print(f"Finished converting {args.path.name}.")
+    if any(status == BLOCKED for _, status, _, _ in results):
+        sys.exit(1)
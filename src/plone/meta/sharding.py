@@ -0,0 +1,129 @@
+"""Split the test modules of a repository into shards running in parallel.
+
+The split is computed when generating `tox.ini`, so that each shard is a
+tox factor like `py313-plone62-shard2`.  The last shard runs everything not
+selected by the other shards, so test modules added later are never skipped.
+"""
+
+import pathlib
+import statistics
+import zlib
+
+
+def find_test_modules(path, test_path, runner):
+    """Return the test modules below `path` / `test_path`.
+
+    The modules are tuples of their dotted name relative to the test path,
+    as used by `zope.testrunner`, and of their path relative to `path`.
+    """
+    root = path / test_path.strip("/")
+    modules = []
+    for file_obj in sorted(root.rglob("*.py")):
+        relative = file_obj.relative_to(root)
+        if any(part.startswith(".") for part in relative.parts):
+            continue
+        if runner == "pytest":
+            selected = file_obj.name.startswith("test_") or file_obj.stem.endswith(
+                "_test"
+            )
+        else:
+            # The default patterns of `zope.testrunner`.
+            selected = file_obj.name == "tests.py" or (
+                file_obj.name.startswith("test") and file_obj.parent.name == "tests"
+            )
+        if selected:
+            dotted = ".".join(relative.with_suffix("").parts)
+            modules.append((dotted, file_obj.relative_to(path).as_posix()))
+    return modules
+
+
+def module_durations(modules, test_durations):
+    """Return the seconds per module, out of per test case durations.
+
+    `test_durations` maps test case class names to seconds, see
+    `read_test_durations`.
+    """
+    durations = {}
+    for dotted, _ in modules:
+        seconds = [
+            value
+            for classname, value in test_durations.items()
+            if f".{dotted}." in f".{classname}."
+        ]
+        if seconds:
+            durations[dotted] = sum(seconds)
+    return durations
+
+
+def assign_shards(modules, shards, durations=None):
+    """Split `modules` into `shards` lists.
+
+    With `durations`, the longest modules go first to the shard with the
+    shortest total, modules without a duration count as the median.
+    Otherwise the modules are dealt out in the order of a hash of their name,
+    which keeps the selection stable between runs and machines.
+    """
+    if durations:
+        default = statistics.median(durations.values())
+        ordered = sorted(
+            modules, key=lambda module: (-durations.get(module[0], default), module)
+        )
+    else:
+        ordered = sorted(modules, key=lambda module: zlib.crc32(module[0].encode()))
+    selected = [[] for _ in range(shards)]
+    totals = [0.0] * shards
+    for index, module in enumerate(ordered):
+        if durations:
+            shard = totals.index(min(totals))
+            totals[shard] += durations.get(module[0], default)
+        else:
+            shard = index % shards
+        selected[shard].append(module)
+    return [sorted(modules) for modules in selected]
+
+
+def module_regex(modules):
+    """Return a `zope.testrunner` module filter matching exactly `modules`"""
+    # `[.]` instead of `\.`: no escaping issues within tox.ini.
+    names = "|".join(dotted.replace(".", "[.]") for dotted, _ in modules)
+    return f"^({names})$"
+
+
+def shard_arguments(shards, runner, test_path):
+    """Return the test runner arguments selecting the tests of each shard.
+
+    For `zope.testrunner` these are module filters, for pytest paths to test
+    or to ignore.  They replace the test path argument of pytest.
+    """
+    arguments = []
+    others = [module for modules in shards[:-1] for module in modules]
+    for modules in shards[:-1]:
+        if runner == "pytest":
+            arguments.append(
+                " ".join(f"{{toxinidir}}/{relative}" for _, relative in modules)
+            )
+        else:
+            arguments.append(f"-m '{module_regex(modules)}'")
+    if runner == "pytest":
+        ignored = " ".join(
+            f"--ignore={{toxinidir}}/{relative}" for _, relative in others
+        )
+        arguments.append(f"{{toxinidir}}{test_path} {ignored}")
+    else:
+        arguments.append(f"-m '!{module_regex(others)}'")
+    return arguments
+
+
+def split_tests(path, test_path, runner, shards, test_durations=None):
+    """Return the arguments of each shard, see `shard_arguments`.
+
+    There are never more shards than test modules, so the result may be
+    shorter than `shards`, or empty if sharding is useless.
+    """
+    modules = find_test_modules(pathlib.Path(path), test_path, runner)
+    shards = min(shards, len(modules))
+    if shards < 2:
+        return []
+    durations = module_durations(modules, test_durations or {})
+    selected = assign_shards(modules, shards, durations)
+    return shard_arguments(selected, runner, test_path)
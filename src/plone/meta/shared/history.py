@@ -0,0 +1,74 @@
+"""Read durations of past test runs from locally available result files."""
+
+import collections
+import json
+import statistics
+import xml.etree.ElementTree as ET
+
+
+def _junit_env_durations(path):
+    """Durations of a JUnit XML file, keyed by test suite name.
+
+    Reports without meaningful suite names (`pytest` or `zope.testrunner`
+    write their own) are keyed by the file name, like `py313-plone62.xml`.
+    """
+    root = ET.parse(path).getroot()
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    durations = collections.defaultdict(float)
+    for suite in suites:
+        name = suite.get("name") or ""
+        if name in ("", "pytest") or "." in name:
+            name = path.stem
+        durations[name] += float(suite.get("time") or 0)
+    return durations
+
+
+def _tox_json_env_durations(data):
+    """Durations out of `tox --result-json` output, or a plain mapping"""
+    if "testenvs" not in data:
+        # A plain {"env name": seconds} mapping.
+        return {name: float(seconds) for name, seconds in data.items()}
+    durations = {}
+    for name, env in data["testenvs"].items():
+        if not isinstance(env, dict):
+            continue
+        total = 0.0
+        for step in ("setup", "test"):
+            for command in env.get(step, []):
+                total += float(command.get("elapsed", 0))
+        durations[name] = total
+    return durations
+
+
+def read_env_durations(paths):
+    """Return the median duration in seconds of every tox environment.
+
+    `paths` are JUnit XML files, `tox --result-json` files or JSON files
+    mapping environment names to seconds.
+    """
+    samples = collections.defaultdict(list)
+    for path in paths:
+        if path.suffix == ".xml":
+            durations = _junit_env_durations(path)
+        else:
+            durations = _tox_json_env_durations(json.loads(path.read_text()))
+        for name, seconds in durations.items():
+            samples[name].append(seconds)
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def read_test_durations(paths):
+    """Return the median duration in seconds of the test cases of each class.
+
+    `paths` are JUnit XML files, the test cases are keyed by their
+    `classname`, like `plone.foo.tests.test_bar.TestBar`.
+    """
+    samples = collections.defaultdict(list)
+    for path in paths:
+        durations = collections.defaultdict(float)
+        for testcase in ET.parse(path).getroot().iter("testcase"):
+            classname = testcase.get("classname") or ""
+            durations[classname] += float(testcase.get("time") or 0)
+        for classname, seconds in durations.items():
+            samples[classname].append(seconds)
+    return {name: statistics.median(values) for name, values in samples.items()}
@@ -0,0 +1,311 @@
+"""Build the wheels of many repositories once, and install from them in tox.
+
+All repositories of a fleet depend on mostly the same Plone-pinned
+distributions, building them once into a wheelhouse directory saves every
+tox environment from downloading and building them again.
+
+The wheels of all Plone and Python versions share one directory, the tox
+environments it has all wheels for are listed in `ENVIRONMENTS_FILE`.  Only
+those install without a package index.  The wheelhouse only exists on the
+machine that built it, so it is used through environment variables at run
+time, never through the generated tox.ini.
+"""
+
+from .constraints import cached_location
+from .constraints import constraints_url
+from .matrix import tox_env_name
+from .shared.packages import list_packages
+from .shared.path import path_factory
+
+import argparse
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tomllib
+
+# Installed by the test environments of the generated tox.ini besides the
+# `test` extra.  setuptools is needed to install the repository itself
+# without an index.
+TOX_DEPS = (
+    "zope.testrunner",
+    "pytest",
+    "pytest-plone",
+    "pytest-xdist",
+    "coverage",
+    "setuptools",
+)
+
+# Installed by the other environments of the generated tox.ini, with the
+# constraints of the Plone version: `lint`, `release-check` and `circular`.
+QA_DEPS = (
+    "build",
+    "pipdeptree",
+    "pipforester",
+    "pre-commit",
+    "towncrier",
+    "twine",
+)
+
+# Installed by the `dependencies` environment, which uses no constraints.
+UNCONSTRAINED_DEPS = ("build", "z3c.dependencychecker==3.0")
+
+# Lists the tox environments, like `py313-plone62`, the wheelhouse has all
+# wheels for.
+ENVIRONMENTS_FILE = "environments.txt"
+
+
+def wheelhouse_env(wheelhouse, environ=None, no_index=True):
+    """Return the environment variables to install from `wheelhouse`.
+
+    Without `no_index`, the package index is still used for what is not in
+    the wheelhouse.  Both pip and uv (via `tox-uv`) are covered, tox passes
+    them on to the installer of each environment.
+    """
+    wheelhouse = str(pathlib.Path(wheelhouse).absolute())
+    env = dict(os.environ if environ is None else environ)
+    env.update({"PIP_FIND_LINKS": wheelhouse, "UV_FIND_LINKS": wheelhouse})
+    for name in ("PIP_NO_INDEX", "UV_NO_INDEX"):
+        if no_index:
+            env[name] = "1"
+        else:
+            env.pop(name, None)
+    return env
+
+
+def find_wheelhouse(path, wheelhouse=None):
+    """Return the wheelhouse of the repository at `path`, or `None`.
+
+    `wheelhouse` defaults to the `wheelhouse` option of the `[tox]` section
+    of `.meta.toml`, a relative path is relative to the repository.  A
+    missing directory is ignored, the package index is used then.
+    """
+    if not wheelhouse:
+        meta_toml = path / ".meta.toml"
+        if meta_toml.exists():
+            with open(meta_toml, "rb") as meta_f:
+                wheelhouse = tomllib.load(meta_f).get("tox", {}).get("wheelhouse")
+    if not wheelhouse:
+        return None
+    wheelhouse = path / wheelhouse
+    if not wheelhouse.is_dir():
+        print(f"WARNING: no wheelhouse in {wheelhouse}, using the package index.")
+        return None
+    return wheelhouse
+
+
+def covered_environments(wheelhouse):
+    """Return the names of the tox environments built into `wheelhouse`"""
+    environments_file = pathlib.Path(wheelhouse) / ENVIRONMENTS_FILE
+    if not environments_file.exists():
+        return []
+    return list_packages(environments_file)
+
+
+def is_covered(env_name, covered):
+    """Whether the tox environment `env_name` has all wheels in the wheelhouse.
+
+    Additional factors count as well, `py313-plone62-shard1` is covered by
+    `py313-plone62`.
+    """
+    factors = set(env_name.split("-"))
+    return any(set(name.split("-")) <= factors for name in covered)
+
+
+def wheelhouse_runs(env_names, wheelhouse):
+    """Split the tox environments `env_names` by whether they are covered.
+
+    Yield the names and the environment variables of each group, the covered
+    environments install without a package index, the others from the
+    wheelhouse and the package index.
+    """
+    covered = covered_environments(wheelhouse)
+    with_index = [name for name in env_names if not is_covered(name, covered)]
+    without_index = [name for name in env_names if is_covered(name, covered)]
+    if without_index:
+        yield without_index, wheelhouse_env(wheelhouse)
+    if with_index:
+        yield with_index, wheelhouse_env(wheelhouse, no_index=False)
+
+
+def run_tox(path, wheelhouse, tox_path=None):
+    """Run all tox environments of the repository at `path` with `wheelhouse`.
+
+    Return whether all of them passed.
+    """
+    tox_path = tox_path or shutil.which("tox") or "tox"
+    env_names = subprocess.run(
+        (tox_path, "-l"), cwd=path, capture_output=True, text=True, check=True
+    ).stdout.split()
+    passed = True
+    for names, env in wheelhouse_runs(env_names, wheelhouse):
+        command = (tox_path, "-p", "auto", "-e", ",".join(names))
+        if subprocess.run(command, cwd=path, env=env).returncode != 0:
+            passed = False
+    return passed
+
+
+def record_environment(wheelhouse, env_name):
+    """Add `env_name` to the environments covered by `wheelhouse`"""
+    covered = set(covered_environments(wheelhouse)) | {env_name}
+    (wheelhouse / ENVIRONMENTS_FILE).write_text("\n".join(sorted(covered)) + "\n")
+
+
+def python_version(python):
+    """Return the version of the `python` interpreter, like `3.13`"""
+    return subprocess.run(
+        (python, "-c", "import sys; print('%d.%d' % sys.version_info[:2])"),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+
+def pip_wheel_command(wheelhouse, constraints, requirements, python=sys.executable):
+    """Return the command building the wheels of `requirements`.
+
+    Wheels already in the wheelhouse are reused instead of built again.
+    """
+    command = [
+        python,
+        "-m",
+        "pip",
+        "wheel",
+        "--wheel-dir",
+        str(wheelhouse),
+        "--find-links",
+        str(wheelhouse),
+    ]
+    if constraints:
+        command.extend(["--constraint", constraints])
+    return (*command, *requirements)
+
+
+def build_wheels(paths, wheelhouse, constraints, python=sys.executable):
+    """Build the wheels of all repositories at `paths` into `wheelhouse`.
+
+    The wheels of the tools of the other tox environments are built as well.
+    Return the names of the repositories whose wheels could not be built,
+    `tools` stands for the tools.
+    """
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    failed = []
+    for path in paths:
+        print(f"Building wheels for {path.name} ...")
+        requirements = (f"{path.absolute()}[test]", *TOX_DEPS)
+        command = pip_wheel_command(wheelhouse, constraints, requirements, python)
+        # Do not abort: one broken repository must not stop the others.
+        if subprocess.run(command).returncode != 0:
+            failed.append(path.name)
+    print("Building wheels for the tools of tox ...")
+    for tools_constraints, requirements in (
+        (constraints, QA_DEPS),
+        (None, UNCONSTRAINED_DEPS),
+    ):
+        command = pip_wheel_command(wheelhouse, tools_constraints, requirements, python)
+        if subprocess.run(command).returncode != 0 and "tools" not in failed:
+            failed.append("tools")
+    return failed
+
+
+def main():  # pragma: nocover
+    parser = argparse.ArgumentParser(
+        description="Build the wheels needed to run the tests of repositories "
+        "into one directory, or run tox with them. Use it with --run, the "
+        "`wheelhouse` option of .meta.toml, or the `--wheelhouse` option of "
+        "config-package and switch-to-pep420.",
+    )
+    parser.add_argument(
+        "wheelhouse",
+        type=pathlib.Path,
+        help="path to the directory storing the wheels",
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        type=pathlib.Path,
+        help="path to a repository, or to a packages.txt to build the wheels of "
+        "every repository listed inside",
+    )
+    parser.add_argument(
+        "--clones",
+        type=path_factory("clones", is_dir=True),
+        default=None,
+        help="path to the directory where the clones of the repositories listed "
+        "in packages.txt are stored. Default: the folder of packages.txt.",
+    )
+    parser.add_argument(
+        "--plone-version",
+        dest="plone_versions",
+        action="append",
+        metavar="VERSION",
+        default=None,
+        help="Plone version whose constraints are used, repeat it to build the "
+        "wheels of several Plone versions. Default: 6.2.",
+    )
+    parser.add_argument(
+        "--python",
+        dest="pythons",
+        action="append",
+        metavar="PYTHON",
+        default=None,
+        help="Python interpreter the wheels are built for, repeat it to build "
+        "the wheels of several Python versions. Default: the current one.",
+    )
+    parser.add_argument(
+        "--constraints",
+        dest="constraints",
+        default=None,
+        help="Use this constraints file instead of the one of the Plone version. "
+        "Only with a single Plone version.",
+    )
+    parser.add_argument(
+        "--constraints-cache",
+        dest="constraints_cache",
+        metavar="DIR",
+        default=None,
+        help="Use the constraints files cached in DIR by `meta-constraints`.",
+    )
+    parser.add_argument(
+        "--run",
+        dest="run",
+        action="store_true",
+        help="Do not build anything, run the tox environments of the "
+        "repositories with the wheels built before instead.",
+    )
+    args = parser.parse_args()
+
+    plone_versions = args.plone_versions or ["6.2"]
+    if args.constraints and len(plone_versions) > 1:
+        parser.error("--constraints can only be used with a single Plone version")
+    repositories = []
+    for path in args.paths:
+        if path.suffix == ".txt":
+            clones = args.clones or path.parent
+            repositories.extend(clones / package for package in list_packages(path))
+        else:
+            repositories.append(path)
+    if args.run:
+        wheelhouse = args.wheelhouse.absolute()
+        failed = [path.name for path in repositories if not run_tox(path, wheelhouse)]
+        if failed:
+            print(f"The tests failed in: {', '.join(failed)}")
+            sys.exit(1)
+        return
+    incomplete = []
+    for plone_version in plone_versions:
+        constraints = args.constraints or constraints_url(plone_version)
+        if args.constraints_cache:
+            constraints = cached_location(constraints, args.constraints_cache)
+        for python in args.pythons or [sys.executable]:
+            env_name = tox_env_name(plone_version, python_version(python))
+            print(f"Building the wheels of {env_name} ...")
+            failed = build_wheels(repositories, args.wheelhouse, constraints, python)
+            if failed:
+                incomplete.append(f"{env_name} ({', '.join(failed)})")
+            else:
+                record_environment(args.wheelhouse, env_name)
+    if incomplete:
+        print(f"Could not build all wheels of: {'; '.join(incomplete)}")
+        sys.exit(1)
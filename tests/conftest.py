@@ -40,6 +40,8 @@ def mock_args(mock_git_repo):
         run_tox=False,
         branch_name=None,
         track_package=False,
+        force=False,
+        constraints_cache=None,
     )
 
 
@@ -0,0 +1,153 @@
+from plone.meta.affected import changed_files
+from plone.meta.affected import dependent_modules
+from plone.meta.affected import module_imports
+from plone.meta.affected import runner_arguments
+from plone.meta.affected import select_tests
+
+import pytest
+import subprocess
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """A package with a view registered in ZCML, a helper and three tests."""
+    package = tmp_path / "src" / "plone" / "foo"
+    (package / "tests").mkdir(parents=True)
+    files = {
+        "__init__.py": "",
+        "utils.py": "def helper():\n    return 1\n",
+        "views.py": "from .utils import helper\n",
+        "configure.zcml": '<configure><browser:page class=".views.View" /></configure>',
+        "tests/__init__.py": "",
+        "tests/test_utils.py": "from plone.foo.utils import helper\n",
+        "tests/test_views.py": "from plone.foo import views\n",
+        "tests/test_other.py": "import os\n",
+    }
+    for name, content in files.items():
+        (package / name).write_text(content)
+    return tmp_path
+
+
+class TestModuleImports:
+    def test_absolute(self):
+        assert module_imports("import a.b\nfrom c import d", "x") == {
+            "a",
+            "a.b",
+            "c",
+            "c.d",
+        }
+
+    def test_relative(self):
+        source = "from . import a\nfrom ..b import c"
+        assert module_imports(source, "p.q.m") == {
+            "p",
+            "p.q",
+            "p.q.a",
+            "p.b",
+            "p.b.c",
+        }
+
+    def test_relative_in_package(self):
+        assert module_imports("from .a import b", "p.q", is_package=True) == {
+            "p",
+            "p.q.a",
+            "p.q.a.b",
+        }
+
+
+def test_dependent_modules():
+    graph = {"a": {"b"}, "b": {"c"}, "c": set(), "d": {"a"}, "e": None}
+    assert dependent_modules(graph, {"c"}) == {"a", "b", "c", "d"}
+
+
+class TestSelectTests:
+    def test_imported_helper(self, repository):
+        tests, reason = select_tests(
+            repository, "/src", "zope.testrunner", ["src/plone/foo/utils.py"]
+        )
+        assert [dotted for dotted, _ in tests] == [
+            "plone.foo.tests.test_utils",
+            "plone.foo.tests.test_views",
+        ]
+        assert reason == "changed modules: plone.foo.utils"
+
+    def test_changed_test_module(self, repository):
+        tests, _ = select_tests(
+            repository,
+            "/src",
+            "zope.testrunner",
+            ["src/plone/foo/tests/test_other.py", "CHANGES.md", "news/1.bugfix"],
+        )
+        assert tests == [
+            ("plone.foo.tests.test_other", "src/plone/foo/tests/test_other.py")
+        ]
+
+    def test_documentation_only(self, repository):
+        assert select_tests(repository, "/src", "pytest", ["docs/index.md"]) == (
+            [],
+            "only documentation changed",
+        )
+
+    @pytest.mark.parametrize(
+        "changed,reason",
+        [
+            ([], "no changes found"),
+            (["setup.py"], "setup.py is not a Python module"),
+            (["src/conftest.py"], "src/conftest.py configures the tests"),
+            (
+                ["src/plone/foo/configure.zcml"],
+                "src/plone/foo/configure.zcml is not a Python module",
+            ),
+            (["src/plone/foo/views.py"], "plone.foo.views is registered in ZCML"),
+        ],
+    )
+    def test_all_tests(self, repository, changed, reason):
+        tests, message = select_tests(repository, "/src", "zope.testrunner", changed)
+        assert tests is None
+        assert message.startswith(reason)
+
+    def test_unparsable_module(self, repository):
+        (repository / "src" / "plone" / "foo" / "broken.py").write_text("def (")
+        tests, reason = select_tests(
+            repository, "/src", "zope.testrunner", ["src/plone/foo/utils.py"]
+        )
+        assert tests is None
+        assert reason == "plone.foo.broken cannot be parsed"
+
+
+class TestRunnerArguments:
+    tests = [("plone.foo.tests.test_utils", "src/plone/foo/tests/test_utils.py")]
+
+    def test_zope_testrunner(self, repository):
+        assert runner_arguments(repository, "/src", "zope.testrunner", self.tests) == [
+            "-m",
+            "^(plone[.]foo[.]tests[.]test_utils)$",
+        ]
+
+    def test_pytest(self, repository):
+        assert runner_arguments(repository, "/src", "pytest", self.tests) == [
+            f"--ignore={repository}/src/plone/foo/tests/test_other.py",
+            f"--ignore={repository}/src/plone/foo/tests/test_views.py",
+        ]
+
+
+class TestChangedFiles:
+    def git(self, path, *args):
+        subprocess.run(
+            ("git", "-c", "user.name=test", "-c", "user.email=test@example.com") + args,
+            cwd=path,
+            check=True,
+            capture_output=True,
+        )
+
+    def test_changes_since_merge_base(self, repository):
+        self.git(repository, "init", "-q")
+        self.git(repository, "add", ".")
+        self.git(repository, "commit", "-q", "-m", "initial")
+        self.git(repository, "branch", "base")
+        (repository / "src" / "plone" / "foo" / "utils.py").write_text("")
+        assert changed_files(repository, "base") == ["src/plone/foo/utils.py"]
+
+    def test_unknown_base(self, tmp_path):
+        self.git(tmp_path, "init", "-q")
+        assert changed_files(tmp_path, "origin/HEAD") is None
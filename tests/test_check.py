@@ -0,0 +1,104 @@
+from plone.meta.check import check
+from plone.meta.check import checksum
+from plone.meta.check import drifted_files
+from plone.meta.check import read_checksums
+from plone.meta.config_package import PackageConfiguration
+from unittest.mock import patch
+
+import subprocess
+import sys
+import tomlkit
+
+
+class TestChecksum:
+    def test_ignores_manual_config(self):
+        template = (
+            "a = 1\n# START-MARKER-MANUAL-CONFIG\n{}\n# END-MARKER-MANUAL-CONFIG\n"
+        )
+        assert checksum(template.format("x")) == checksum(template.format("y"))
+
+    def test_detects_changes(self):
+        assert checksum("a = 1\n") != checksum("a = 2\n")
+
+
+class TestReadChecksums:
+    def test_no_meta_toml(self, tmp_path):
+        assert read_checksums(tmp_path) is None
+
+    def test_no_manifest(self, meta_toml_factory):
+        path = meta_toml_factory()
+        assert read_checksums(path) is None
+
+
+class TestCheck:
+    def test_configured_package_is_clean(self, package_config):
+        package_config.editorconfig()
+        package_config.tox()
+        package_config.remove_toml_empty_sections()
+        assert check(package_config.path) == 0
+
+    def test_reports_drifted_files(self, package_config, capsys):
+        package_config.editorconfig()
+        package_config.tox()
+        package_config.remove_toml_empty_sections()
+        (package_config.path / "tox.ini").write_text("[tox]\n")
+        (package_config.path / ".editorconfig").unlink()
+        checksums = read_checksums(package_config.path)
+        assert drifted_files(package_config.path, checksums) == [
+            (".editorconfig", "missing"),
+            ("tox.ini", "modified"),
+        ]
+        assert check(package_config.path) == 1
+        assert "tox.ini (modified)" in capsys.readouterr().out
+
+    def test_forgets_files_no_longer_generated(self, package_config):
+        for method in package_config.generators:
+            method()
+        package_config.remove_toml_empty_sections()
+        checksums = read_checksums(package_config.path)
+        assert ".flake8" in checksums
+        assert ".github/workflows/test-matrix.yml" in checksums
+
+        meta_toml = package_config.path / ".meta.toml"
+        meta_cfg = tomlkit.loads(meta_toml.read_text())
+        meta_cfg["pre_commit"] = {"linter": "ruff"}
+        meta_cfg["tox"] = {"use_test_matrix": False}
+        meta_toml.write_text(tomlkit.dumps(meta_cfg))
+        with (
+            patch(
+                "plone.meta.config_package.git_server_url",
+                return_value="https://github.com/plone/test-package",
+            ),
+            patch("plone.meta.config_package.version", return_value="2.4.0"),
+        ):
+            package = PackageConfiguration(package_config.args)
+            for method in package.generators:
+                method()
+        package.remove_toml_empty_sections()
+        (package.path / ".flake8").unlink()
+        (package.path / ".github/workflows/test-matrix.yml").unlink()
+
+        checksums = read_checksums(package.path)
+        assert ".flake8" not in checksums
+        assert ".github/workflows/test-matrix.yml" not in checksums
+        assert ".editorconfig" in checksums
+        assert check(package.path) == 0
+        inputs = tomlkit.loads(meta_toml.read_text())["meta"]["inputs"]
+        assert sorted(inputs) == sorted(checksums)
+
+    def test_without_manifest(self, meta_toml_factory, capsys):
+        path = meta_toml_factory()
+        assert check(path) == 1
+        assert "No checksums found" in capsys.readouterr().out
+
+
+def test_check_does_not_import_jinja_nor_validators():
+    code = (
+        "import sys; import plone.meta.config_package; "
+        "print(sorted({'jinja2', 'yaml', 'validate_pyproject', 'editorconfig',"
+        " 'urllib.request'} & set(sys.modules)))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,177 @@
+from plone.meta.ci_cost import ci_jobs
+from plone.meta.ci_cost import env_minutes
+from plone.meta.ci_cost import estimate
+from plone.meta.ci_cost import format_report
+from plone.meta.ci_cost import push_minutes
+from plone.meta.shared.history import read_env_durations
+
+import json
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+  <testsuite name="pytest" tests="2" time="90.5">
+    <testcase classname="plone.foo.tests.test_a" name="test_1" time="60.0"/>
+  </testsuite>
+  <testsuite name="pytest" tests="1" time="29.5"/>
+</testsuites>
+"""
+
+
+class TestReadEnvDurations:
+    def test_junit_keyed_by_file_name(self, tmp_path):
+        path = tmp_path / "py313-plone62.xml"
+        path.write_text(JUNIT)
+        assert read_env_durations([path]) == {"py313-plone62": 120.0}
+
+    def test_tox_result_json(self, tmp_path):
+        path = tmp_path / "result.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "testenvs": {
+                        "lint": {"test": [{"elapsed": 12.0}]},
+                        "py312-plone61": {
+                            "setup": [{"elapsed": 30.0}],
+                            "test": [{"elapsed": 90.0}],
+                        },
+                    }
+                }
+            )
+        )
+        assert read_env_durations([path]) == {"lint": 12.0, "py312-plone61": 120.0}
+
+    def test_median_of_several_files(self, tmp_path):
+        paths = []
+        for index, seconds in enumerate((60, 600, 120)):
+            path = tmp_path / f"run{index}.json"
+            path.write_text(json.dumps({"lint": seconds}))
+            paths.append(path)
+        assert read_env_durations(paths) == {"lint": 120}
+
+
+class TestCiJobs:
+    def test_github_default(self):
+        branch, main = ci_jobs({}, "github")
+        assert branch == main
+        assert branch[:5] == [
+            "lint",
+            "coverage",
+            "dependencies",
+            "release-check",
+            "circular",
+        ]
+        # edges strategy: 2 Python versions per Plone version
+        assert len(branch) == 5 + 6
+
+    def test_split_strategy(self):
+        meta_cfg = {"tox": {"matrix_strategy": "minimal-on-PR"}}
+        branch, main = ci_jobs(meta_cfg, "github")
+        assert len(branch) < len(main)
+        assert len(main) == 5 + 14
+
+    def test_gitlab_without_testing_job(self):
+        meta_cfg = {"gitlab": {"jobs": ["lint", "coverage"]}}
+        assert ci_jobs(meta_cfg, "gitlab") == (
+            ["lint", "coverage"],
+            ["lint", "coverage"],
+        )
+
+    def test_no_test_matrix(self):
+        meta_cfg = {"tox": {"use_test_matrix": False}, "github": {"jobs": ["qa"]}}
+        assert ci_jobs(meta_cfg, "github") == (["lint"], ["lint"])
+
+    def test_shards(self):
+        meta_cfg = {
+            "tox": {"test_matrix": {"6.2": ["3.13"]}, "test_shards": 2},
+            "github": {"jobs": ["qa", "coverage"]},
+        }
+        branch, main = ci_jobs(meta_cfg, "github")
+        assert branch == [
+            "lint",
+            "coverage-shard1",
+            "coverage-shard2",
+            "coverage-combine",
+            "py313-plone62-shard1",
+            "py313-plone62-shard2",
+        ]
+        assert branch == main
+
+
+class TestEnvMinutes:
+    durations = {"py313-plone62": 120, "py310-plone62": 240, "py39-plone60": 540}
+
+    def test_recorded(self):
+        assert env_minutes("py313-plone62", self.durations) == (2, False)
+
+    def test_same_plone_version(self):
+        assert env_minutes("py312-plone62", self.durations) == (3, True)
+
+    def test_any_matrix_environment(self):
+        assert env_minutes("py312-plone61", self.durations) == (5, True)
+
+    def test_default(self):
+        assert env_minutes("lint", self.durations, default=7) == (7, True)
+
+    def test_shard(self):
+        assert env_minutes("py313-plone62-shard1", self.durations, shards=2) == (
+            1,
+            False,
+        )
+        assert env_minutes("py312-plone62-shard1", self.durations, shards=3) == (
+            1,
+            True,
+        )
+
+    def test_github_rounds_up_every_job(self):
+        durations = {"lint": 61, "coverage": 61}
+        assert push_minutes(["lint", "coverage"], durations, "github") == (4, [])
+        minutes, guessed = push_minutes(["lint", "coverage"], durations, "gitlab")
+        assert round(minutes, 2) == 2.03
+        assert guessed == []
+
+
+class TestEstimate:
+    def test_package(self, meta_toml_factory):
+        path = meta_toml_factory(
+            {"tox": {"test_matrix": {"6.2": ["3.13"]}}, "github": {"jobs": ["qa"]}}
+        )
+        result = estimate(path, {"lint": 30, "py313-plone62": 300})
+        assert result["ci"] == "github"
+        assert result["branch_jobs"] == 2
+        assert result["branch_minutes"] == 6
+        assert result["guessed"] == []
+
+    def test_gitlab_detected(self, meta_toml_factory):
+        path = meta_toml_factory({"gitlab": {"jobs": ["lint"]}})
+        (path / ".gitlab-ci.yml").write_text("")
+        result = estimate(path, {})
+        assert result["ci"] == "gitlab"
+        assert result["guessed"] == ["lint"]
+
+    def test_report(self):
+        results = [
+            {
+                "name": "plone.foo",
+                "ci": "github",
+                "branch_jobs": 2,
+                "branch_minutes": 6,
+                "main_jobs": 2,
+                "main_minutes": 6,
+                "guessed": [],
+            },
+            {
+                "name": "plone.bar",
+                "ci": "gitlab",
+                "branch_jobs": 2,
+                "branch_minutes": 4,
+                "main_jobs": 3,
+                "main_minutes": 8,
+                "guessed": ["lint"],
+            },
+        ]
+        assert format_report(results, 10, 1).splitlines() == [
+            "package      ci      jobs/push   min/push  min/month",
+            "plone.foo    github          2        6.0         66",
+            "plone.bar *  gitlab      2 (3)  4.0 (8.0)         48",
+            "total                                            114",
+        ]
@@ -0,0 +1,113 @@
+from plone.meta.ci_images import dockerfile
+from plone.meta.ci_images import generate
+from plone.meta.ci_images import install_commands
+from plone.meta.ci_images import python_versions
+
+import pytest
+
+
+class TestInstallCommands:
+    def test_github_packages(self):
+        meta_cfg = {"github": {"os_dependencies": "libxml2 libxslt1-dev"}}
+        assert install_commands(meta_cfg, "github") == [
+            "apt-get update",
+            "apt-get install -y --no-install-recommends libxml2 libxslt1-dev",
+            "rm -rf /var/lib/apt/lists/*",
+        ]
+
+    def test_github_nothing(self):
+        assert install_commands({}, "github") == []
+
+    def test_gitlab_commands_and_circular(self):
+        meta_cfg = {
+            "gitlab": {
+                "os_dependencies": "    - apt-get update\n    - apt-get install -y git\n"
+            }
+        }
+        assert install_commands(meta_cfg, "gitlab") == [
+            "apt-get update",
+            "apt-get install -y git",
+            "apt-get install -y --no-install-recommends graphviz graphviz-dev",
+            "rm -rf /var/lib/apt/lists/*",
+        ]
+
+    def test_gitlab_without_circular_job(self):
+        meta_cfg = {"gitlab": {"jobs": ["lint", "testing"]}}
+        assert install_commands(meta_cfg, "gitlab") == []
+
+
+def test_dockerfile():
+    assert dockerfile("python:3.13-trixie", ["apt-get update", "true"]) == (
+        "# Generated by meta-ci-images from .meta.toml, do not edit.\n"
+        "FROM python:3.13-trixie\n"
+        "RUN apt-get update \\\n"
+        "    && true\n"
+        "RUN pip install --no-cache-dir tox-uv\n"
+    )
+
+
+def test_python_versions_with_pypy():
+    meta_cfg = {"tox": {"test_matrix": {"6.2": ["3.13", "pypy3.10", "3.10"]}}}
+    assert python_versions(meta_cfg) == ["3.10", "3.13", "pypy3.10"]
+
+
+class TestGenerate:
+    def test_one_image_per_python_version(self, meta_toml_factory, tmp_path):
+        path = meta_toml_factory(
+            {
+                "github": {"prebuilt_images": "ghcr.io/plone/ci"},
+                "tox": {"test_matrix": {"6.2": ["3.13", "3.10"], "6.1": ["3.10"]}},
+            }
+        )
+        output = tmp_path / "images"
+        assert generate(path, output) == [
+            "Dockerfile.py3.10",
+            "Dockerfile.py3.13",
+            "build.sh",
+        ]
+        assert "FROM python:3.10-trixie\n" in (output / "Dockerfile.py3.10").read_text()
+        script = (output / "build.sh").read_text()
+        assert (
+            "docker build --pull -f Dockerfile.py3.13 -t ghcr.io/plone/ci:py3.13 ."
+            in script
+        )
+
+    def test_gitlab_custom_images(self, meta_toml_factory, tmp_path):
+        path = meta_toml_factory(
+            {
+                "gitlab": {"custom_images": {"3.12": "my/python:3.12"}},
+                "tox": {"test_matrix": {"6.1": ["3.12"]}},
+            }
+        )
+        (path / ".gitlab-ci.yml").write_text("")
+        generate(path, tmp_path, prefix="registry/ci")
+        assert "FROM my/python:3.12\n" in (tmp_path / "Dockerfile.py3.12").read_text()
+
+    def test_github_skips_pypy(self, meta_toml_factory, tmp_path):
+        path = meta_toml_factory(
+            {
+                "github": {"prebuilt_images": "ghcr.io/plone/ci"},
+                "tox": {"test_matrix": {"6.2": ["3.13", "pypy3.10"]}},
+            }
+        )
+        assert generate(path, tmp_path) == ["Dockerfile.py3.13", "build.sh"]
+
+    def test_gitlab_pypy(self, meta_toml_factory, tmp_path):
+        path = meta_toml_factory(
+            {
+                "gitlab": {"custom_images": {"pypy3.10": "pypy:3.10"}},
+                "tox": {"test_matrix": {"6.1": ["pypy3.10"]}},
+            }
+        )
+        (path / ".gitlab-ci.yml").write_text("")
+        assert generate(path, tmp_path, prefix="registry/ci") == [
+            "Dockerfile.pypy3.10",
+            "build.sh",
+        ]
+        assert "FROM pypy:3.10\n" in (tmp_path / "Dockerfile.pypy3.10").read_text()
+        assert "-t registry/ci:pypy3.10 ." in (tmp_path / "build.sh").read_text()
+
+    def test_no_image_name(self, meta_toml_factory, tmp_path):
+        path = meta_toml_factory({"tox": {}})
+        with pytest.raises(ValueError, match="No image name"):
+            generate(path, tmp_path)
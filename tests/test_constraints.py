@@ -0,0 +1,92 @@
+from plone.meta.constraints import cache_constraints
+from plone.meta.constraints import cache_path
+from plone.meta.constraints import cached_location
+from plone.meta.constraints import constraints_url
+from plone.meta.constraints import fetch
+
+import pathlib
+
+
+def test_constraints_url():
+    assert constraints_url("6.2") == (
+        "https://dist.plone.org/release/6.2-dev/constraints.txt"
+    )
+    assert constraints_url("6.2", "file:///mirror/") == (
+        "file:///mirror/6.2-dev/constraints.txt"
+    )
+
+
+def test_cache_path():
+    assert cache_path(constraints_url("6.1")) == pathlib.PurePosixPath(
+        "dist.plone.org/release/6.1-dev/constraints.txt"
+    )
+    assert cache_path("file:///srv/constraints.txt") == pathlib.PurePosixPath(
+        "local/srv/constraints.txt"
+    )
+
+
+def test_cached_location():
+    assert cached_location("https://example.org/a/c.txt", "../cache") == (
+        "../cache/example.org/a/c.txt"
+    )
+
+
+class TestCacheConstraints:
+    def test_nested_includes_are_rewritten(self, tmp_path):
+        source = tmp_path / "source"
+        (source / "zope").mkdir(parents=True)
+        (source / "constraints.txt").write_text(
+            "-c zope/constraints.txt\nplone.api==2.0\n"
+        )
+        (source / "zope" / "constraints.txt").write_text(
+            "--constraint=../extra.txt  # comment\nZope==5.13\n"
+        )
+        (source / "extra.txt").write_text("-c constraints.txt\nextra==1.0\n")
+        cache = tmp_path / "cache"
+
+        destination = cache_constraints(source / "constraints.txt", cache)
+
+        assert destination == cache / cache_path(str(source / "constraints.txt"))
+        assert destination.read_text() == ("-c zope/constraints.txt\nplone.api==2.0\n")
+        assert (destination.parent / "zope" / "constraints.txt").read_text() == (
+            "--constraint=../extra.txt  # comment\nZope==5.13\n"
+        )
+        # the include cycle back to the first file does not recurse forever
+        assert (destination.parent / "extra.txt").read_text() == (
+            "-c constraints.txt\nextra==1.0\n"
+        )
+
+    def test_cross_host_includes(self, tmp_path):
+        mirror = tmp_path / "mirror"
+        (mirror / "6.2-dev").mkdir(parents=True)
+        other = tmp_path / "other.txt"
+        other.write_text("Zope==5.13\n")
+        (mirror / "6.2-dev" / "constraints.txt").write_text(
+            f"-c {other.as_uri()}\nplone.api==2.0\n"
+        )
+        cache = tmp_path / "cache"
+
+        destination = cache_constraints(constraints_url("6.2"), cache, mirror=mirror)
+
+        assert destination == cache / "dist.plone.org/release/6.2-dev/constraints.txt"
+        first_line = destination.read_text().splitlines()[0]
+        assert first_line.startswith("-c ../../../local/")
+        included = (destination.parent / first_line[3:]).resolve()
+        assert included.read_text() == "Zope==5.13\n"
+
+    def test_cached_files_are_pinned(self, tmp_path):
+        source = tmp_path / "constraints.txt"
+        source.write_text("plone.api==2.0\n")
+        cache = tmp_path / "cache"
+        destination = cache_constraints(source, cache)
+        source.write_text("plone.api==3.0\n")
+
+        assert cache_constraints(source, cache).read_text() == "plone.api==2.0\n"
+        cache_constraints(source, cache, refresh=True)
+        assert destination.read_text() == "plone.api==3.0\n"
+
+
+def test_fetch_from_mirror(tmp_path):
+    (tmp_path / "6.1-dev").mkdir()
+    (tmp_path / "6.1-dev" / "constraints.txt").write_text("a==1\n")
+    assert fetch(constraints_url("6.1"), mirror=str(tmp_path)) == "a==1\n"
@@ -0,0 +1,90 @@
+from plone.meta.config_package import handle_command_line_arguments
+from plone.meta.config_package import PackageConfiguration
+from plone.meta.drift import format_report
+from plone.meta.drift import package_drift
+from plone.meta.drift import recorded_version
+from plone.meta.drift import stale_files
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def drift_repo(pyproject_toml, meta_toml_factory):
+    path = meta_toml_factory({"meta": {"template": "default", "commit-id": "2.3.0"}})
+    pyproject_toml()
+    with (
+        patch(
+            "plone.meta.config_package.git_server_url",
+            return_value="https://github.com/plone/test-package",
+        ),
+        patch("plone.meta.config_package.version", return_value="2.4.0"),
+    ):
+        yield path
+
+
+class TestRecordedVersion:
+    def test_reads_commit_id(self, drift_repo):
+        assert recorded_version(drift_repo) == "2.3.0"
+
+    def test_no_meta_toml(self, tmp_path):
+        assert recorded_version(tmp_path) == ""
+
+
+class TestStaleFiles:
+    def test_missing_and_different(self, tmp_path):
+        (tmp_path / "same.txt").write_text("same\n")
+        (tmp_path / "other.txt").write_text("old\n")
+        rendered = {"same.txt": "same\n", "other.txt": "new\n", "missing.txt": "x\n"}
+        assert stale_files(tmp_path, rendered) == ["missing.txt", "other.txt"]
+
+
+class TestPackageDrift:
+    def test_reports_all_files_when_unconfigured(self, drift_repo):
+        name, recorded, stale, error = package_drift(drift_repo)
+        assert name == drift_repo.name
+        assert recorded == "2.3.0"
+        assert error == ""
+        assert "tox.ini" in stale
+        assert ".github/workflows/meta.yml" in stale
+
+    def test_does_not_modify_the_repository(self, drift_repo):
+        def snapshot():
+            return {
+                file_obj.relative_to(drift_repo): file_obj.read_bytes()
+                for file_obj in drift_repo.rglob("*")
+                if file_obj.is_file()
+            }
+
+        (drift_repo / "tox.ini").write_text("outdated")
+        before = snapshot()
+        package_drift(drift_repo)
+        assert snapshot() == before
+
+    def test_up_to_date_files_are_not_reported(self, drift_repo):
+        args = handle_command_line_arguments([str(drift_repo), "--no-commit"])
+        for relative, content in PackageConfiguration(args).render().items():
+            (drift_repo / relative).parent.mkdir(parents=True, exist_ok=True)
+            (drift_repo / relative).write_text(content)
+        (drift_repo / ".editorconfig").write_text("outdated")
+        _, _, stale, _ = package_drift(drift_repo)
+        assert stale == [".editorconfig"]
+
+    def test_no_git_clone(self, tmp_path):
+        _, _, stale, error = package_drift(tmp_path)
+        assert stale == []
+        assert error == "no git clone found"
+
+
+class TestFormatReport:
+    def test_table(self):
+        results = [
+            ("plone.a", "2.4.0", [], ""),
+            ("plone.bbb", "2.3.0", ["tox.ini", ".flake8"], ""),
+            ("plone.c", "", [], "boom"),
+        ]
+        lines = format_report(results, "2.4.0").splitlines()
+        assert lines[0].split() == ["package", "recorded", "stale", "files"]
+        assert lines[1].split() == ["plone.a", "2.4.0", "-"]
+        assert lines[2].split() == ["plone.bbb", "2.3.0", "(!)", "tox.ini,", ".flake8"]
+        assert "ERROR: boom" in lines[3]
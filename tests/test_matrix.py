@@ -0,0 +1,87 @@
+from plone.meta.config_package import TOX_TEST_MATRIX
+from plone.meta.matrix import check_strategy
+from plone.meta.matrix import default_branch_cells
+from plone.meta.matrix import matrix_cells
+
+import pytest
+
+MATRIX = {
+    "6.2": ["3.14", "3.13", "3.12", "3.11", "3.10"],
+    "6.1": ["3.13", "3.12", "3.11", "3.10"],
+    "6.0": ["3.13", "3.12", "3.11", "3.10", "3.9"],
+}
+
+
+def covers_all_versions(test_matrix, cells):
+    plone_versions = {plone for plone, _ in cells}
+    python_versions = {python for _, python in cells}
+    all_pythons = {python for versions in test_matrix.values() for python in versions}
+    return plone_versions == set(test_matrix) and python_versions == all_pythons
+
+
+class TestMatrixCells:
+    def test_full(self):
+        cells = matrix_cells(MATRIX, "full")
+        assert len(cells) == 14
+        assert cells[0] == ("6.2", "3.14")
+
+    def test_edges(self):
+        cells = matrix_cells(MATRIX, "edges")
+        assert cells == [
+            ("6.2", "3.14"),
+            ("6.2", "3.10"),
+            ("6.1", "3.13"),
+            ("6.1", "3.10"),
+            ("6.0", "3.9"),
+            ("6.0", "3.13"),
+        ]
+
+    def test_edges_keeps_pypy(self):
+        cells = matrix_cells({"6.2": ["3.13", "pypy3.10", "3.11", "3.10"]}, "edges")
+        assert ("6.2", "pypy3.10") in cells
+        assert ("6.2", "3.11") not in cells
+
+    def test_edges_is_the_default(self):
+        assert (
+            matrix_cells(MATRIX)
+            == matrix_cells(MATRIX, "")
+            == matrix_cells(MATRIX, "edges")
+        )
+
+    @pytest.mark.parametrize(
+        "test_matrix",
+        [
+            MATRIX,
+            TOX_TEST_MATRIX,
+            {"6.2": ["3.13"]},
+            {"6.2": ["3.13", "pypy3.10"], "6.1": ["3.12", "3.11"]},
+            {"6.2": ["3.13", "3.12"], "6.1": ["3.13", "3.12"], "6.0": ["3.12"]},
+        ],
+    )
+    def test_pairwise_covers_every_version(self, test_matrix):
+        cells = matrix_cells(test_matrix, "pairwise")
+        assert covers_all_versions(test_matrix, cells)
+        plone_count = len(test_matrix)
+        python_count = len({p for versions in test_matrix.values() for p in versions})
+        assert len(cells) == max(plone_count, python_count)
+
+    def test_pairwise_spreads_versions(self):
+        cells = matrix_cells(MATRIX, "pairwise")
+        per_plone = [plone for plone, _ in cells]
+        assert per_plone.count("6.2") == per_plone.count("6.1") == 2
+        assert per_plone.count("6.0") == 2
+
+    def test_split_uses_pairwise_on_branches(self):
+        assert matrix_cells(MATRIX, "minimal-on-PR") == matrix_cells(MATRIX, "pairwise")
+
+    def test_unknown_strategy(self):
+        with pytest.raises(ValueError, match="Unknown `matrix_strategy`"):
+            check_strategy("everything")
+
+
+class TestDefaultBranchCells:
+    def test_only_for_split_strategy(self):
+        assert default_branch_cells(MATRIX, "edges") is None
+        assert default_branch_cells(MATRIX, "minimal-on-PR") == matrix_cells(
+            MATRIX, "full"
+        )
@@ -1,6 +1,7 @@
 from unittest.mock import patch
 
 import pytest
+import yaml
 
 
 class TestCommitAndPush:
@@ -169,3 +170,361 @@ class TestGitlabTestingMatrix:
         package_config.meta_cfg["tox"]["test_matrix"] = {"6.2": ["9.99"]}
         with pytest.raises(ValueError, match="no Docker image"):
             package_config._gitlab_testing_matrix({"9.99": None})
+
+
+class TestMatrixStrategy:
+    def test_gha_full(self, package_config):
+        package_config.meta_cfg["tox"]["matrix_strategy"] = "full"
+        result = package_config.handle_gh_actions()
+        assert result.count("-plone") == 14
+
+    def test_gha_split_expression(self, package_config):
+        package_config.meta_cfg["tox"]["matrix_strategy"] = "minimal-on-PR"
+        package_config.gha_workflows()
+        content = (
+            package_config.path / ".github" / "workflows" / "test-matrix.yml"
+        ).read_text()
+        config = yaml.safe_load(content)["jobs"]["build"]["strategy"]["matrix"][
+            "config"
+        ]
+        assert config.startswith("${{ fromJSON(")
+        assert "default_branch" in config
+
+    def test_gha_no_expression_by_default(self, package_config):
+        assert package_config._gh_matrix_expression() == ""
+
+    def test_gitlab_split(self, package_config):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["tox"]["matrix_strategy"] = "minimal-on-PR"
+        package_config.gitlab_ci()
+        data = yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+        assert len(data["testing-full"]["parallel"]["matrix"]) == 14
+        assert len(data["testing"]["parallel"]["matrix"]) == 6
+        assert "except" not in data["testing"]
+
+    def test_gitlab_default_has_no_full_job(self, package_config):
+        package_config.is_gitlab = True
+        package_config.gitlab_ci()
+        data = yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+        assert "testing-full" not in data
+        assert data["testing"]["except"] == ["schedules"]
+
+
+class TestToxInstaller:
+    def test_pip_by_default(self, package_config):
+        assert "tox-uv" not in package_config.render()["tox.ini"]
+
+    def test_uv_requires_tox_uv(self, package_config):
+        package_config.meta_cfg["tox"]["installer"] = "uv"
+        tox_ini = package_config.render()["tox.ini"]
+        assert "requires =\n    tox-uv\n" in tox_ini
+
+    def test_unknown_installer(self, package_config):
+        package_config.meta_cfg["tox"]["installer"] = "conda"
+        with pytest.raises(ValueError, match="Unknown tox `installer`"):
+            package_config.tox()
+
+    def test_gitlab_uses_uvx(self, package_config):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["tox"]["installer"] = "uv"
+        package_config.gitlab_ci()
+        data = yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+        assert data["lint"]["script"][-2:] == [
+            "pip install uv",
+            "uvx --with tox-uv tox -e lint",
+        ]
+
+    @patch("plone.meta.config_package.shutil.which", return_value="/usr/bin/uvx")
+    @patch("plone.meta.config_package.call")
+    def test_run_tox_with_uvx(self, mock_call, mock_which, package_config):
+        package_config.meta_cfg["tox"]["installer"] = "uv"
+        package_config.run_tox()
+        assert mock_call.call_args.args == (
+            "/usr/bin/uvx",
+            "--with",
+            "tox-uv",
+            "tox",
+            "-e",
+            "format,lint",
+        )
+
+
+class TestTestShards:
+    @pytest.fixture
+    def sharded_config(self, package_config):
+        tests = package_config.path / "src" / "plone" / "foo" / "tests"
+        tests.mkdir(parents=True)
+        for name in ("test_a", "test_b"):
+            (tests / f"{name}.py").touch()
+        package_config.meta_cfg["tox"]["test_shards"] = 2
+        return package_config
+
+    def test_github_matrix(self, sharded_config):
+        content = sharded_config.render()[".github/workflows/test-matrix.yml"]
+        data = yaml.safe_load(content)
+        assert data["jobs"]["build"]["strategy"]["matrix"]["shard"] == ["1", "2"]
+        assert "tox -e ${{ matrix.config[2] }}-shard${{ matrix.shard }}" in content
+
+    def test_github_coverage(self, sharded_config):
+        content = sharded_config.render()[".github/workflows/meta.yml"]
+        data = yaml.safe_load(content)
+        assert data["jobs"]["coverage"]["with"] == {"shards": '["1", "2"]'}
+
+    def test_github_coverage_with_test_matrix(self, sharded_config):
+        sharded_config.meta_cfg["github"] = {
+            "os_dependencies": "libxml2",
+            "test_paths_ignore": ["docs/**"],
+        }
+        content = sharded_config.render()[".github/workflows/test-matrix.yml"]
+        data = yaml.safe_load(content)
+        assert data["jobs"]["coverage"]["with"] == {
+            "os-packages": "libxml2",
+            "shards": '["1", "2"]',
+        }
+
+    def test_gitlab(self, sharded_config):
+        sharded_config.is_gitlab = True
+        sharded_config.meta_cfg["gitlab"] = {"jobs": ["testing", "coverage"]}
+        sharded_config.gitlab_ci()
+        data = yaml.safe_load((sharded_config.path / ".gitlab-ci.yml").read_text())
+        assert data["testing"]["parallel"]["matrix"][0]["SHARD"] == ["1", "2"]
+        assert data["testing"]["script"][-1].startswith("tox -e $TOX_ENV-shard$SHARD")
+        assert data["coverage"]["parallel"]["matrix"] == [{"SHARD": ["1", "2"]}]
+        assert data["coverage-combine"]["script"][-1] == "tox -e coverage-combine"
+
+
+class TestAffectedTests:
+    def test_tox_environment(self, package_config):
+        package_config.meta_cfg["tox"]["affected_tests"] = True
+        tox_ini = package_config.render()["tox.ini"]
+        assert "[testenv:affected]\n" in tox_ini
+        assert "-- tox -c {toxinidir} -e {posargs:test}\n" in tox_ini
+
+    def test_not_with_shards(self, package_config):
+        tests = package_config.path / "src" / "plone" / "foo" / "tests"
+        tests.mkdir(parents=True)
+        for name in ("test_a", "test_b"):
+            (tests / f"{name}.py").touch()
+        package_config.meta_cfg["tox"]["affected_tests"] = True
+        package_config.meta_cfg["tox"]["test_shards"] = 2
+        with pytest.raises(ValueError, match="Invalid tox `affected_tests`"):
+            package_config.tox()
+
+    def test_github(self, package_config):
+        package_config.meta_cfg["tox"]["affected_tests"] = True
+        content = package_config.render()[".github/workflows/test-matrix.yml"]
+        steps = yaml.safe_load(content)["jobs"]["build"]["steps"]
+        assert steps[0]["with"]["fetch-depth"] == 0
+        assert steps[-1]["run"].endswith("tox -e affected -- ${{ matrix.config[2] }}")
+
+    def test_gitlab(self, package_config):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["tox"]["affected_tests"] = True
+        package_config.gitlab_ci()
+        data = yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+        assert data["testing"]["variables"]["GIT_DEPTH"] == 0
+        assert data["testing"]["script"][-2:] == [
+            "git fetch origin $CI_DEFAULT_BRANCH",
+            "tox -e affected -- $TOX_ENV -- --xml reports",
+        ]
+
+
+class TestCache:
+    def test_github_tox_environments(self, package_config):
+        content = package_config.render()[".github/workflows/test-matrix.yml"]
+        steps = yaml.safe_load(content)["jobs"]["build"]["steps"]
+        cache = [step for step in steps if step.get("uses") == "actions/cache@v5"]
+        assert cache[0]["with"]["path"] == ".tox"
+        assert cache[0]["with"]["key"].startswith(
+            "tox-${{ matrix.os[1] }}-${{ matrix.config[2] }}-${{ steps.week.outputs.week }}-"
+        )
+
+    def test_github_disabled(self, package_config):
+        package_config.meta_cfg["github"]["cache"] = False
+        content = package_config.render()[".github/workflows/test-matrix.yml"]
+        assert "actions/cache" not in content
+
+    def test_gitlab(self, package_config):
+        package_config.is_gitlab = True
+        package_config.gitlab_ci()
+        data = yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+        assert data[".dependency-cache"]["cache"]["key"]["files"] == [
+            "tox.ini",
+            "pyproject.toml",
+        ]
+        assert data["testing"]["extends"] == ".dependency-cache"
+        assert data["lint"]["cache"]["key"]["files"] == [".pre-commit-config.yaml"]
+
+    def test_gitlab_disabled(self, package_config):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["gitlab"]["cache"] = False
+        package_config.gitlab_ci()
+        content = (package_config.path / ".gitlab-ci.yml").read_text()
+        assert ".dependency-cache" not in content
+
+
+class TestGitlabPipeline:
+    def gitlab_ci(self, package_config, **options):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["gitlab"].update(options)
+        package_config.gitlab_ci()
+        return yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+
+    def test_stages_by_default(self, package_config):
+        data = self.gitlab_ci(package_config)
+        assert "needs" not in data["testing"]
+        assert "needs" not in data["coverage"]
+
+    def test_dag(self, package_config):
+        data = self.gitlab_ci(package_config, pipeline="dag")
+        assert data["testing"]["needs"] == []
+        assert data["coverage"]["needs"] == []
+
+    def test_lint_gate(self, package_config):
+        data = self.gitlab_ci(package_config, pipeline="lint-gate")
+        assert data["testing"]["needs"] == ["lint"]
+
+    def test_lint_gate_without_lint_job(self, package_config):
+        data = self.gitlab_ci(
+            package_config, pipeline="lint-gate", jobs=["testing", "coverage"]
+        )
+        assert data["testing"]["needs"] == []
+
+    def test_unknown(self, package_config):
+        with pytest.raises(ValueError, match="Unknown gitlab `pipeline`"):
+            self.gitlab_ci(package_config, pipeline="fast")
+
+
+class TestPrebuiltImages:
+    def test_github_container(self, package_config):
+        package_config.meta_cfg["github"]["prebuilt_images"] = "ghcr.io/plone/ci"
+        package_config.meta_cfg["github"]["os_dependencies"] = "libxml2"
+        content = package_config.render()[".github/workflows/test-matrix.yml"]
+        job = yaml.safe_load(content)["jobs"]["build"]
+        assert job["container"] == "ghcr.io/plone/ci:py${{ matrix.config[0] }}"
+        assert "apt-get" not in content
+
+    def test_github_pypy_on_runner(self, package_config):
+        package_config.meta_cfg["github"]["prebuilt_images"] = "ghcr.io/plone/ci"
+        package_config.meta_cfg["github"]["os_dependencies"] = "libxml2"
+        package_config.meta_cfg["tox"]["test_matrix"] = {"6.2": ["3.13", "pypy3.10"]}
+        content = package_config.render()[".github/workflows/test-matrix.yml"]
+        job = yaml.safe_load(content)["jobs"]["build"]
+        assert job["container"] == (
+            "${{ !startsWith(matrix.config[0], 'pypy') && "
+            "format('ghcr.io/plone/ci:py{0}', matrix.config[0]) || '' }}"
+        )
+        install = [
+            step
+            for step in job["steps"]
+            if step.get("run", "").startswith("sudo apt-get")
+        ]
+        assert install[0]["if"] == "startsWith(matrix.config[0], 'pypy')"
+
+    def test_github_coverage(self, package_config):
+        package_config.meta_cfg["github"]["prebuilt_images"] = "ghcr.io/plone/ci"
+        package_config.meta_cfg["github"]["os_dependencies"] = "libxml2"
+        package_config.meta_cfg["tox"]["test_matrix"] = {
+            "6.2": ["3.13", "3.10", "pypy3.10"]
+        }
+        files = package_config.render()
+        coverage = yaml.safe_load(files[".github/workflows/meta.yml"])["jobs"][
+            "coverage"
+        ]
+        assert coverage["with"] == {"container": "ghcr.io/plone/ci:py3.10"}
+
+    def test_gitlab_images(self, package_config):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["gitlab"]["prebuilt_images"] = "registry/ci"
+        package_config.meta_cfg["gitlab"]["os_dependencies"] = "    - apt-get update"
+        package_config.gitlab_ci()
+        content = (package_config.path / ".gitlab-ci.yml").read_text()
+        data = yaml.safe_load(content)
+        assert data["image"].startswith("registry/ci:py3.")
+        matrix = data["testing"]["parallel"]["matrix"]
+        assert matrix[0]["DOCKER_IMAGE"] == "registry/ci:py3.14"
+        assert "\n    - apt-get" not in content
+
+
+class TestTestPathsIgnore:
+    def test_github_paths_ignore(self, package_config):
+        package_config.meta_cfg["github"]["test_paths_ignore"] = True
+        files = package_config.render()
+        test_matrix = yaml.safe_load(files[".github/workflows/test-matrix.yml"])
+        # PyYAML reads the `on` key as a boolean.
+        assert "docs/**" in test_matrix[True]["push"]["paths-ignore"]
+        assert "coverage" in test_matrix["jobs"]
+        meta = yaml.safe_load(files[".github/workflows/meta.yml"])
+        assert meta[True]["push"] is None
+        assert "coverage" not in meta["jobs"]
+
+    def test_github_default(self, package_config):
+        files = package_config.render()
+        assert "paths-ignore" not in files[".github/workflows/test-matrix.yml"]
+        assert "coverage:" in files[".github/workflows/meta.yml"]
+
+    def test_gitlab_changes(self, package_config):
+        (package_config.path / "src").mkdir()
+        (package_config.path / "docs").mkdir()
+        (package_config.path / "CHANGES.md").touch()
+        package_config.is_gitlab = True
+        package_config.meta_cfg["gitlab"]["test_paths_ignore"] = True
+        package_config.gitlab_ci()
+        data = yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+        changes = data["testing"]["rules"][-1]["changes"]
+        assert "src/**/*" in changes
+        assert "pyproject.toml" in changes
+        assert "docs/**/*" not in changes
+        assert "CHANGES.md" not in changes
+        assert data["coverage"]["rules"][-1]["changes"] == changes
+        assert "except" not in data["testing"]
+
+    def test_invalid(self, package_config):
+        package_config.meta_cfg["github"]["test_paths_ignore"] = "docs"
+        with pytest.raises(ValueError, match="Invalid github `test_paths_ignore`"):
+            package_config.render()
+
+
+class TestCancelInProgress:
+    def test_github(self, package_config):
+        package_config.meta_cfg["github"]["cancel_in_progress"] = True
+        files = package_config.render()
+        for name in ("meta.yml", "test-matrix.yml"):
+            concurrency = yaml.safe_load(files[f".github/workflows/{name}"])[
+                "concurrency"
+            ]
+            assert concurrency["group"] == "${{ github.workflow }}-${{ github.ref }}"
+            assert "default_branch" in concurrency["cancel-in-progress"]
+
+    def test_github_fail_fast(self, package_config):
+        def test_matrix():
+            content = package_config.render()[".github/workflows/test-matrix.yml"]
+            return yaml.safe_load(content)
+
+        assert test_matrix()["jobs"]["build"]["strategy"]["fail-fast"] is False
+        package_config.meta_cfg["github"]["fail_fast"] = True
+        data = test_matrix()
+        assert data["jobs"]["build"]["strategy"]["fail-fast"] is True
+        assert "concurrency" not in data
+
+    def gitlab_ci(self, package_config, **options):
+        package_config.is_gitlab = True
+        package_config.meta_cfg["gitlab"].update(options)
+        package_config.gitlab_ci()
+        return yaml.safe_load((package_config.path / ".gitlab-ci.yml").read_text())
+
+    def test_gitlab(self, package_config):
+        data = self.gitlab_ci(package_config, cancel_in_progress=True)
+        assert data["default"]["interruptible"] is True
+        assert data["workflow"]["auto_cancel"] == {"on_new_commit": "interruptible"}
+        assert data["workflow"]["rules"][-1] == {"when": "always"}
+
+    def test_gitlab_fail_fast(self, package_config):
+        data = self.gitlab_ci(package_config, fail_fast=True)
+        assert data["workflow"] == {"auto_cancel": {"on_job_failure": "all"}}
+        assert "default" not in data
+
+    def test_gitlab_default(self, package_config):
+        data = self.gitlab_ci(package_config)
+        assert "workflow" not in data
+        assert "default" not in data
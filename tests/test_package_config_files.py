@@ -1,6 +1,11 @@
 from plone.meta.config_package import META_HINT
+from plone.meta.shared.path import change_dir
+from unittest.mock import patch
 
 import pathlib
+import pytest
+import tomlkit
+import yaml
 
 
 class TestTestCfg:
@@ -29,6 +34,28 @@ class TestTestCfg:
         result = package_config._test_cfg()
         assert result["test_path"] == ""
 
+    def test_serial_by_default(self, package_config):
+        assert package_config._test_cfg()["test_jobs"] == ""
+
+    @pytest.mark.parametrize(
+        "runner,parallel,expected",
+        [
+            ("zope.testrunner", "auto", "{env:TEST_JOBS:4}"),
+            ("pytest", "auto", "{env:TEST_JOBS:auto}"),
+            ("pytest", 8, "{env:TEST_JOBS:8}"),
+            ("pytest", 1, ""),
+        ],
+    )
+    def test_parallel(self, package_config, runner, parallel, expected):
+        package_config.meta_cfg["tox"]["test_runner"] = runner
+        package_config.meta_cfg["tox"]["test_parallel"] = parallel
+        assert package_config._test_cfg()["test_jobs"] == expected
+
+    def test_invalid_parallel(self, package_config):
+        package_config.meta_cfg["tox"]["test_parallel"] = "many"
+        with pytest.raises(ValueError, match="Invalid tox `test_parallel`"):
+            package_config._test_cfg()
+
 
 class TestDetectRobotframework:
     def test_found_in_setup_py(self, package_config):
@@ -123,3 +150,347 @@ class TestValidateFiles:
         ini_file = package_config.path / "test.ini"
         ini_file.write_text("[section]\nkey = value\n")
         package_config.validate_files([ini_file])
+
+
+class TestRender:
+    def test_nothing_is_written(self, package_config):
+        (package_config.path / "news").mkdir()
+        (package_config.path / "CHANGES.md").touch()
+        rendered = package_config.render()
+        assert "tox.ini" in rendered
+        assert ".github/workflows/meta.yml" in rendered
+        assert "news/.changelog_template.jinja" in rendered
+        assert not (package_config.path / "tox.ini").exists()
+        assert not (package_config.path / ".github").exists()
+        assert not (package_config.path / "news" / ".changelog_template.jinja").exists()
+
+    def test_matches_written_files(self, package_config):
+        rendered = package_config.render()
+        package_config.tox()
+        assert (package_config.path / "tox.ini").read_text() == rendered["tox.ini"]
+
+    def test_writes_again_after_render(self, package_config):
+        package_config.render()
+        package_config.editorconfig()
+        assert (package_config.path / ".editorconfig").exists()
+
+
+class TestIncrementalRendering:
+    def test_records_inputs_hash(self, package_config):
+        package_config.editorconfig()
+        assert ".editorconfig" in package_config.meta_cfg["meta"]["inputs"]
+
+    def test_skips_unchanged_inputs(self, package_config):
+        package_config.editorconfig()
+        with patch.object(package_config.jinja_env, "get_template") as get_template:
+            result = package_config.editorconfig()
+        get_template.assert_not_called()
+        assert result == pathlib.Path(".editorconfig")
+        assert result in package_config.up_to_date
+
+    def test_renders_hand_edited_file(self, package_config):
+        package_config.editorconfig()
+        (package_config.path / ".editorconfig").write_text("edited")
+        package_config.editorconfig()
+        assert (package_config.path / ".editorconfig").read_text() != "edited"
+        assert package_config.up_to_date == set()
+
+    def test_renders_on_option_change(self, package_config):
+        package_config.editorconfig()
+        package_config.meta_cfg["editorconfig"]["extra_lines"] = "[*.foo]"
+        package_config.editorconfig()
+        assert "[*.foo]" in (package_config.path / ".editorconfig").read_text()
+        assert package_config.up_to_date == set()
+
+    def test_renders_on_repository_fact_change(self, package_config):
+        package_config.tox()
+        (package_config.path / "setup.py").write_text("plone.app.robotframework")
+        package_config.tox()
+        assert "rfbrowser init" in (package_config.path / "tox.ini").read_text()
+
+    def test_renders_missing_file(self, package_config):
+        package_config.editorconfig()
+        (package_config.path / ".editorconfig").unlink()
+        package_config.editorconfig()
+        assert (package_config.path / ".editorconfig").exists()
+
+    def test_force(self, package_config):
+        package_config.editorconfig()
+        (package_config.path / ".editorconfig").write_text("untouched")
+        package_config.args.force = True
+        package_config.editorconfig()
+        assert (package_config.path / ".editorconfig").read_text() != "untouched"
+
+    def test_included_templates_are_hashed(self, package_config):
+        first = package_config._inputs_hash("tox.ini.j2", "", {})
+        loader = package_config.jinja_env.loader
+        original = loader.get_source
+
+        def get_source(env, name):
+            source, filename, uptodate = original(env, name)
+            if name == "tox-qa.j2":
+                source += "\n# changed"
+            return source, filename, uptodate
+
+        loader.get_source = get_source
+        assert package_config._inputs_hash("tox.ini.j2", "", {}) != first
+
+    def test_up_to_date_files_are_not_validated(self, package_config):
+        broken = package_config.path / "broken.toml"
+        broken.write_text("[[[")
+        package_config.up_to_date.add(pathlib.Path("broken.toml"))
+        with change_dir(package_config.path):
+            package_config.validate_files([pathlib.Path("broken.toml")])
+
+
+class TestWatchStep:
+    def test_first_step_renders_everything(self, package_config):
+        mtimes, written = package_config.watch_step({})
+        assert (package_config.path / ".meta.toml") in mtimes
+        assert pathlib.Path("tox.ini") in written
+        assert (package_config.path / "tox.ini").exists()
+        meta = tomlkit.parse((package_config.path / ".meta.toml").read_text())["meta"]
+        assert "tox.ini" in meta["checksums"]
+        assert "tox.ini" in meta["inputs"]
+        # Saving .meta.toml does not start another step.
+        assert package_config.watch_step(mtimes) == (mtimes, [])
+
+    def test_nothing_changed(self, package_config):
+        mtimes, _ = package_config.watch_step({})
+        assert package_config.watch_step(mtimes) == (mtimes, [])
+
+    def test_renders_only_affected_files(self, package_config):
+        mtimes, _ = package_config.watch_step({})
+        meta_toml = package_config.path / ".meta.toml"
+        meta_toml.write_text(
+            meta_toml.read_text() + '\n[editorconfig]\nextra_lines = "[*.foo]"\n'
+        )
+        mtimes = {key: value - 1 for key, value in mtimes.items()}
+        _, written = package_config.watch_step(mtimes)
+        assert written == [pathlib.Path(".editorconfig")]
+        assert "[*.foo]" in (package_config.path / ".editorconfig").read_text()
+
+
+class TestWheelhouse:
+    def test_not_in_tox_ini(self, package_config):
+        # The wheelhouse only exists on the machine which built it.
+        package_config.meta_cfg["tox"]["wheelhouse"] = "../wheelhouse"
+        tox_ini = package_config.render()["tox.ini"]
+        assert "FIND_LINKS" not in tox_ini
+        assert "NO_INDEX" not in tox_ini
+
+    @patch("plone.meta.config_package.call")
+    def test_run_tox(self, mock_call, package_config, tmp_path):
+        (tmp_path / "wheelhouse").mkdir()
+        package_config.args.wheelhouse = tmp_path / "wheelhouse"
+        package_config.run_tox()
+        env = mock_call.call_args.kwargs["env"]
+        assert env["PIP_FIND_LINKS"] == str(tmp_path / "wheelhouse")
+        # The hooks of pre-commit are fetched from their repositories.
+        assert "PIP_NO_INDEX" not in env
+
+    @patch("plone.meta.config_package.call")
+    def test_run_tox_meta_toml_option(self, mock_call, package_config):
+        (package_config.path.parent / "wheelhouse").mkdir()
+        package_config.meta_cfg["tox"]["wheelhouse"] = "../wheelhouse"
+        package_config.run_tox()
+        env = mock_call.call_args.kwargs["env"]
+        assert env["PIP_FIND_LINKS"] == str(package_config.path / "../wheelhouse")
+
+    @patch("plone.meta.config_package.call")
+    def test_run_tox_missing_wheelhouse(self, mock_call, package_config, tmp_path):
+        package_config.args.wheelhouse = tmp_path / "wheelhouse"
+        package_config.run_tox()
+        assert mock_call.call_args.kwargs["env"] is None
+
+
+class TestSharedWheel:
+    def test_develop_by_default(self, package_config):
+        tox_ini = package_config.render()["tox.ini"]
+        assert "use_develop = true\n" in tox_ini
+        assert "wheel_build_env" not in tox_ini
+
+    def test_shared_wheel(self, package_config):
+        package_config.meta_cfg["tox"]["shared_wheel"] = True
+        tox_ini = package_config.render()["tox.ini"]
+        base = tox_ini.split("[base]")[1].split("\n\n")[0]
+        assert "use_develop = false\npackage = wheel\nwheel_build_env = .pkg\n" in base
+        for section in ("[testenv:test]", "[testenv]", "[testenv:coverage]"):
+            env = tox_ini.split(f"\n{section}\n")[1].split("\n\n")[0]
+            assert "package = {[base]package}\n" in env
+            assert "wheel_build_env = {[base]wheel_build_env}\n" in env
+
+
+class TestParallelTests:
+    def test_zope_testrunner(self, package_config):
+        package_config.meta_cfg["tox"]["test_parallel"] = "auto"
+        tox_ini = package_config.render()["tox.ini"]
+        assert "zope-testrunner --all -j {env:TEST_JOBS:4} --test-path" in tox_ini
+        assert (
+            "-s %(name)s {posargs}\n    coverage combine\n"
+            % {"name": package_config.path.name}
+            in tox_ini
+        )
+        assert "[coverage:run]" not in tox_ini
+        assert "    coverage>=7.10\n" in tox_ini
+        pyproject = tomlkit.parse(package_config.render()["pyproject.toml"])
+        assert pyproject["tool"]["coverage"]["run"] == {
+            "parallel": True,
+            "patch": ["subprocess"],
+        }
+
+    def test_pytest(self, package_config):
+        package_config.meta_cfg["tox"]["test_runner"] = "pytest"
+        package_config.meta_cfg["tox"]["test_parallel"] = 3
+        tox_ini = package_config.render()["tox.ini"]
+        assert "    pytest-xdist\n" in tox_ini
+        assert "pytest --disable-warnings -n {env:TEST_JOBS:3} {posargs}" in tox_ini
+        assert "--disable-warnings -n {env:TEST_JOBS:3} {toxinidir}" in tox_ini
+
+    def test_serial(self, package_config):
+        tox_ini = package_config.render()["tox.ini"]
+        assert "TEST_JOBS" not in tox_ini
+        assert "coverage combine" not in tox_ini
+        assert "coverage>=7.10" not in tox_ini
+        assert "coverage" not in package_config.render()["pyproject.toml"]
+
+
+class TestTestShards:
+    def make_tests(self, package_config, *names):
+        tests = package_config.path / "src" / "plone" / "foo" / "tests"
+        tests.mkdir(parents=True)
+        for name in names:
+            (tests / f"{name}.py").touch()
+
+    def test_factors(self, package_config):
+        self.make_tests(package_config, "test_a", "test_b", "test_c")
+        package_config.meta_cfg["tox"]["test_shards"] = 2
+        tox_ini = package_config.render()["tox.ini"]
+        assert "    shard1: {[test_runner]test_shard1}\n" in tox_ini
+        assert "    !shard1-!shard2: {[test_runner]test}\n" in tox_ini
+        assert "-m '!^(" in tox_ini
+        assert "[testenv:coverage-shard2]\n" in tox_ini
+        assert "[testenv:coverage-combine]\n" in tox_ini
+
+    def test_not_enough_modules(self, package_config):
+        self.make_tests(package_config, "test_a")
+        package_config.meta_cfg["tox"]["test_shards"] = 2
+        assert "shard" not in package_config.render()["tox.ini"]
+
+    def test_invalid(self, package_config):
+        package_config.meta_cfg["tox"]["test_shards"] = "many"
+        with pytest.raises(ValueError, match="Invalid tox `test_shards`"):
+            package_config.tox()
+
+
+class TestPreCommitProfile:
+    def test_full_by_default(self, package_config):
+        files = package_config.render()
+        assert "stages:" not in files[".pre-commit-config.yaml"]
+        assert "    pre-commit run -a\n" in files["tox.ini"]
+
+    def test_fast(self, package_config):
+        package_config.meta_cfg["pre_commit"]["profile"] = "fast"
+        files = package_config.render()
+        hooks = {
+            hook["id"]: hook
+            for repo in yaml.safe_load(files[".pre-commit-config.yaml"])["repos"]
+            for hook in repo["hooks"]
+        }
+        assert hooks["i18ndude"]["stages"] == ["manual"]
+        assert hooks["check-manifest"]["stages"] == ["manual"]
+        assert "stages" not in hooks["black"]
+        assert "    pre-commit run -a --hook-stage manual\n" in files["tox.ini"]
+
+    def test_unknown(self, package_config):
+        package_config.meta_cfg["pre_commit"]["profile"] = "slow"
+        with pytest.raises(ValueError, match="Unknown pre_commit `profile`"):
+            package_config.pre_commit_config()
+
+
+class TestRuffLinter:
+    def test_flake8_by_default(self, package_config):
+        files = package_config.render()
+        assert ".flake8" in files
+        assert "[tool.isort]" in files["pyproject.toml"]
+        assert "ruff" not in files[".pre-commit-config.yaml"]
+
+    def test_ruff(self, package_config):
+        package_config.meta_cfg["pre_commit"]["linter"] = "ruff"
+        files = package_config.render()
+        assert ".flake8" not in files
+        pyproject = tomlkit.parse(files["pyproject.toml"])
+        assert "isort" not in pyproject["tool"]
+        assert "black" not in pyproject["tool"]
+        assert pyproject["tool"]["ruff"]["lint"]["ignore"] == ["E501"]
+        isort = pyproject["tool"]["ruff"]["lint"]["isort"]
+        assert isort["force-single-line"]
+        assert isort["lines-after-imports"] == 2
+        hooks = [
+            hook["id"]
+            for repo in yaml.safe_load(files[".pre-commit-config.yaml"])["repos"]
+            for hook in repo["hooks"]
+        ]
+        assert hooks.count("ruff-check") == 2
+        assert "ruff-format" in hooks
+        assert "black" not in hooks
+        assert "flake8" not in hooks
+        assert "    pre-commit run -a ruff-isort\n" in files["tox.ini"]
+        assert "pre-commit run -a black" not in files["tox.ini"]
+
+    def test_existing_flake8_config(self, package_config, capsys):
+        (package_config.path / ".flake8").write_text("[flake8]\n")
+        package_config.meta_cfg["pre_commit"]["linter"] = "ruff"
+        assert package_config.flake8() == []
+        assert "please remove .flake8" in capsys.readouterr().out
+
+    def test_unknown(self, package_config):
+        package_config.meta_cfg["pre_commit"]["linter"] = "pylint"
+        with pytest.raises(ValueError, match="Unknown pre_commit `linter`"):
+            package_config.pyproject_toml()
+
+
+class TestRunToxOnChangedFiles:
+    @patch("plone.meta.config_package.call")
+    def test_written_files(self, mock_call, package_config):
+        package_config.up_to_date = {pathlib.Path("tox.ini")}
+        package_config.run_tox(
+            [
+                package_config.path / ".meta.toml",
+                package_config.path / ".github" / "workflows" / "meta.yml",
+                pathlib.Path("tox.ini"),
+            ]
+        )
+        assert mock_call.call_args.args[1:] == (
+            "exec",
+            "-e",
+            "lint",
+            "--",
+            "pre-commit",
+            "run",
+            "--files",
+            ".github/workflows/meta.yml",
+        )
+
+    @patch("plone.meta.config_package.call")
+    def test_changed_hook_configuration(self, mock_call, package_config):
+        package_config.previous_tables["checksums"] = {".flake8": "abc"}
+        package_config.run_tox([package_config.path / ".pre-commit-config.yaml"])
+        assert mock_call.call_args.args[-2:] == ("--files", ".pre-commit-config.yaml")
+
+    @patch("plone.meta.config_package.call")
+    def test_changed_linter(self, mock_call, package_config):
+        package_config.previous_tables["checksums"] = {".flake8": "abc"}
+        package_config.meta_cfg["pre_commit"]["linter"] = "ruff"
+        package_config.run_tox([package_config.path / ".pre-commit-config.yaml"])
+        assert mock_call.call_args.args[1:] == ("-e", "format,lint")
+
+    @patch("plone.meta.config_package.call")
+    def test_nothing_written(self, mock_call, package_config, capsys):
+        package_config.up_to_date = {pathlib.Path("tox.ini")}
+        # Like `configure`, which always passes .meta.toml.
+        package_config.run_tox(
+            [package_config.path / ".meta.toml", pathlib.Path("tox.ini")]
+        )
+        mock_call.assert_not_called()
+        assert "No files written, nothing to lint." in capsys.readouterr().out
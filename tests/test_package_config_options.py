@@ -81,6 +81,32 @@ class TestHandleConstraintsFiles:
         assert "dist.plone.org" in result["constraints_file"]
         assert "dist.plone.org" in result["single_constraints_file"]
 
+    def test_cache_from_meta_toml(self, package_config):
+        package_config.meta_cfg["tox"]["constraints_cache"] = "../cache"
+        options = {
+            "use_mxdev": False,
+            "use_test_matrix": True,
+            "constraints_files": {"6.2": "https://example.org/c.txt"},
+            "test_matrix": {"6.2": ["3.13"]},
+        }
+        result = package_config._handle_constraints_files(options)
+        assert result["constraints_file"] == ("plone62: -c ../cache/example.org/c.txt")
+        assert result["single_constraints_file"] == "-c ../cache/example.org/c.txt"
+
+    def test_cache_from_command_line(self, package_config):
+        package_config.meta_cfg["tox"]["constraints_cache"] = "../cache"
+        package_config.args.constraints_cache = "/tmp/cache"
+        options = {
+            "use_mxdev": False,
+            "use_test_matrix": True,
+            "constraints_files": "",
+            "test_matrix": {"6.2": ["3.13"]},
+        }
+        result = package_config._handle_constraints_files(options)
+        assert result["constraints_file"] == (
+            "plone62: -c /tmp/cache/dist.plone.org/release/6.2-dev/constraints.txt"
+        )
+
     def test_mismatched_versions_raises(self, package_config):
         options = {
             "use_mxdev": False,
@@ -0,0 +1,112 @@
+from plone.meta.render_diff import changed_lines
+from plone.meta.render_diff import format_report
+from plone.meta.render_diff import group_changes
+from plone.meta.render_diff import package_changes
+from plone.meta.render_diff import templates_at_ref
+from unittest.mock import patch
+
+import pathlib
+import plone.meta
+import pytest
+import shutil
+import subprocess
+
+
+@pytest.fixture
+def repo(pyproject_toml, meta_toml_factory):
+    path = meta_toml_factory()
+    pyproject_toml()
+    with (
+        patch(
+            "plone.meta.config_package.git_server_url",
+            return_value="https://github.com/plone/test-package",
+        ),
+        patch("plone.meta.config_package.version", return_value="2.4.0"),
+    ):
+        yield path
+
+
+@pytest.fixture
+def other_templates(tmp_path):
+    installed = pathlib.Path(plone.meta.__file__).parent / "default"
+    templates = tmp_path / "templates"
+    shutil.copytree(installed, templates / "default")
+    editorconfig = templates / "default" / "editorconfig.j2"
+    editorconfig.write_text(editorconfig.read_text() + "# new line\n")
+    return templates
+
+
+class TestChangedLines:
+    def test_ignores_context_and_line_numbers(self):
+        first = changed_lines("f", "a\nb\nc\n", "a\nB\nc\n")
+        second = changed_lines("f", "x\ny\nb\nz\n", "x\ny\nB\nz\n")
+        assert first == second == ("f", ("-b", "+B"))
+
+
+class TestPackageChanges:
+    def test_only_changed_files(self, repo, other_templates):
+        name, changes, error = package_changes(repo, other_templates)
+        assert name == repo.name
+        assert error == ""
+        assert changes == [(".editorconfig", ("+# new line",))]
+
+    def test_undefined_option(self, repo, other_templates):
+        editorconfig = other_templates / "default" / "editorconfig.j2"
+        editorconfig.write_text(editorconfig.read_text() + "%(new_option)s\n")
+        name, changes, error = package_changes(repo, other_templates)
+        assert changes == []
+        assert error == (
+            "the other templates need an option the installed plone.meta "
+            "does not pass: 'new_option' is undefined"
+        )
+
+    def test_no_git_clone(self, tmp_path, other_templates):
+        assert package_changes(tmp_path, other_templates)[2] == "no git clone found"
+
+
+class TestFormatReport:
+    results = [
+        ("plone.a", [("tox.ini", ("-old", "+new"))], ""),
+        ("plone.b", [("tox.ini", ("-old", "+new"))], ""),
+        ("plone.c", [("tox.ini", ("-other", "+new"))], ""),
+        ("plone.d", [], ""),
+        ("plone.e", [], "boom"),
+    ]
+
+    def test_groups_identical_changes(self):
+        groups = group_changes(self.results)
+        assert groups[0] == (("tox.ini", ("-old", "+new")), ["plone.a", "plone.b"])
+        assert len(groups) == 2
+
+    def test_report(self):
+        report = format_report(self.results)
+        shared, outliers = report.split("# Outliers")
+        assert "## tox.ini (2 packages)" in shared
+        assert "Packages: plone.a, plone.b" in shared
+        assert "## tox.ini (plone.c)" in outliers
+        assert "# Unchanged (1 packages)\n\nplone.d" in outliers
+        assert "plone.e: boom" in outliers
+
+
+def test_templates_at_ref(tmp_path):
+    meta_repo = tmp_path / "meta"
+    folder = meta_repo / "src" / "plone" / "meta" / "default"
+    folder.mkdir(parents=True)
+    (folder / "tox.ini.j2").write_text("first\n")
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=a", "-c", "user.email=a@b.c", *args],
+            cwd=meta_repo,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init")
+    git("add", ".")
+    git("commit", "-m", "first")
+    (folder / "tox.ini.j2").write_text("second\n")
+
+    result = templates_at_ref(meta_repo, "HEAD", tmp_path / "out")
+    assert (result / "default" / "tox.ini.j2").read_text() == "first\n"
+    assert (folder / "tox.ini.j2").read_text() == "second\n"
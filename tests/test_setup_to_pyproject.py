@@ -0,0 +1,307 @@
+from plone.meta.setup_to_pyproject import BLOCKED
+from plone.meta.setup_to_pyproject import check_license
+from plone.meta.setup_to_pyproject import ConversionError
+from plone.meta.setup_to_pyproject import convert_in_batch
+from plone.meta.setup_to_pyproject import CONVERTED
+from plone.meta.setup_to_pyproject import format_report
+from plone.meta.setup_to_pyproject import handle_classifiers
+from plone.meta.setup_to_pyproject import package_paths
+from plone.meta.setup_to_pyproject import parse_setup_function
+from plone.meta.setup_to_pyproject import SetupPyEvaluator
+from plone.meta.setup_to_pyproject import SKIPPED
+from plone.meta.setup_to_pyproject import StaticEvaluationError
+
+import ast
+import pathlib
+import pytest
+import subprocess
+
+SETUP_PY = '''\
+from setuptools import find_packages
+from setuptools import setup
+
+import os
+
+
+def read(*rnames):
+    """Read a file next to setup.py."""
+    with open(os.path.join(os.path.dirname(__file__), *rnames)) as f:
+        return f.read()
+
+
+version = "1.0"
+NAME = "plone.%s" % "foo"
+TEST_REQUIRES = ["plone.app.testing"]
+DOCS_REQUIRES = ["Sphinx"] + TEST_REQUIRES
+DOCS_REQUIRES += ["sphinx-book-theme"]
+long_description = f"{read('README.rst')}\\n" + open("CHANGES.rst").read()
+
+setup(
+    name=NAME,
+    version=version,
+    description="Foo for " + "Plone",
+    long_description=long_description,
+    packages=find_packages("src"),
+    extras_require=dict(test=TEST_REQUIRES, docs=DOCS_REQUIRES),
+    install_requires=["setuptools", "plone.base>=%s" % version],
+)
+'''
+
+
+@pytest.fixture
+def setup_py(tmp_path):
+    (tmp_path / "README.rst").write_text("Foo")
+    (tmp_path / "CHANGES.rst").write_text("Changes")
+    path = tmp_path / "setup.py"
+    path.write_text(SETUP_PY)
+    return path
+
+
+def evaluate(source, expression):
+    evaluator = SetupPyEvaluator("setup.py", source)
+    return evaluator.evaluate(ast.parse(expression, mode="eval").body)
+
+
+class TestSetupPyEvaluator:
+    def test_module_names(self, setup_py):
+        evaluator = SetupPyEvaluator(setup_py)
+        assert evaluator.names["NAME"] == "plone.foo"
+        assert evaluator.names["DOCS_REQUIRES"] == [
+            "Sphinx",
+            "plone.app.testing",
+            "sphinx-book-theme",
+        ]
+        assert evaluator.names["long_description"] == "Foo\nChanges"
+
+    @pytest.mark.parametrize(
+        "expression,value",
+        [
+            ("dict(a=[1], **{'b': 2})", {"a": [1], "b": 2}),
+            ("'%s-%s' % ('a', 'b')", "a-b"),
+            ("(1, 2) + (3,)", (1, 2, 3)),
+            ("', '.join(['a', 'b'])", "a, b"),
+            ("[*A, 'b']", ["a", "b"]),
+        ],
+    )
+    def test_expressions(self, expression, value):
+        assert evaluate("A = ['a']", expression) == value
+
+    def test_path(self, setup_py):
+        evaluator = SetupPyEvaluator(setup_py, "from pathlib import Path\n")
+        node = ast.parse("(Path(__file__).parent / 'README.rst').read_text()")
+        assert evaluator.evaluate(node.body[0].value) == "Foo"
+
+    @pytest.mark.parametrize(
+        "source,expression,message",
+        [
+            ("", "VERSION", "unknown name 'VERSION'"),
+            ("import subprocess", "subprocess.check_output('ls')", "unsupported call"),
+            ("if True:\n    A = 1", "A", "unknown name 'A'"),
+            ("", "'a'.encode()", "unsupported call"),
+            ("", "open('x', 'w')", "cannot open x"),
+        ],
+    )
+    def test_unsupported(self, source, expression, message):
+        with pytest.raises(StaticEvaluationError, match=message):
+            evaluate(source, expression)
+
+    def test_does_not_run_setup_py(self, tmp_path):
+        path = tmp_path / "setup.py"
+        path.write_text(
+            "import pathlib\npathlib.Path('ran').touch()\nraise SystemExit(1)\n"
+        )
+        SetupPyEvaluator(path)
+        assert not (tmp_path / "ran").exists()
+
+
+def test_parse_setup_function(setup_py):
+    evaluator = SetupPyEvaluator(setup_py)
+    assert parse_setup_function(evaluator.setup_call(), evaluator) == {
+        "name": "plone.foo",
+        "version": "1.0",
+        "description": "Foo for Plone",
+        "long_description": None,
+        "packages": None,
+        "extras_require": {
+            "test": ["plone.app.testing"],
+            "docs": ["Sphinx", "plone.app.testing", "sphinx-book-theme"],
+        },
+        "install_requires": ["setuptools", "plone.base>=1.0"],
+    }
+
+
+def test_parse_setup_function_unsupported(tmp_path):
+    path = tmp_path / "setup.py"
+    path.write_text("import os\nsetup(name=os.environ['NAME'])\n")
+    evaluator = SetupPyEvaluator(path)
+    with pytest.raises(ConversionError, match="cannot convert setup argument name"):
+        parse_setup_function(evaluator.setup_call(), evaluator)
+
+
+def test_parse_setup_function_unsupported_variable(tmp_path):
+    path = tmp_path / "setup.py"
+    path.write_text(
+        "import subprocess\n"
+        "version = subprocess.check_output(['git', 'describe'])\n"
+        "ext = subprocess.check_output(['git', 'describe'])\n"
+        "setup(version=version, ext_package=ext)\n"
+    )
+    evaluator = SetupPyEvaluator(path)
+    with pytest.raises(ConversionError, match="cannot convert setup argument version"):
+        parse_setup_function(evaluator.setup_call(), evaluator)
+    path.write_text(
+        "import subprocess\n"
+        "ext = subprocess.check_output(['git', 'describe'])\n"
+        "setup(ext_package=ext)\n"
+    )
+    evaluator = SetupPyEvaluator(path)
+    # Stays in setup.py, where the variable is still defined.
+    assert parse_setup_function(evaluator.setup_call(), evaluator) == {
+        "ext_package": "ext"
+    }
+
+
+class TestLicense:
+    def test_unexpected_classifier(self):
+        with pytest.raises(ConversionError, match="License :: Foo"):
+            handle_classifiers(["License :: Foo"])
+
+    def test_unknown_license(self):
+        with pytest.raises(ConversionError, match='unknown license "Foo"'):
+            check_license("Foo", [])
+
+    def test_mismatch(self):
+        with pytest.raises(ConversionError, match="does not match"):
+            check_license("GPL", ["License :: OSI Approved :: BSD License"])
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    """A git clone of a package with its metadata in setup.py"""
+    for name in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(name, "test")
+    for name in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(name, "test@example.com")
+    path = tmp_path / "plone.foo"
+    path.mkdir()
+    (path / ".meta.toml").write_text("")
+    (path / ".pre-commit-config.yaml").write_text("repos: []\n")
+    (path / "README.rst").write_text("Foo")
+    (path / "pyproject.toml").write_text('[tool.towncrier]\ndirectory = "news/"\n')
+    (path / "setup.py").write_text(
+        "from setuptools import setup\n\n"
+        'setup(name="plone.foo", version="1.0", license="GPL version 2")\n'
+    )
+    for args in (
+        ("init", "-q", "-b", "main"),
+        ("remote", "add", "origin", "https://github.com/plone/plone.foo.git"),
+        ("add", "."),
+        ("commit", "-q", "-m", "initial"),
+    ):
+        subprocess.run(("git",) + args, cwd=path, check=True)
+    return path
+
+
+class TestConvertInBatch:
+    def test_converted(self, repository):
+        name, status, reason, _ = convert_in_batch(repository)
+        assert (name, status, reason) == ("plone.foo", CONVERTED, "")
+        assert 'license = "GPL-2.0-only"' in (repository / "pyproject.toml").read_text()
+        branch = subprocess.run(
+            ("git", "branch", "--show-current"),
+            cwd=repository,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+        assert branch == "convert-setup-py-to-pyproject-toml"
+        assert convert_in_batch(repository)[1:3] == (SKIPPED, "converted already")
+
+    def test_dry_run(self, repository):
+        _, status, reason, output = convert_in_batch(repository, dry_run=True)
+        assert (status, reason) == (CONVERTED, "dry run, nothing written")
+        assert "--- a/pyproject.toml\n+++ b/pyproject.toml\n" in output
+        assert '+license = "GPL-2.0-only"\n' in output
+        assert "+setup()\n" in output
+        status = subprocess.run(
+            ("git", "status", "--porcelain", "--branch"),
+            cwd=repository,
+            capture_output=True,
+            text=True,
+        ).stdout
+        assert status == "## main\n"
+
+    def test_blocked(self, repository):
+        (repository / "setup.py").write_text('setup(name="plone.foo", license="Foo")')
+        _, status, reason, _ = convert_in_batch(repository)
+        assert status == BLOCKED
+        assert reason == 'unknown license "Foo", fix or remove it'
+        assert "license" not in (repository / "pyproject.toml").read_text()
+
+    def test_keyword_arguments(self, repository):
+        (repository / "setup.py").write_text(
+            "from setuptools import setup\n\nsetup(**get_metadata())\n"
+        )
+        _, status, reason, _ = convert_in_batch(repository)
+        assert status == BLOCKED
+        assert reason.startswith("cannot convert setup argument **")
+
+    def test_git_failure_restores_the_files(self, repository):
+        (repository / "news").mkdir()
+        (repository / "news" / ".gitkeep").write_text("")
+        subprocess.run(("git", "add", "news"), cwd=repository, check=True)
+        subprocess.run(("git", "commit", "-qm", "news"), cwd=repository, check=True)
+        hook = repository / ".git" / "hooks" / "pre-commit"
+        hook.write_text("#!/bin/sh\nexit 1\n")
+        hook.chmod(0o755)
+        setup_py = (repository / "setup.py").read_text()
+        _, status, reason, _ = convert_in_batch(repository)
+        assert status == BLOCKED
+        assert reason.startswith("a git command failed")
+        assert (repository / "setup.py").read_text() == setup_py
+        status = subprocess.run(
+            ("git", "status", "--porcelain"),
+            cwd=repository,
+            capture_output=True,
+            text=True,
+        ).stdout
+        assert status == ""
+
+    def test_not_a_package(self, tmp_path):
+        (tmp_path / "setup.py").write_text("")
+        assert convert_in_batch(tmp_path)[1:3] == (
+            BLOCKED,
+            "no .meta.toml found, no .pre-commit-config.yaml found",
+        )
+
+    def test_no_pre_commit_config(self, repository):
+        (repository / ".pre-commit-config.yaml").unlink()
+        assert convert_in_batch(repository)[1:3] == (
+            BLOCKED,
+            "no .pre-commit-config.yaml found",
+        )
+        assert "name=" in (repository / "setup.py").read_text()
+
+
+def test_package_paths(tmp_path):
+    packages_txt = tmp_path / "packages.txt"
+    packages_txt.write_text("# comment\nplone.foo\nplone.bar\n")
+    assert package_paths([packages_txt, pathlib.Path("plone.baz")]) == [
+        tmp_path / "plone.foo",
+        tmp_path / "plone.bar",
+        pathlib.Path("plone.baz"),
+    ]
+    assert package_paths([packages_txt], pathlib.Path("clones"))[0] == pathlib.Path(
+        "clones/plone.foo"
+    )
+
+
+def test_format_report():
+    results = [
+        ("plone.foo", CONVERTED, "", ""),
+        ("plone.app.bar", BLOCKED, "no setup.py found", "output"),
+    ]
+    assert format_report(results).splitlines() == [
+        "package        status     reason",
+        "plone.foo      converted  -",
+        "plone.app.bar  blocked    no setup.py found",
+    ]
@@ -0,0 +1,103 @@
+from plone.meta.sharding import assign_shards
+from plone.meta.sharding import find_test_modules
+from plone.meta.sharding import shard_arguments
+from plone.meta.sharding import split_tests
+from plone.meta.shared.history import read_test_durations
+
+JUNIT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites>
+  <testsuite name="tests" tests="3">
+    <testcase classname="plone.foo.tests.test_a.TestA" name="test_1" time="1.5"/>
+    <testcase classname="plone.foo.tests.test_a.TestA" name="test_2" time="2.5"/>
+    <testcase classname="plone.foo.tests.test_b.TestB" name="test_1" time="0.5"/>
+  </testsuite>
+</testsuites>
+"""
+
+
+def make_tests(path, *names):
+    tests = path / "src" / "plone" / "foo" / "tests"
+    tests.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        (tests / f"{name}.py").touch()
+    return path
+
+
+class TestFindTestModules:
+    def test_zope_testrunner(self, tmp_path):
+        make_tests(tmp_path, "__init__", "test_a", "base")
+        (tmp_path / "src" / "plone" / "foo" / "tests.py").touch()
+        assert find_test_modules(tmp_path, "/src", "zope.testrunner") == [
+            ("plone.foo.tests.test_a", "src/plone/foo/tests/test_a.py"),
+            ("plone.foo.tests", "src/plone/foo/tests.py"),
+        ]
+
+    def test_pytest(self, tmp_path):
+        make_tests(tmp_path, "conftest", "test_a", "b_test", "tests")
+        assert find_test_modules(tmp_path, "/src", "pytest") == [
+            ("plone.foo.tests.b_test", "src/plone/foo/tests/b_test.py"),
+            ("plone.foo.tests.test_a", "src/plone/foo/tests/test_a.py"),
+        ]
+
+
+class TestAssignShards:
+    modules = [(f"test_{name}", f"test_{name}.py") for name in "abcde"]
+
+    def test_hash_is_stable(self):
+        shards = assign_shards(self.modules, 2)
+        assert shards == assign_shards(list(reversed(self.modules)), 2)
+        assert sorted(sum(shards, [])) == self.modules
+        assert [len(modules) for modules in shards] == [3, 2]
+
+    def test_durations(self):
+        durations = {"test_a": 10, "test_b": 6, "test_c": 4}
+        # test_d and test_e count as the median: 6 seconds.
+        shards = assign_shards(self.modules, 2, durations)
+        assert [[name for name, _ in modules] for modules in shards] == [
+            ["test_a", "test_e"],
+            ["test_b", "test_c", "test_d"],
+        ]
+
+
+class TestShardArguments:
+    shards = [
+        [("plone.foo.tests.test_a", "src/plone/foo/tests/test_a.py")],
+        [("plone.foo.tests.test_b", "src/plone/foo/tests/test_b.py")],
+    ]
+
+    def test_zope_testrunner(self):
+        assert shard_arguments(self.shards, "zope.testrunner", "/src") == [
+            "-m '^(plone[.]foo[.]tests[.]test_a)$'",
+            "-m '!^(plone[.]foo[.]tests[.]test_a)$'",
+        ]
+
+    def test_pytest(self):
+        assert shard_arguments(self.shards, "pytest", "/src") == [
+            "{toxinidir}/src/plone/foo/tests/test_a.py",
+            "{toxinidir}/src --ignore={toxinidir}/src/plone/foo/tests/test_a.py",
+        ]
+
+
+class TestSplitTests:
+    def test_no_more_shards_than_modules(self, tmp_path):
+        make_tests(tmp_path, "test_a", "test_b")
+        assert len(split_tests(tmp_path, "/src", "zope.testrunner", 4)) == 2
+
+    def test_single_module(self, tmp_path):
+        make_tests(tmp_path, "test_a")
+        assert split_tests(tmp_path, "/src", "zope.testrunner", 2) == []
+
+    def test_durations(self, tmp_path):
+        make_tests(tmp_path, "test_a", "test_b", "test_c")
+        report = tmp_path / "junit.xml"
+        report.write_text(JUNIT)
+        durations = read_test_durations([report])
+        assert durations == {
+            "plone.foo.tests.test_a.TestA": 4.0,
+            "plone.foo.tests.test_b.TestB": 0.5,
+        }
+        # test_a alone takes longer than the others together.
+        assert split_tests(tmp_path, "/src", "zope.testrunner", 2, durations) == [
+            "-m '^(plone[.]foo[.]tests[.]test_a)$'",
+            "-m '!^(plone[.]foo[.]tests[.]test_a)$'",
+        ]
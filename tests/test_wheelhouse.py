@@ -0,0 +1,151 @@
+from plone.meta.wheelhouse import build_wheels
+from plone.meta.wheelhouse import covered_environments
+from plone.meta.wheelhouse import ENVIRONMENTS_FILE
+from plone.meta.wheelhouse import find_wheelhouse
+from plone.meta.wheelhouse import is_covered
+from plone.meta.wheelhouse import pip_wheel_command
+from plone.meta.wheelhouse import QA_DEPS
+from plone.meta.wheelhouse import record_environment
+from plone.meta.wheelhouse import run_tox
+from plone.meta.wheelhouse import UNCONSTRAINED_DEPS
+from plone.meta.wheelhouse import wheelhouse_env
+from plone.meta.wheelhouse import wheelhouse_runs
+from unittest.mock import patch
+
+import subprocess
+
+
+def test_wheelhouse_env(tmp_path):
+    env = wheelhouse_env(tmp_path, environ={"PATH": "/usr/bin"})
+    assert env == {
+        "PATH": "/usr/bin",
+        "PIP_FIND_LINKS": str(tmp_path),
+        "PIP_NO_INDEX": "1",
+        "UV_FIND_LINKS": str(tmp_path),
+        "UV_NO_INDEX": "1",
+    }
+
+
+def test_wheelhouse_env_with_index(tmp_path):
+    env = wheelhouse_env(tmp_path, environ={"PIP_NO_INDEX": "1"}, no_index=False)
+    assert env == {"PIP_FIND_LINKS": str(tmp_path), "UV_FIND_LINKS": str(tmp_path)}
+
+
+def test_pip_wheel_command(tmp_path):
+    command = pip_wheel_command(
+        tmp_path, "constraints.txt", ("/src/plone.foo[test]",), "python3.12"
+    )
+    assert command == (
+        "python3.12",
+        "-m",
+        "pip",
+        "wheel",
+        "--wheel-dir",
+        str(tmp_path),
+        "--find-links",
+        str(tmp_path),
+        "--constraint",
+        "constraints.txt",
+        "/src/plone.foo[test]",
+    )
+
+
+def test_pip_wheel_command_without_constraints(tmp_path):
+    command = pip_wheel_command(tmp_path, None, UNCONSTRAINED_DEPS)
+    assert "--constraint" not in command
+    assert command[-len(UNCONSTRAINED_DEPS) :] == UNCONSTRAINED_DEPS
+
+
+@patch("plone.meta.wheelhouse.subprocess.run")
+def test_build_wheels_continues_after_failures(mock_run, tmp_path):
+    mock_run.side_effect = [
+        subprocess.CompletedProcess(args=[], returncode=1),
+        subprocess.CompletedProcess(args=[], returncode=0),
+        subprocess.CompletedProcess(args=[], returncode=0),
+        subprocess.CompletedProcess(args=[], returncode=0),
+    ]
+    wheelhouse = tmp_path / "wheelhouse"
+    failed = build_wheels(
+        [tmp_path / "plone.broken", tmp_path / "plone.fine"], wheelhouse, "c.txt"
+    )
+    assert failed == ["plone.broken"]
+    assert wheelhouse.is_dir()
+    # The repositories, then the tools of the other tox environments.
+    commands = [call.args[0] for call in mock_run.call_args_list]
+    assert len(commands) == 4
+    assert "zope.testrunner" in commands[0]
+    assert commands[2][-len(QA_DEPS) :] == QA_DEPS
+    assert "--constraint" in commands[2]
+    assert "--constraint" not in commands[3]
+
+
+@patch("plone.meta.wheelhouse.subprocess.run")
+def test_build_wheels_reports_failed_tools(mock_run, tmp_path):
+    mock_run.side_effect = [
+        subprocess.CompletedProcess(args=[], returncode=0),
+        subprocess.CompletedProcess(args=[], returncode=1),
+        subprocess.CompletedProcess(args=[], returncode=1),
+    ]
+    failed = build_wheels([tmp_path / "plone.fine"], tmp_path, "c.txt")
+    assert failed == ["tools"]
+
+
+def test_record_environment(tmp_path):
+    assert covered_environments(tmp_path) == []
+    record_environment(tmp_path, "py313-plone62")
+    record_environment(tmp_path, "py312-plone61")
+    record_environment(tmp_path, "py313-plone62")
+    assert (tmp_path / ENVIRONMENTS_FILE).read_text() == (
+        "py312-plone61\npy313-plone62\n"
+    )
+    assert covered_environments(tmp_path) == ["py312-plone61", "py313-plone62"]
+
+
+def test_is_covered():
+    covered = ["py313-plone62"]
+    assert is_covered("py313-plone62", covered)
+    assert is_covered("py313-plone62-shard1", covered)
+    assert not is_covered("py312-plone62", covered)
+    assert not is_covered("py313-plone60", covered)
+    assert not is_covered("lint", covered)
+
+
+def test_wheelhouse_runs(tmp_path):
+    record_environment(tmp_path, "py313-plone62")
+    runs = list(wheelhouse_runs(["py313-plone62", "py311-plone60", "lint"], tmp_path))
+    assert [names for names, env in runs] == [
+        ["py313-plone62"],
+        ["py311-plone60", "lint"],
+    ]
+    assert runs[0][1]["PIP_NO_INDEX"] == "1"
+    assert runs[1][1]["PIP_FIND_LINKS"] == str(tmp_path)
+    assert "PIP_NO_INDEX" not in runs[1][1]
+
+
+def test_find_wheelhouse(tmp_path):
+    repository = tmp_path / "plone.foo"
+    repository.mkdir()
+    (repository / ".meta.toml").write_text('[tox]\nwheelhouse = "../wheelhouse"\n')
+    # Not built on this machine, like on CI.
+    assert find_wheelhouse(repository) is None
+    (tmp_path / "wheelhouse").mkdir()
+    assert find_wheelhouse(repository) == repository / "../wheelhouse"
+    assert find_wheelhouse(repository, tmp_path) == tmp_path
+
+
+@patch("plone.meta.wheelhouse.subprocess.run")
+def test_run_tox(mock_run, tmp_path):
+    record_environment(tmp_path, "py313-plone62")
+    mock_run.side_effect = [
+        subprocess.CompletedProcess(
+            args=[], returncode=0, stdout="py313-plone62\nlint\n"
+        ),
+        subprocess.CompletedProcess(args=[], returncode=0),
+        subprocess.CompletedProcess(args=[], returncode=1),
+    ]
+    assert not run_tox(tmp_path, tmp_path, "tox")
+    calls = mock_run.call_args_list
+    assert calls[1].args[0] == ("tox", "-p", "auto", "-e", "py313-plone62")
+    assert calls[1].kwargs["env"]["PIP_NO_INDEX"] == "1"
+    assert calls[2].args[0] == ("tox", "-p", "auto", "-e", "lint")
+    assert "PIP_NO_INDEX" not in calls[2].kwargs["env"]